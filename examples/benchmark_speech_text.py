@@ -0,0 +1,148 @@
+"""
+Micro-benchmark de la normalisation du texte pour la synthèse vocale
+Compare l'ancienne fonction clean_text_for_speech (une quinzaine de passes
+re.sub / replace, motif d'emojis recompilé à chaque appel) à la version en
+un seul parcours de src/utils/speech_text.py, sur des réponses typiques du
+chatbot (résumé de complétion, message d'accueil de fiche).
+
+Usage:
+    python examples/benchmark_speech_text.py
+"""
+
+import re
+import sys
+import timeit
+from pathlib import Path
+
+# Ajouter le dossier src au path pour les imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.speech_text import clean_text_for_speech
+
+# Nombre d'appels mesurés par texte
+ITERATIONS = 2000
+
+
+# ---------------------------------------------------------------------------
+# Version précédente (référence), telle qu'elle était dans app.py
+# ---------------------------------------------------------------------------
+
+def legacy_remove_emojis(text):
+    """Supprime les emojis du texte"""
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"
+        "\U0001F300-\U0001F5FF"
+        "\U0001F680-\U0001F6FF"
+        "\U0001F1E0-\U0001F1FF"
+        "\U00002702-\U000027B0"
+        "\U000024C2-\U0001F251"
+        "\U0001F900-\U0001F9FF"
+        "\U0001FA00-\U0001FA6F"
+        "\U0001FA70-\U0001FAFF"
+        "\U00002600-\U000026FF"
+        "\U00002700-\U000027BF"
+        "]+",
+        flags=re.UNICODE
+    )
+    return emoji_pattern.sub(r'', text)
+
+
+def legacy_clean_text_for_speech(text):
+    """Ancienne normalisation, en passes successives"""
+    text = legacy_remove_emojis(text)
+    text = re.sub(r'```[\s\S]*?```', '', text)
+    text = re.sub(r'`([^`]+)`', r'\1', text)
+    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
+    text = re.sub(r'!\[([^\]]*)\]\([^\)]+\)', '', text)
+    text = re.sub(r'\*\*([^\*]+)\*\*', r'\1', text)
+    text = re.sub(r'__([^_]+)__', r'\1', text)
+    text = re.sub(r'\*([^\*]+)\*', r'\1', text)
+    text = re.sub(r'_([^_]+)_', r'\1', text)
+    text = re.sub(r'\*+', '', text)
+    text = re.sub(r'_+', '', text)
+    text = text.replace('"', '').replace('"', '')
+    text = text.replace('«', '').replace('»', '')
+    text = text.replace('"', '')
+    text = re.sub(r'#{1,6}\s+', '', text)
+    text = re.sub(r'^\s*>\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\n\s*\n', '\n', text)
+    return text.strip()
+
+
+# ---------------------------------------------------------------------------
+# Textes de test
+# ---------------------------------------------------------------------------
+
+COMPLETION_SUMMARY = """📊 **État de la fiche** (64% complète)
+
+**🔧 Mise en Service:**
+✅ Nom Chantier
+✅ Ao
+✅ Num Chantier
+❌ Nom Technicien
+✅ Date
+❌ Signature
+
+**📋 Tableau des Défauts:**
+✅ Partie DC
+⚠️ Partie AC
+❌ Partie Communication
+❌ Liaison Equipotentielle / Mesure de terre
+✅ Divers / Remarques
+"""
+
+WELCOME_MESSAGE = """📋 **Fiche de Contrôle MES activée**
+
+Je vais t'aider à remplir ta fiche de contrôle mes. Donne-moi les informations au fur et à mesure, je note tout !
+
+**📝 Informations à fournir :**
+
+**1️⃣ Informations générales** (6 champs)
+   • Nom du chantier
+   • N° de chantier
+   • Date de mise en service
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+**🚀 Commençons !**
+
+Quel est le nom du chantier ?
+
+💡 *Tu peux donner plusieurs infos à la fois si tu veux !*"""
+
+ASSISTANT_REPLY = """Merci ! J'ai bien noté le **nom du chantier** : _GAEC DE VAULEON_.
+
+> Pour la section 'Partie AC', as-tu rencontré des anomalies ?
+
+1. Vérifie le [guide de contrôle](https://example.com/guide) ;
+2. Indique le temps passé (ex : `45 min`) ;
+- Précise « RAS » si rien à signaler.
+"""
+
+SAMPLES = {
+    "résumé de complétion": COMPLETION_SUMMARY,
+    "message d'accueil": WELCOME_MESSAGE,
+    "réponse du chatbot": ASSISTANT_REPLY,
+    "réponse longue (x20)": "\n".join([COMPLETION_SUMMARY, WELCOME_MESSAGE, ASSISTANT_REPLY] * 20),
+}
+
+
+if __name__ == "__main__":
+    print("\n⏱️  Normalisation du texte pour la synthèse vocale")
+    print(f"   {ITERATIONS} appels par texte\n")
+
+    print(f"{'Texte':<25} {'Avant (µs)':>12} {'Après (µs)':>12} {'Gain':>7}")
+    print("-" * 60)
+    for name, text in SAMPLES.items():
+        legacy = timeit.timeit(lambda: legacy_clean_text_for_speech(text), number=ITERATIONS)
+        single_pass = timeit.timeit(lambda: clean_text_for_speech(text), number=ITERATIONS)
+        print(f"{name:<25} {legacy / ITERATIONS * 1e6:>12.1f} {single_pass / ITERATIONS * 1e6:>12.1f} "
+              f"{legacy / single_pass:>6.1f}x")
+
+    # Aperçu : mêmes mots prononcés, sauts de ligne conservés (pauses de lecture)
+    print("\n📝 Exemple (réponse du chatbot) :")
+    print(f"   Avant : {legacy_clean_text_for_speech(ASSISTANT_REPLY)!r}")
+    print(f"   Après : {clean_text_for_speech(ASSISTANT_REPLY)!r}")
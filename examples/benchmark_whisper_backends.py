@@ -0,0 +1,195 @@
+"""
+Benchmark des moteurs de transcription Whisper
+Mesure le facteur temps réel (RTF = temps de transcription / durée de l'audio)
+de chaque configuration sur un jeu fixe d'enregistrements français. Si un
+fichier <clip>.txt accompagne un enregistrement, le taux d'erreur sur les
+mots (WER) est aussi calculé.
+
+Usage:
+    python examples/benchmark_whisper_backends.py [dossier_des_clips]
+
+Les threads CPU se règlent avec WHISPER_INTRA_OP_THREADS et
+WHISPER_INTER_OP_THREADS (voir src/utils/whisper_backends.py).
+"""
+
+import json
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+# Ajouter le dossier src au path pour les imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from utils.audio_decode import SAMPLE_RATE, decode_audio
+from utils.whisper_backends import load_backend
+
+# Jeu d'enregistrements par défaut (mémos vocaux de techniciens)
+DEFAULT_CLIPS_DIR = Path("data/audio_benchmark")
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a")
+
+# Configurations comparées : (moteur, taille du modèle, réglages propres au moteur)
+BENCHMARK_CONFIGS = [
+    ("openai-whisper", "tiny", {}),
+    ("openai-whisper", "base", {}),
+    ("faster-whisper", "tiny", {"compute_type": "int8"}),
+    ("faster-whisper", "base", {"compute_type": "int8"}),
+    ("faster-whisper", "small", {"compute_type": "int8"}),
+]
+
+
+def load_clips(clips_dir: Path) -> List[Dict]:
+    """
+    Décode les enregistrements du jeu de test (une seule fois pour tous les moteurs).
+
+    Returns:
+        Liste de {"name", "samples", "duration", "reference"}
+    """
+    clips = []
+    for path in sorted(clips_dir.iterdir()):
+        if path.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        samples = decode_audio(path.read_bytes())
+        reference_path = path.with_suffix(".txt")
+        clips.append({
+            "name": path.name,
+            "samples": samples,
+            "duration": len(samples) / SAMPLE_RATE,
+            "reference": reference_path.read_text(encoding="utf-8") if reference_path.exists() else None
+        })
+    return clips
+
+
+def _words(text: str) -> List[str]:
+    """Mots normalisés (minuscules, sans ponctuation) pour le calcul du WER"""
+    return re.findall(r"[\w']+", text.lower())
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Taux d'erreur sur les mots (distance d'édition / nombre de mots de référence).
+
+    Args:
+        reference: Transcription de référence
+        hypothesis: Transcription produite
+
+    Returns:
+        WER entre 0 et 1 (ou plus si la transcription ajoute beaucoup de mots)
+    """
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def benchmark_config(backend_name: str, model_name: str, options: Dict, clips: List[Dict]) -> Dict:
+    """
+    Mesure une configuration sur tout le jeu d'enregistrements.
+
+    Returns:
+        Résultats : temps de chargement, RTF global et par clip, WER moyen
+    """
+    start = time.perf_counter()
+    backend = load_backend(backend_name, model_name, **options)
+    load_time = time.perf_counter() - start
+
+    # Premier passage hors mesure (initialisation des noyaux, allocation mémoire)
+    backend.transcribe(clips[0]["samples"])
+
+    per_clip = []
+    for clip in clips:
+        start = time.perf_counter()
+        text = backend.transcribe(clip["samples"])
+        elapsed = time.perf_counter() - start
+
+        result = {
+            "clip": clip["name"],
+            "duration": round(clip["duration"], 2),
+            "time": round(elapsed, 2),
+            "rtf": round(elapsed / clip["duration"], 3),
+            "text": text.strip()
+        }
+        if clip["reference"] is not None:
+            result["wer"] = round(word_error_rate(clip["reference"], text), 3)
+        per_clip.append(result)
+        print(f"   {clip['name']:<30} RTF {result['rtf']:.3f}" +
+              (f"  WER {result['wer']:.1%}" if "wer" in result else ""))
+
+    total_audio = sum(clip["duration"] for clip in clips)
+    total_time = sum(result["time"] for result in per_clip)
+    wers = [result["wer"] for result in per_clip if "wer" in result]
+    return {
+        "backend": backend_name,
+        "model": model_name,
+        "options": options,
+        "description": backend.describe(),
+        "load_time": round(load_time, 2),
+        "rtf": round(total_time / total_audio, 3),
+        "wer": round(sum(wers) / len(wers), 3) if wers else None,
+        "clips": per_clip
+    }
+
+
+if __name__ == "__main__":
+    clips_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CLIPS_DIR
+
+    print("\n⏱️  Benchmark des moteurs Whisper")
+    print(f"   Enregistrements: {clips_dir}")
+
+    if not clips_dir.is_dir():
+        print(f"❌ Dossier introuvable: {clips_dir}")
+        sys.exit(1)
+
+    clips = load_clips(clips_dir)
+    if not clips:
+        print(f"❌ Aucun enregistrement ({', '.join(AUDIO_EXTENSIONS)}) trouvé")
+        sys.exit(1)
+
+    total_audio = sum(clip["duration"] for clip in clips)
+    print(f"   {len(clips)} enregistrement(s), {total_audio:.1f} s d'audio\n")
+
+    results = []
+    for backend_name, model_name, options in BENCHMARK_CONFIGS:
+        print(f"▶ {backend_name} / {model_name} {options or ''}")
+        try:
+            results.append(benchmark_config(backend_name, model_name, options, clips))
+        except ImportError as e:
+            print(f"   ⏭️  Ignoré: {e}")
+        except Exception as e:
+            print(f"   ❌ Erreur: {e}")
+        print()
+
+    if not results:
+        print("❌ Aucune configuration n'a pu être mesurée")
+        sys.exit(1)
+
+    # Tableau récapitulatif, du plus rapide au plus lent
+    print("=" * 70)
+    print(f"{'Configuration':<45} {'Chargement':>10} {'RTF':>6} {'WER':>6}")
+    print("-" * 70)
+    for result in sorted(results, key=lambda r: r["rtf"]):
+        wer = f"{result['wer']:.1%}" if result["wer"] is not None else "-"
+        print(f"{result['description']:<45} {result['load_time']:>9.1f}s {result['rtf']:>6.3f} {wer:>6}")
+    print("=" * 70)
+
+    output_file = clips_dir / "benchmark_results.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "total_audio_seconds": round(total_audio, 2),
+            "results": results
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Résultats sauvegardés: {output_file}")
@@ -13,7 +13,7 @@ from pathlib import Path
 # Ajouter le dossier src au path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from ner_defaut_documents import extract_entities_from_defaut_document, display_entities
+from utils.ner_defaut_documents import extract_entities_from_defaut_document, display_entities
 from rag_integration_ner import DefautDocumentRAG
 
 
@@ -150,7 +150,7 @@ def exemple_batch_processing():
     print("EXEMPLE 4: TRAITEMENT BATCH")
     print("="*80 + "\n")
     
-    from ner_defaut_documents import batch_process_ocr_results
+    from utils.ner_defaut_documents import batch_process_ocr_results
     
     ocr_dir = Path(__file__).parent.parent / "data" / "ocr_results"
     output_dir = Path(__file__).parent.parent / "data" / "ner_results"
@@ -5,9 +5,7 @@ et comparer avec les résultats de Mistral Document AI
 import os
 import sys
 import time
-import base64
 from pathlib import Path
-import json
 from datetime import datetime
 
 try:
@@ -17,13 +15,6 @@ except ImportError:
     os.system(f"{sys.executable} -m pip install pymupdf")
     import fitz
 
-try:
-    import requests
-except ImportError:
-    print("⚠️  requests n'est pas installé. Installation en cours...")
-    os.system(f"{sys.executable} -m pip install requests")
-    import requests
-
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -40,98 +31,55 @@ AZURE_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 if not AZURE_API_KEY:
     raise ValueError("AZURE_OPENAI_API_KEY n'est pas définie")
 
-def extract_images_from_pdf(pdf_path, output_dir):
-    """
-    Extrait les pages d'un PDF en images haute résolution
-    """
-    print(f"\n📄 Extraction des images de: {pdf_path.name}")
-    
-    pdf_document = fitz.open(pdf_path)
-    page_count = pdf_document.page_count
-    print(f"  ✓ Nombre de pages: {page_count}")
-    
-    # Créer un dossier pour ce PDF
-    pdf_image_dir = Path(output_dir) / pdf_path.stem
-    pdf_image_dir.mkdir(parents=True, exist_ok=True)
-    
-    image_paths = []
-    
-    for page_num in range(page_count):
-        page = pdf_document[page_num]
-        
-        # Convertir en image haute résolution (3x)
-        mat = fitz.Matrix(3.0, 3.0)
-        pix = page.get_pixmap(matrix=mat)
-        
-        # Sauvegarder
-        img_path = pdf_image_dir / f"page_{page_num + 1}.png"
-        pix.save(img_path)
-        image_paths.append(img_path)
-        
-        print(f"    Page {page_num + 1}: {pix.width}x{pix.height}px -> {img_path.name}")
-    
-    pdf_document.close()
-    return image_paths
+# Client Azure partagé (pool de connexions + limite de requêtes simultanées)
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from utils.azure_client import create_chat_completion
+from utils.jsonl_io import JsonlWriter
+from utils.ocr_checkpoint import OcrCheckpoint, file_sha256
+from utils.pdf_rasterizer import get_page_fingerprints, is_poor_ocr_text, iter_pdf_pages, render_page
 
-def ocr_image_with_vision(image_path):
+def ocr_image_with_vision(image_url):
     """
-    Effectue l'OCR sur une image avec GPT-4 Vision
+    Effectue l'OCR sur une image (URL data: base64) avec GPT-4 Vision
     """
-    # Lire et encoder l'image
-    with open(image_path, "rb") as img_file:
-        image_data = img_file.read()
-        image_base64 = base64.b64encode(image_data).decode('utf-8')
-    
-    # API GPT-4 Vision
-    url = f"{AZURE_ENDPOINT}/openai/deployments/gpt-4o/chat/completions?api-version=2024-02-15-preview"
-    
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": AZURE_API_KEY
-    }
-    
-    payload = {
-        "messages": [
-            {
-                "role": "system",
-                "content": "Tu es un système OCR expert. Extrais tout le texte visible de l'image fournie. Préserve la structure, les tableaux, les cases à cocher et la mise en forme autant que possible. Retourne uniquement le texte extrait, sans commentaire."
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "Extrais tout le texte de cette image de document. Préserve les tableaux, la structure et tous les détails. Pour les cases à cocher, utilise ☐ pour les cases vides et ☑ ou ☒ pour les cases cochées."
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{image_base64}"
-                        }
+    messages = [
+        {
+            "role": "system",
+            "content": "Tu es un système OCR expert. Extrais tout le texte visible de l'image fournie. Préserve la structure, les tableaux, les cases à cocher et la mise en forme autant que possible. Retourne uniquement le texte extrait, sans commentaire."
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "Extrais tout le texte de cette image de document. Préserve les tableaux, la structure et tous les détails. Pour les cases à cocher, utilise ☐ pour les cases vides et ☑ ou ☒ pour les cases cochées."
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image_url
                     }
-                ]
-            }
-        ],
-        "max_tokens": 4000,
-        "temperature": 0
-    }
+                }
+            ]
+        }
+    ]
     
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=120)
-        
-        if response.status_code == 200:
-            result = response.json()
-            text = result['choices'][0]['message']['content']
-            return text, None
-        else:
-            error_msg = f"Erreur {response.status_code}: {response.text[:200]}"
-            return None, error_msg
+        response = create_chat_completion(
+            model="gpt-4o",
+            messages=messages,
+            max_tokens=4000,
+            temperature=0
+        )
+        text = response.choices[0].message.content
+        return text, None
     except Exception as e:
-        return None, str(e)
+        return None, str(e)[:200]
 
-def process_pdf_with_vision(pdf_path, temp_dir, output_dir):
+def process_pdf_with_vision(pdf_path, output_dir, checkpoint):
     """
-    Traite un PDF complet avec GPT-4 Vision
+    Traite un PDF complet avec GPT-4 Vision.
+    Les pages déjà traitées (même contenu) sont relues dans le journal de reprise.
     """
     print(f"\n{'='*80}")
     print(f"📄 Traitement de: {pdf_path.name}")
@@ -139,36 +87,55 @@ def process_pdf_with_vision(pdf_path, temp_dir, output_dir):
     
     start_time = time.time()
     
-    # Extraire les images
-    image_paths = extract_images_from_pdf(pdf_path, temp_dir)
-    
-    # OCR sur chaque page
-    print(f"\n  📤 OCR avec GPT-4 Vision...")
-    full_text = ""
-    page_results = []
-    
-    for i, img_path in enumerate(image_paths, 1):
-        print(f"    Page {i}/{len(image_paths)}...", end=" ", flush=True)
+    # Empreintes du PDF et de ses pages : seules les pages nouvelles, modifiées
+    # ou en erreur lors d'un précédent passage sont traitées
+    sha256 = file_sha256(pdf_path)
+    page_keys = get_page_fingerprints(pdf_path)
+    page_count = len(page_keys)
+    pending = [i for i, key in enumerate(page_keys, 1) if not checkpoint.is_page_done(key)]
+    print(f"  ✓ Nombre de pages: {page_count} ({page_count - len(pending)} déjà traitée(s))")
+    
+    # Rendu des pages en parallèle (en mémoire), OCR au fur et à mesure
+    if pending:
+        print(f"\n  📤 OCR avec GPT-4 Vision...")
+    errors = {}
+    
+    for rendered in iter_pdf_pages(pdf_path, pages=pending):
+        i = rendered.page
+        print(f"    Page {i}/{page_count} ({rendered.width}x{rendered.height}px)...", end=" ", flush=True)
+        
+        text, error = ocr_image_with_vision(rendered.data_url())
         
-        text, error = ocr_image_with_vision(img_path)
+        # Texte illisible : nouvelle tentative en PNG couleur pleine résolution
+        if not error and is_poor_ocr_text(text):
+            print("🔁 qualité insuffisante, nouvel essai en haute résolution...", end=" ", flush=True)
+            retry_text, retry_error = ocr_image_with_vision(render_page(pdf_path, i, high_quality=True).data_url())
+            if not retry_error:
+                text = retry_text
         
         if error:
             print(f"❌ Erreur: {error}")
-            text = f"[ERREUR OCR: {error}]"
+            errors[i] = error
         else:
             print(f"✅ {len(text)} caractères")
         
+        # Point de reprise : la page est journalisée dès qu'elle est terminée
+        checkpoint.record_page(sha256, pdf_path.name, i, page_keys[i - 1], text=text, error=error)
+    
+    checkpoint.record_document(sha256, pdf_path.name, page_keys)
+    
+    # Assembler le texte complet à partir du journal
+    full_text = ""
+    page_results = []
+    for i, key in enumerate(page_keys, 1):
+        error = errors.get(i)
+        text = checkpoint.get_page_text(key) if not error else f"[ERREUR OCR: {error}]"
         page_results.append({
             "page": i,
             "text": text,
             "error": error
         })
-        
         full_text += f"--- Page {i} ---\n{text}\n\n"
-        
-        # Pause pour éviter rate limiting
-        if i < len(image_paths):
-            time.sleep(1)
     
     # Sauvegarder
     output_file = Path(output_dir) / f"{pdf_path.stem}_ocr_vision.txt"
@@ -183,7 +150,7 @@ def process_pdf_with_vision(pdf_path, temp_dir, output_dir):
     
     return {
         "file": str(pdf_path),
-        "total_pages": len(image_paths),
+        "total_pages": page_count,
         "total_chars": len(full_text),
         "elapsed_time": elapsed_time,
         "output_file": str(output_file),
@@ -226,51 +193,60 @@ if __name__ == "__main__":
     for pdf in pdf_files:
         print(f"  - {pdf.name}")
     
-    # Créer les dossiers
-    temp_dir = Path("data/temp_images")
+    # Créer le dossier de sortie
     output_dir = Path("data/ocr_results")
-    temp_dir.mkdir(exist_ok=True)
     output_dir.mkdir(exist_ok=True)
     
-    # Traiter chaque PDF
-    all_results = []
-    
-    for i, pdf_path in enumerate(pdf_files, 1):
-        print(f"\n[{i}/{len(pdf_files)}] ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-        
-        result = process_pdf_with_vision(pdf_path, temp_dir, output_dir)
-        
-        # Comparer avec Mistral
-        comparison = compare_with_mistral(pdf_path, result)
-        if comparison:
-            result["comparison"] = comparison
-            print(f"\n  📊 Comparaison avec Mistral:")
-            print(f"     Mistral: {comparison['mistral_chars']} caractères")
-            print(f"     Vision:  {comparison['vision_chars']} caractères")
-            print(f"     Gain:    {comparison['difference']:+d} ({comparison['percent_increase']:+.1f}%)")
+    # Journal de reprise : une relance ne refait que les pages manquantes
+    checkpoint = OcrCheckpoint(output_dir, name="ocr_vision")
+    
+    # Traiter chaque PDF, en écrivant le rapport JSONL au fil de l'eau :
+    # un enregistrement "document" par PDF puis un enregistrement "page" par page
+    total_pages = 0
+    total_chars = 0
+    total_time = 0.0
+    gains = []
+    
+    report_file = output_dir / "ocr_vision_summary.jsonl"
+    with JsonlWriter(report_file) as report:
+        report.write({
+            "type": "run",
+            "timestamp": datetime.now().isoformat(),
+            "total_files": len(pdf_files)
+        })
         
-        all_results.append(result)
-    
-    # Sauvegarder le rapport
-    report = {
-        "timestamp": datetime.now().isoformat(),
-        "total_files": len(pdf_files),
-        "results": all_results
-    }
-    
-    report_file = output_dir / "ocr_vision_summary.json"
-    with open(report_file, "w", encoding="utf-8") as f:
-        json.dump(report, f, ensure_ascii=False, indent=2)
+        for i, pdf_path in enumerate(pdf_files, 1):
+            print(f"\n[{i}/{len(pdf_files)}] ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+            
+            result = process_pdf_with_vision(pdf_path, output_dir, checkpoint)
+            page_results = result.pop("page_results")
+            
+            # Comparer avec Mistral
+            comparison = compare_with_mistral(pdf_path, result)
+            if comparison:
+                result["comparison"] = comparison
+                gains.append(comparison["percent_increase"])
+                print(f"\n  📊 Comparaison avec Mistral:")
+                print(f"     Mistral: {comparison['mistral_chars']} caractères")
+                print(f"     Vision:  {comparison['vision_chars']} caractères")
+                print(f"     Gain:    {comparison['difference']:+d} ({comparison['percent_increase']:+.1f}%)")
+            
+            report.write({"type": "document", **result})
+            for page in page_results:
+                report.write({"type": "page", "file": result["file"], **page})
+            report.flush()
+            
+            total_pages += result["total_pages"]
+            total_chars += result["total_chars"]
+            total_time += result["elapsed_time"]
+    
+    checkpoint.close()
     
     # Afficher le résumé
     print(f"\n{'='*80}")
     print("📊 RÉSUMÉ GÉNÉRAL")
     print(f"{'='*80}")
     
-    total_pages = sum(r["total_pages"] for r in all_results)
-    total_chars = sum(r["total_chars"] for r in all_results)
-    total_time = sum(r["elapsed_time"] for r in all_results)
-    
     print(f"\n  ✅ {len(pdf_files)} fichiers traités")
     print(f"  📄 {total_pages} pages au total")
     print(f"  📝 {total_chars:,} caractères extraits")
@@ -278,9 +254,8 @@ if __name__ == "__main__":
     print(f"  💾 Rapport: {report_file}")
     
     # Comparaisons
-    comparisons = [r.get("comparison") for r in all_results if r.get("comparison")]
-    if comparisons:
-        avg_gain = sum(c["percent_increase"] for c in comparisons) / len(comparisons)
+    if gains:
+        avg_gain = sum(gains) / len(gains)
         print(f"\n  📈 Gain moyen vs Mistral: {avg_gain:+.1f}%")
     
     print("\n✅ Traitement terminé!")
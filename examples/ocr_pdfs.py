@@ -38,12 +38,19 @@ if not AZURE_MISTRAL_ENDPOINT:
 # Nettoyer l'endpoint (enlever le slash final si présent)
 AZURE_MISTRAL_ENDPOINT = AZURE_MISTRAL_ENDPOINT.rstrip('/')
 
-def extract_text_from_pdf_azure_mistral(pdf_path):
+# Session HTTP partagée (pool de connexions + limite de requêtes simultanées)
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from utils.azure_client import get_http_session, request_slot
+from utils.jsonl_io import JsonlWriter
+from utils.ocr_checkpoint import OcrCheckpoint, file_sha256
+
+def extract_text_from_pdf_azure_mistral(pdf_path, pages=None):
     """
     Extrait le texte d'un PDF en utilisant Azure mistral-document-ai-2505
     
     Args:
         pdf_path: Chemin vers le fichier PDF
+        pages: Index des pages à traiter (à partir de 0), toutes par défaut
         
     Returns:
         dict: Dictionnaire avec les résultats de l'extraction
@@ -84,11 +91,14 @@ def extract_text_from_pdf_azure_mistral(pdf_path):
             },
             "include_image_base64": True  # Pas besoin des images en base64 pour l'OCR texte
         }
+        if pages is not None:
+            payload["pages"] = pages
         print(api_url)
         print(f"  📤 Envoi du PDF à l'API Azure Mistral Document AI...")
         
         # Faire l'appel API
-        response = requests.post(api_url, headers=headers, json=payload, timeout=300)
+        with request_slot():
+            response = get_http_session().post(api_url, headers=headers, json=payload, timeout=300)
         
         if response.status_code == 200:
             result = response.json()
@@ -209,6 +219,87 @@ def extract_text_from_pdf_azure_mistral(pdf_path):
     
     return results
 
+def _page_key(sha256, page):
+    """Clé d'une page dans le journal de reprise"""
+    return f"{sha256}:{page}"
+
+def _results_from_checkpoint(pdf_path, sha256, checkpoint):
+    """
+    Reconstruit le résultat d'un PDF à partir des pages du journal de reprise
+    """
+    document = checkpoint.get_document(sha256)
+    results = {
+        "file": str(pdf_path),
+        "total_pages": document["total_pages"],
+        "pages_with_ocr": 0,
+        "text_by_page": [],
+        "full_text": ""
+    }
+    for page_num, key in enumerate(document["page_keys"], 1):
+        page_text = checkpoint.get_page_text(key)
+        if page_text is None:
+            continue
+        results["text_by_page"].append({
+            "page": page_num,
+            "text": page_text,
+            "ocr_used": True
+        })
+        results["pages_with_ocr"] += 1
+    results["full_text"] = "\n\n".join([
+        f"--- Page {p['page']} ---\n{p['text']}" 
+        for p in results["text_by_page"]
+    ])
+    if document.get("error"):
+        results["error"] = document["error"]
+    return results
+
+def extract_text_with_checkpoint(pdf_path, checkpoint):
+    """
+    Extrait le texte d'un PDF en s'appuyant sur le journal de reprise :
+    un PDF déjà traité (même contenu) n'est pas renvoyé à l'API, et seules
+    les pages manquantes d'un PDF partiellement traité sont demandées
+    
+    Args:
+        pdf_path: Chemin vers le fichier PDF
+        checkpoint: Journal de reprise (OcrCheckpoint)
+        
+    Returns:
+        dict: Dictionnaire avec les résultats de l'extraction
+    """
+    sha256 = file_sha256(pdf_path)
+    
+    if checkpoint.is_document_done(sha256):
+        print(f"  ⏭️  Déjà traité (journal de reprise)")
+        return _results_from_checkpoint(pdf_path, sha256, checkpoint)
+    
+    document = checkpoint.get_document(sha256)
+    pages = None
+    if document and document["page_keys"]:
+        pages = [
+            index for index, key in enumerate(document["page_keys"])
+            if not checkpoint.is_page_done(key)
+        ]
+        print(f"  🔁 Reprise: {len(pages)} page(s) à retraiter")
+    
+    results = extract_text_from_pdf_azure_mistral(pdf_path, pages=pages)
+    
+    if results.get("error"):
+        page_keys = document["page_keys"] if document else []
+        checkpoint.record_document(sha256, pdf_path.name, page_keys, error=results["error"])
+        return results
+    
+    # Journaliser chaque page, puis la structure du document
+    for page in results["text_by_page"]:
+        checkpoint.record_page(sha256, pdf_path.name, page["page"], _page_key(sha256, page["page"]),
+                               text=page["text"])
+    total_pages = document["total_pages"] if pages is not None else results["total_pages"]
+    checkpoint.record_document(
+        sha256, pdf_path.name,
+        [_page_key(sha256, page_num) for page_num in range(1, total_pages + 1)]
+    )
+    
+    return _results_from_checkpoint(pdf_path, sha256, checkpoint)
+
 def process_all_pdfs(data_dir="data", output_dir="data/ocr_results"):
     """
     Traite tous les fichiers PDF du dossier data
@@ -230,33 +321,51 @@ def process_all_pdfs(data_dir="data", output_dir="data/ocr_results"):
     
     print(f"📄 {len(pdf_files)} fichier(s) PDF trouvé(s)\n")
     
-    all_results = {
-        "timestamp": datetime.now().isoformat(),
-        "total_files": len(pdf_files),
-        "files": []
-    }
+    # Journal de reprise : une relance ne retraite que les PDF nouveaux, modifiés ou en erreur
+    checkpoint = OcrCheckpoint(output_dir, name="ocr_mistral")
     
-    for i, pdf_path in enumerate(pdf_files, 1):
-        print(f"[{i}/{len(pdf_files)}] Traitement de: {pdf_path.name}")
-        
-        results = extract_text_from_pdf_azure_mistral(pdf_path)
-        all_results["files"].append(results)
-        
-        # Sauvegarder le texte complet dans un fichier .txt
-        output_txt = Path(output_dir) / f"{pdf_path.stem}_ocr.txt"
-        with open(output_txt, "w", encoding="utf-8") as f:
-            f.write(results["full_text"])
+    # Résumé JSONL écrit au fil de l'eau : un enregistrement "document" par PDF,
+    # suivi d'un enregistrement "page" par page (le texte n'est stocké qu'une fois)
+    output_jsonl = Path(output_dir) / "ocr_summary.jsonl"
+    with JsonlWriter(output_jsonl) as summary:
+        summary.write({
+            "type": "run",
+            "timestamp": datetime.now().isoformat(),
+            "total_files": len(pdf_files)
+        })
         
-        print(f"  ✓ {results['total_pages']} page(s)")
-        print(f"  ✓ {results['pages_with_ocr']} page(s) traitées par OCR")
-        print(f"  ✓ Résultat sauvegardé: {output_txt}\n")
+        for i, pdf_path in enumerate(pdf_files, 1):
+            print(f"[{i}/{len(pdf_files)}] Traitement de: {pdf_path.name}")
+            
+            results = extract_text_with_checkpoint(pdf_path, checkpoint)
+            
+            # Sauvegarder le texte complet dans un fichier .txt
+            output_txt = Path(output_dir) / f"{pdf_path.stem}_ocr.txt"
+            with open(output_txt, "w", encoding="utf-8") as f:
+                f.write(results["full_text"])
+            
+            document = {
+                "type": "document",
+                "file": results["file"],
+                "total_pages": results["total_pages"],
+                "pages_with_ocr": results["pages_with_ocr"],
+                "output_file": str(output_txt)
+            }
+            for key in ("error", "raw_response"):
+                if key in results:
+                    document[key] = results[key]
+            summary.write(document)
+            for page in results["text_by_page"]:
+                summary.write({"type": "page", "file": results["file"], **page})
+            summary.flush()
+            
+            print(f"  ✓ {results['total_pages']} page(s)")
+            print(f"  ✓ {results['pages_with_ocr']} page(s) traitées par OCR")
+            print(f"  ✓ Résultat sauvegardé: {output_txt}\n")
     
-    # Sauvegarder le résumé JSON
-    output_json = Path(output_dir) / "ocr_summary.json"
-    with open(output_json, "w", encoding="utf-8") as f:
-        json.dump(all_results, f, ensure_ascii=False, indent=2)
+    checkpoint.close()
     
-    print(f"📊 Résumé sauvegardé: {output_json}")
+    print(f"📊 Résumé sauvegardé: {output_jsonl}")
     print(f"\n✅ Traitement terminé!")
 
 if __name__ == "__main__":
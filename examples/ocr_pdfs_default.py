@@ -5,7 +5,6 @@ Traite tous les PDFs du dossier data/ et génère les fichiers *_ocr.txt
 import os
 import sys
 import time
-import base64
 from pathlib import Path
 import json
 from datetime import datetime
@@ -17,13 +16,6 @@ except ImportError:
     os.system(f"{sys.executable} -m pip install pymupdf")
     import fitz
 
-try:
-    import requests
-except ImportError:
-    print("⚠️  requests n'est pas installé. Installation en cours...")
-    os.system(f"{sys.executable} -m pip install requests")
-    import requests
-
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -40,117 +32,92 @@ AZURE_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 if not AZURE_API_KEY:
     raise ValueError("AZURE_OPENAI_API_KEY n'est pas définie")
 
-def extract_images_from_pdf(pdf_path, output_dir):
-    """Extrait les pages d'un PDF en images haute résolution"""
-    pdf_document = fitz.open(pdf_path)
-    page_count = pdf_document.page_count
-    
-    # Créer un dossier temporaire pour ce PDF
-    pdf_image_dir = Path(output_dir) / "temp" / pdf_path.stem
-    pdf_image_dir.mkdir(parents=True, exist_ok=True)
-    
-    image_paths = []
-    
-    for page_num in range(page_count):
-        page = pdf_document[page_num]
-        
-        # Convertir en image haute résolution (3x)
-        mat = fitz.Matrix(3.0, 3.0)
-        pix = page.get_pixmap(matrix=mat)
-        
-        # Sauvegarder
-        img_path = pdf_image_dir / f"page_{page_num + 1}.png"
-        pix.save(img_path)
-        image_paths.append(img_path)
-    
-    pdf_document.close()
-    return image_paths, page_count
+# Client Azure partagé (pool de connexions + limite de requêtes simultanées)
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from utils.azure_client import create_chat_completion
+from utils.ocr_checkpoint import OcrCheckpoint, file_sha256
+from utils.pdf_rasterizer import get_page_fingerprints, is_poor_ocr_text, iter_pdf_pages, render_page
 
-def ocr_image_with_vision(image_path):
-    """Effectue l'OCR sur une image avec GPT-4 Vision"""
-    # Lire et encoder l'image
-    with open(image_path, "rb") as img_file:
-        image_data = img_file.read()
-        image_base64 = base64.b64encode(image_data).decode('utf-8')
-    
-    # API GPT-4 Vision
-    url = f"{AZURE_ENDPOINT}/openai/deployments/gpt-4o/chat/completions?api-version=2024-02-15-preview"
-    
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": AZURE_API_KEY
-    }
-    
-    payload = {
-        "messages": [
-            {
-                "role": "system",
-                "content": "Tu es un système OCR expert. Extrais tout le texte visible de l'image fournie. Préserve la structure, les tableaux, les cases à cocher et la mise en forme autant que possible. Retourne uniquement le texte extrait, sans commentaire."
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "Extrais tout le texte de cette image de document. Préserve les tableaux, la structure et tous les détails. Pour les cases à cocher, utilise ☐ pour les cases vides et ☑ ou ☒ pour les cases cochées."
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{image_base64}"
-                        }
+def ocr_image_with_vision(image_url):
+    """Effectue l'OCR sur une image (URL data: base64) avec GPT-4 Vision"""
+    messages = [
+        {
+            "role": "system",
+            "content": "Tu es un système OCR expert. Extrais tout le texte visible de l'image fournie. Préserve la structure, les tableaux, les cases à cocher et la mise en forme autant que possible. Retourne uniquement le texte extrait, sans commentaire."
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "Extrais tout le texte de cette image de document. Préserve les tableaux, la structure et tous les détails. Pour les cases à cocher, utilise ☐ pour les cases vides et ☑ ou ☒ pour les cases cochées."
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image_url
                     }
-                ]
-            }
-        ],
-        "max_tokens": 4000,
-        "temperature": 0
-    }
+                }
+            ]
+        }
+    ]
     
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=120)
-        
-        if response.status_code == 200:
-            result = response.json()
-            text = result['choices'][0]['message']['content']
-            return text, None
-        else:
-            error_msg = f"Erreur {response.status_code}: {response.text[:200]}"
-            return None, error_msg
+        response = create_chat_completion(
+            model="gpt-4o",
+            messages=messages,
+            max_tokens=4000,
+            temperature=0
+        )
+        text = response.choices[0].message.content
+        return text, None
     except Exception as e:
-        return None, str(e)
+        return None, str(e)[:200]
 
-def process_pdf(pdf_path, output_dir):
-    """Traite un PDF complet avec GPT-4 Vision"""
+def process_pdf(pdf_path, output_dir, checkpoint):
+    """Traite un PDF complet avec GPT-4 Vision (pages déjà traitées relues dans le journal)"""
     print(f"\n📄 Traitement de: {pdf_path.name}")
     
     start_time = time.time()
     
-    # Extraire les images
-    print(f"  📸 Extraction des images...")
-    image_paths, page_count = extract_images_from_pdf(pdf_path, output_dir)
-    print(f"  ✓ {page_count} page(s) extraite(s)")
+    # Seules les pages nouvelles, modifiées ou en erreur sont traitées
+    sha256 = file_sha256(pdf_path)
+    page_keys = get_page_fingerprints(pdf_path)
+    page_count = len(page_keys)
+    pending = [i for i, key in enumerate(page_keys, 1) if not checkpoint.is_page_done(key)]
     
-    # OCR sur chaque page
-    print(f"  🔍 OCR avec GPT-4 Vision...")
-    full_text = ""
+    # Rendu des pages en parallèle, OCR au fur et à mesure
+    print(f"  🔍 OCR avec GPT-4 Vision ({len(pending)}/{page_count} page(s) à traiter)...")
+    errors = {}
     
-    for i, img_path in enumerate(image_paths, 1):
-        print(f"    Page {i}/{len(image_paths)}...", end=" ", flush=True)
+    for rendered in iter_pdf_pages(pdf_path, pages=pending):
+        i = rendered.page
+        print(f"    Page {i}/{page_count}...", end=" ", flush=True)
+        
+        text, error = ocr_image_with_vision(rendered.data_url())
         
-        text, error = ocr_image_with_vision(img_path)
+        # Texte illisible : nouvelle tentative en PNG couleur pleine résolution
+        if not error and is_poor_ocr_text(text):
+            print("🔁 qualité insuffisante, nouvel essai en haute résolution...", end=" ", flush=True)
+            retry_text, retry_error = ocr_image_with_vision(render_page(pdf_path, i, high_quality=True).data_url())
+            if not retry_error:
+                text = retry_text
         
         if error:
             print(f"❌ Erreur: {error}")
-            text = f"[ERREUR OCR: {error}]"
+            errors[i] = error
         else:
             print(f"✅ {len(text)} caractères")
         
+        checkpoint.record_page(sha256, pdf_path.name, i, page_keys[i - 1], text=text, error=error)
+    
+    checkpoint.record_document(sha256, pdf_path.name, page_keys)
+    
+    # Assembler le texte complet à partir du journal
+    full_text = ""
+    for i, key in enumerate(page_keys, 1):
+        text = checkpoint.get_page_text(key) if i not in errors else f"[ERREUR OCR: {errors[i]}]"
         full_text += f"--- Page {i} ---\n{text}\n\n"
-        
-        # Pause pour éviter rate limiting
-        if i < len(image_paths):
-            time.sleep(1)
     
     # Sauvegarder
     output_file = Path(output_dir) / f"{pdf_path.stem}_ocr.txt"
@@ -189,21 +156,19 @@ if __name__ == "__main__":
     output_dir = Path("data/ocr_results")
     output_dir.mkdir(exist_ok=True)
     
+    # Journal de reprise (partagé avec ocr_all_pdfs_vision.py : même modèle, même prompt)
+    checkpoint = OcrCheckpoint(output_dir, name="ocr_vision")
+    
     # Traiter chaque PDF
     results = []
     
     for i, pdf_path in enumerate(pdf_files, 1):
         print(f"\n[{i}/{len(pdf_files)}] {'='*60}")
         
-        result = process_pdf(pdf_path, output_dir)
+        result = process_pdf(pdf_path, output_dir, checkpoint)
         results.append(result)
     
-    # Nettoyer les fichiers temporaires
-    import shutil
-    temp_dir = output_dir / "temp"
-    if temp_dir.exists():
-        shutil.rmtree(temp_dir)
-        print(f"\n🗑️  Fichiers temporaires supprimés")
+    checkpoint.close()
     
     # Résumé
     print(f"\n{'='*60}")
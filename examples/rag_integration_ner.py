@@ -3,9 +3,15 @@ Intégration du NER avec le système RAG pour la complétion interactive des fic
 """
 
 import json
+import sys
 from pathlib import Path
 from typing import Dict, List
-from ner_defaut_documents import extract_entities_from_defaut_document, generate_rag_completion_prompt
+
+# Ajouter le dossier src au path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+# Version de src/utils : les extractions déjà faites sont lues depuis le cache NER
+from utils.ner_defaut_documents import extract_entities_from_defaut_document, generate_rag_completion_prompt
 from utils.LLM import get_chat_response
 
 
@@ -284,8 +290,6 @@ def process_document_with_rag_suggestions(file_path: str) -> Dict:
 
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) > 1 and sys.argv[1] == "--interactive":
         # Mode interactif
         demo_interactive()
@@ -1,24 +1,22 @@
 import streamlit as st
-import whisper
-import tempfile
-import os
-import warnings
-import subprocess
 import asyncio
-import edge_tts
-import re
-from pathlib import Path
-from utils.LLM import get_chat_response
+from utils.LLM import stream_chat_response
+from utils.async_runtime import submit_coroutine
+from utils.audio_decode import decoder_available
 from utils.fiche_defaut_manager import (
     FicheDefautChatManager, 
     create_fiche_system_message, 
     get_initial_fiche_message,
+    get_fixed_prompts,
     detect_fiche_type_from_message
 )
 from utils.fiche_types import FicheType, get_fiche_structure
+from utils.session_jobs import Job, SessionJobs
+from utils.transcription_worker import ensure_worker_started, iter_transcription
+from utils.tts import SpeechPipeline, prewarm, text_to_speech
 
-# Filtrer l'avertissement FP16 sur CPU
-warnings.filterwarnings("ignore", message="FP16 is not supported on CPU")
+# Intervalle de rafraîchissement de l'affichage des tâches en cours (secondes)
+JOB_POLL_INTERVAL = 0.5
 
 # Fonction helper pour détecter et activer le mode fiche automatiquement
 def auto_detect_and_activate_fiche_mode(user_message: str) -> bool:
@@ -71,17 +69,200 @@ def auto_detect_and_activate_fiche_mode(user_message: str) -> bool:
     
     return False
 
-# Vérification de ffmpeg
-def check_ffmpeg():
-    """Vérifie si ffmpeg est installé"""
+def get_last_assistant_message() -> str:
+    """Récupère la dernière question du chatbot pour le contexte de l'extraction"""
+    for msg in reversed(st.session_state.messages):
+        if msg["role"] == "assistant":
+            return msg["content"]
+    return ""
+
+def stream_with_speech(stream):
+    """
+    Relaie le flux de la réponse en lançant la synthèse vocale de chaque phrase
+    dès qu'elle est terminée : l'audio est prêt (en cache) quand la réponse
+    est lue après le rechargement de la page.
+    """
+    pipeline = SpeechPipeline()
+    for chunk in stream:
+        pipeline.feed(chunk)
+        yield chunk
+    pipeline.finish()
+
+def run_assistant_turn(job: Job, api_messages, manager, user_message: str, last_question: str,
+                       speech_enabled: bool, extraction_future=None) -> str:
+    """
+    Met à jour la fiche (si le mode est activé) et génère la réponse du chatbot,
+    dans le thread de la session (tâche "reply").
+    
+    Toute lecture de la fiche se fait ici, quand aucune extraction ne la modifie :
+    l'extraction déjà lancée pendant la transcription (message vocal) est
+    attendue, puis le contexte de la fiche est figé dans le prompt système
+    avant de lancer l'extraction du message. La réponse est donc générée avec
+    l'état de la fiche connu avant l'extraction du message, et publiée dans
+    job.partial au fil du streaming pendant que l'extraction tourne sur la
+    boucle asyncio d'arrière-plan. L'extraction est attendue avant de rendre la
+    réponse, pour que la fiche soit à jour quand la réponse s'affiche.
+    
+    Args:
+        job: Tâche en cours
+        api_messages: Historique de la conversation (message de l'utilisateur compris)
+        manager: Fiche à mettre à jour (None si le mode fiche est désactivé)
+        user_message: Message de l'utilisateur
+        last_question: Dernier message de l'assistant, contexte de l'extraction
+        speech_enabled: Synthèse vocale pendant la génération
+        extraction_future: Extraction lancée pendant la transcription (message vocal)
+    
+    Returns:
+        La réponse complète
+    """
+    if manager:
+        if extraction_future:
+            # Extraction des segments du mémo : la fiche doit être stable avant d'être lue
+            extraction_future.exception()
+        api_messages = [create_fiche_system_message(manager)] + api_messages
+        if extraction_future is None:
+            extraction_future = submit_coroutine(manager.aupdate_from_conversation(
+                user_message,
+                last_question=last_question
+            ))
+    
     try:
-        subprocess.run(['ffmpeg', '-version'], 
-                      capture_output=True, 
-                      check=True,
-                      timeout=5)
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-        return False
+        stream = stream_chat_response(api_messages)
+        if speech_enabled:
+            # Synthèse vocale phrase par phrase, pendant la génération
+            stream = stream_with_speech(stream)
+        for chunk in stream:
+            job.partial += chunk
+        response = job.partial
+    except Exception as e:
+        response = f"❌ Erreur: {str(e)}"
+    
+    if extraction_future:
+        try:
+            champs_mis_a_jour = extraction_future.result()
+            if champs_mis_a_jour:
+                print(f"✅ Champs mis à jour: {', '.join(champs_mis_a_jour)}")
+        except Exception as e:
+            print(f"❌ Erreur lors de l'extraction: {e}")
+    
+    return response
+
+def submit_assistant_turn(user_message: str, extraction_future=None):
+    """
+    Ajoute la réponse du chatbot à la file de la session, sans attendre.
+    La fiche n'est pas lue ici : le prompt système est construit dans la tâche
+    (run_assistant_turn), quand aucune extraction n'est en cours.
+    
+    Args:
+        user_message: Message de l'utilisateur (déjà ajouté à l'historique)
+        extraction_future: Extraction déjà lancée pendant la transcription
+            (message vocal) ; sinon elle est lancée par la tâche
+    """
+    manager = st.session_state.fiche_manager if st.session_state.fiche_mode else None
+    
+    # Préparer les messages pour l'API
+    api_messages = [
+        {"role": msg["role"], "content": msg["content"]} 
+        for msg in st.session_state.messages
+    ]
+    
+    # L'historique visé est gardé avec la tâche : si la conversation est
+    # effacée entre-temps, la réponse n'y est pas ajoutée
+    st.session_state.jobs.submit(
+        Job("reply", "💭 ...", history=st.session_state.messages),
+        run_assistant_turn,
+        api_messages,
+        manager,
+        user_message,
+        get_last_assistant_message(),
+        st.session_state.text_to_speech_enabled,
+        extraction_future
+    )
+
+def start_user_turn(user_message: str, extraction_future=None, transcription: bool = False):
+    """
+    Ajoute le message de l'utilisateur à l'historique et lance la réponse,
+    sauf si le message vient d'activer le mode fiche (le message d'accueil
+    de la fiche tient lieu de réponse).
+    
+    Args:
+        user_message: Message (ou transcription) de l'utilisateur
+        extraction_future: Extraction déjà lancée pendant la transcription
+        transcription: True si le message vient d'un audio
+    """
+    message = {"role": "user", "content": user_message}
+    if transcription:
+        message["transcription"] = user_message
+    st.session_state.messages.append(message)
+    
+    # Détection automatique d'intention de créer une fiche
+    if auto_detect_and_activate_fiche_mode(user_message):
+        return
+    
+    # Mettre à jour la fiche et générer la réponse du chatbot (en arrière-plan)
+    submit_assistant_turn(user_message, extraction_future)
+
+def process_text_message(message_to_process: str):
+    """
+    Traite un message texte : choix du type de fiche si besoin, puis lancement
+    de la réponse. Recharge la page si le message a initialisé une fiche.
+    """
+    # Vérifier si le mode fiche est activé sans manager initialisé
+    if st.session_state.fiche_mode and st.session_state.fiche_manager is None:
+        # Auto-créer un manager en mode sélection
+        keywords = ["fiche", "chantier", "défaut", "anomalie", "contrôle", "maintenance", "mes"]
+        if any(keyword in message_to_process.lower() for keyword in keywords):
+            # Essayer de détecter le type de fiche
+            detected_type = detect_fiche_type_from_message(message_to_process)
+            
+            if detected_type:
+                # Type détecté : créer directement la bonne fiche
+                st.session_state.fiche_manager = FicheDefautChatManager(fiche_type=detected_type)
+            else:
+                # Type non détecté : créer en mode sélection
+                st.session_state.fiche_manager = FicheDefautChatManager()
+            
+            initial_msg = get_initial_fiche_message(st.session_state.fiche_manager)
+            st.session_state.messages = [{"role": "assistant", "content": initial_msg}]
+            st.rerun()
+    
+    # Si le manager est en mode sélection, vérifier si l'utilisateur choisit un type
+    if (st.session_state.fiche_mode and 
+        st.session_state.fiche_manager and 
+        st.session_state.fiche_manager.mode == "selection"):
+        
+        detected_type = detect_fiche_type_from_message(message_to_process)
+        if detected_type:
+            # Type détecté : initialiser la fiche
+            st.session_state.fiche_manager.set_fiche_type(detected_type)
+            initial_msg = get_initial_fiche_message(st.session_state.fiche_manager)
+            st.session_state.messages = [{"role": "assistant", "content": initial_msg}]
+            st.rerun()
+    
+    start_user_turn(message_to_process)
+
+def collect_finished_job(job: Job):
+    """
+    Intègre le résultat d'une tâche terminée à la conversation.
+    - transcription : le texte devient le message de l'utilisateur et la réponse est lancée
+    - reply : la réponse est ajoutée à l'historique (s'il n'a pas été effacé entre-temps)
+    """
+    if job.kind == "transcription":
+        try:
+            transcription, extraction_future = job.result()
+        except Exception as e:
+            st.error(f"❌ Erreur lors de la transcription: {str(e)}")
+            return
+        if transcription:
+            start_user_turn(transcription, extraction_future, transcription=True)
+        return
+    
+    try:
+        response = job.result()
+    except Exception as e:
+        response = f"❌ Erreur: {str(e)}"
+    if job.context["history"] is st.session_state.messages:
+        st.session_state.messages.append({"role": "assistant", "content": response})
 
 # Configuration de la page
 st.set_page_config(
@@ -144,12 +325,18 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Vérifier ffmpeg au démarrage
-if not check_ffmpeg():
+# Vérifier qu'un décodeur audio est disponible (PyAV ou ffmpeg), sans lancer de processus
+if not decoder_available():
     st.error("""
-    ⚠️ **ffmpeg n'est pas installé sur votre système**
+    ⚠️ **Aucun décodeur audio n'est installé sur votre système**
+    
+    **Installez PyAV (décodage en mémoire, recommandé) :**
+    
+    ```bash
+    pip install av
+    ```
     
-    **Pour installer ffmpeg, exécutez dans votre terminal :**
+    **Ou installez ffmpeg, en exécutant dans votre terminal :**
     
     ```bash
     sudo apt-get update
@@ -164,13 +351,24 @@ if not check_ffmpeg():
     """)
     st.stop()
 
-# Initialisation du modèle Whisper (une seule fois)
+# Service de transcription Whisper partagé : le modèle est chargé une seule fois,
+# dans un processus dédié, pour toutes les sessions et tous les processus serveur
 @st.cache_resource
-def load_whisper_model():
-    """Charge le modèle Whisper (base model pour un bon équilibre vitesse/qualité)"""
-    import torch
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    return whisper.load_model("tiny", device=device)
+def start_transcription_worker():
+    """Démarre le service de transcription (une seule fois par processus)"""
+    ensure_worker_started()
+    return True
+
+start_transcription_worker()
+
+# Pré-génération de la synthèse vocale des questions et messages fixes des fiches
+@st.cache_resource
+def prewarm_speech_cache():
+    """Lance la pré-génération en arrière-plan (une seule fois par processus)"""
+    prewarm(get_fixed_prompts())
+    return True
+
+prewarm_speech_cache()
 
 # Initialisation de l'historique de conversation
 if "messages" not in st.session_state:
@@ -204,6 +402,14 @@ if "should_process_message" not in st.session_state:
 if "text_to_speech_enabled" not in st.session_state:
     st.session_state.text_to_speech_enabled = True  # Activé par défaut
 
+# File de tâches de la session (transcription, réponse) : le travail en cours
+# continue pendant la saisie et survit aux rechargements de la page
+if "jobs" not in st.session_state:
+    st.session_state.jobs = SessionJobs()
+# Messages envoyés pendant qu'une tâche tourne, traités dans l'ordre ensuite
+if "pending_inputs" not in st.session_state:
+    st.session_state.pending_inputs = []
+
 # Fonction callback pour l'envoi par Entrée
 def on_text_input_change():
     """Appelé quand l'utilisateur appuie sur Entrée dans le champ de saisie"""
@@ -212,127 +418,115 @@ def on_text_input_change():
         st.session_state.pending_message = current_input.strip()
         st.session_state.should_process_message = True
 
-# Fonction pour transcrire un fichier audio
-def transcribe_audio(audio_path):
-    """Transcrit un fichier audio en texte"""
-    model = load_whisper_model()
-    result = model.transcribe(audio_path)
-    return result["text"]
-
-# Fonction pour retirer les emojis du texte
-def remove_emojis(text):
-    """Supprime les emojis du texte"""
-    # Pattern pour détecter les emojis
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-        "\U00002702-\U000027B0"
-        "\U000024C2-\U0001F251"
-        "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
-        "\U0001FA00-\U0001FA6F"  # Chess Symbols
-        "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
-        "\U00002600-\U000026FF"  # Miscellaneous Symbols
-        "\U00002700-\U000027BF"  # Dingbats
-        "]+", 
-        flags=re.UNICODE
-    )
-    return emoji_pattern.sub(r'', text)
-
-def clean_text_for_speech(text):
+async def _extract_after(previous, manager, text: str, last_question: str):
     """
-    Nettoie le texte pour la synthèse vocale en supprimant :
-    - Les caractères de formatage Markdown (*, _, **, __, etc.)
-    - Les guillemets spéciaux (" " « »)
-    - Les crochets et parenthèses de liens Markdown
-    - Les caractères spéciaux qui ne doivent pas être lus
-    """
-    # Supprimer les emojis d'abord
-    text = remove_emojis(text)
-    
-    # Supprimer les blocs de code markdown (```...```)
-    text = re.sub(r'```[\s\S]*?```', '', text)
-    
-    # Supprimer les codes inline (`...`)
-    text = re.sub(r'`([^`]+)`', r'\1', text)
-    
-    # Supprimer les liens Markdown [texte](url) en gardant juste le texte
-    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-    
-    # Supprimer les images ![alt](url)
-    text = re.sub(r'!\[([^\]]*)\]\([^\)]+\)', '', text)
-    
-    # Supprimer les caractères de formatage gras/italique
-    # ** ou __ pour gras
-    text = re.sub(r'\*\*([^\*]+)\*\*', r'\1', text)
-    text = re.sub(r'__([^_]+)__', r'\1', text)
-    
-    # * ou _ pour italique
-    text = re.sub(r'\*([^\*]+)\*', r'\1', text)
-    text = re.sub(r'_([^_]+)_', r'\1', text)
+    Extrait les champs d'un segment de transcription après l'extraction du
+    segment précédent : les mises à jour de la fiche restent dans l'ordre du mémo.
     
-    # Supprimer les astérisques isolés qui restent
-    text = re.sub(r'\*+', '', text)
-    text = re.sub(r'_+', '', text)
-    
-    # Remplacer les guillemets spéciaux par des guillemets simples (puis les supprimer)
-    text = text.replace('"', '').replace('"', '')
-    text = text.replace('«', '').replace('»', '')
-    text = text.replace('"', '')
-    
-    # Supprimer les # pour les titres
-    text = re.sub(r'#{1,6}\s+', '', text)
-    
-    # Supprimer les > pour les citations
-    text = re.sub(r'^\s*>\s+', '', text, flags=re.MULTILINE)
-    
-    # Supprimer les - ou * en début de ligne (listes)
-    text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)
+    Returns:
+        Liste cumulée des champs mis à jour
+    """
+    updated = []
+    if previous is not None:
+        try:
+            updated = await asyncio.wrap_future(previous)
+        except Exception as e:
+            print(f"❌ Erreur lors de l'extraction: {e}")
+    return updated + await manager.aupdate_from_conversation(text, last_question=last_question)
+
+# Transcription d'un fichier audio (tâche "transcription" de la file de la session)
+def run_transcription(job: Job, audio_bytes, manager, last_question: str):
+    """
+    Transcrit un fichier audio en texte via le service Whisper partagé.
     
-    # Supprimer les numéros de liste (1., 2., etc.)
-    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
+    L'audio est découpé aux silences et transcrit segment par segment : le texte
+    est publié dans job.partial au fur et à mesure et, si une fiche est en cours,
+    chaque segment part à l'extraction des champs sans attendre la fin du mémo.
+    La tâche ne se termine qu'une fois la dernière extraction finie : la fiche
+    n'est plus modifiée quand l'interface la relit pour lancer la réponse.
     
-    # Nettoyer les espaces multiples
-    text = re.sub(r'\s+', ' ', text)
+    Args:
+        job: Tâche en cours
+        audio_bytes: Contenu du fichier audio
+        manager: Fiche à mettre à jour (None si aucune)
+        last_question: Dernière question posée, contexte de l'extraction
     
-    # Nettoyer les sauts de ligne multiples
-    text = re.sub(r'\n\s*\n', '\n', text)
+    Returns:
+        Tuple (transcription complète, future de l'extraction terminée ou None)
+    """
+    texts = []
+    extraction_future = None
+    for chunk in iter_transcription(audio_bytes):
+        if not chunk["text"]:
+            continue
+        texts.append(chunk["text"])
+        job.partial = f"📝 *({chunk['index'] + 1}/{chunk['count']})* {' '.join(texts)}"
+        if manager:
+            extraction_future = submit_coroutine(
+                _extract_after(extraction_future, manager, chunk["text"], last_question)
+            )
     
-    return text.strip()
+    if extraction_future:
+        # Attendre la fin de la chaîne d'extraction (ses erreurs sont relues avec le résultat)
+        job.partial = f"📝 {' '.join(texts)}\n\n⏳ *Mise à jour de la fiche...*"
+        extraction_future.exception()
+    
+    return " ".join(texts), extraction_future
+
+def submit_transcription(audio_bytes):
+    """Ajoute la transcription d'un audio à la file de la session"""
+    manager = st.session_state.fiche_manager if st.session_state.fiche_mode else None
+    if manager and manager.mode == "selection":
+        # Type de fiche pas encore choisi : rien à extraire
+        manager = None
+    st.session_state.jobs.submit(
+        Job("transcription", "🎤 Transcription de l'audio en cours..."),
+        run_transcription,
+        audio_bytes,
+        manager,
+        get_last_assistant_message()
+    )
 
 # Fonction pour synthétiser le texte en audio
-async def text_to_speech_async(text, output_path):
-    """Convertit le texte en audio avec Edge TTS"""
-    # Utiliser une voix française naturelle
-    voice = "fr-FR-DeniseNeural"  # Voix féminine française
-    # voice = "fr-FR-HenriNeural"  # Alternative : voix masculine française
-    
-    communicate = edge_tts.Communicate(text, voice)
-    await communicate.save(output_path)
-
-def text_to_speech(text):
-    """Wrapper synchrone pour la synthèse vocale"""
+def speak(text):
+    """Synthèse vocale d'une réponse (depuis le cache si elle a déjà été lue)"""
     try:
-        # Nettoyer le texte des emojis et caractères de formatage
-        clean_text = clean_text_for_speech(text)
-        
-        if not clean_text:
-            return None
-        
-        # Créer un fichier temporaire pour l'audio
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp_file:
-            output_path = tmp_file.name
-        
-        # Exécuter la synthèse vocale
-        asyncio.run(text_to_speech_async(clean_text, output_path))
-        
-        return output_path
+        return text_to_speech(text)
     except Exception as e:
         st.error(f"Erreur lors de la synthèse vocale: {str(e)}")
         return None
 
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def show_jobs_progress():
+    """
+    Affiche l'avancement de la tâche en cours (transcription, réponse en
+    streaming) et les messages en attente. Seul ce fragment est rafraîchi
+    pendant la tâche ; la page entière est rechargée quand elle est terminée.
+    """
+    job = st.session_state.jobs.current
+    if job is None or job.done:
+        st.rerun()
+    
+    role = "user" if job.kind == "transcription" else "assistant"
+    with st.chat_message(role):
+        st.markdown(job.partial or job.label)
+    
+    for kind, payload in st.session_state.pending_inputs:
+        with st.chat_message("user"):
+            st.markdown(f"⏳ {payload}" if kind == "text" else "⏳ 🎤 Message audio")
+
+# Récupérer le résultat de la tâche terminée, puis traiter les messages en
+# attente dans l'ordre (chaque réponse tient compte de la précédente)
+finished_job = st.session_state.jobs.take_finished()
+if finished_job:
+    collect_finished_job(finished_job)
+while not st.session_state.jobs.busy and st.session_state.pending_inputs:
+    input_kind, payload = st.session_state.pending_inputs.pop(0)
+    if input_kind == "text":
+        process_text_message(payload)
+    else:
+        submit_transcription(payload)
+
 # En-tête avec titre et logos
 col_title, col_spacer, col_logo1, col_logo2 = st.columns([3, 0.5, 0.5, 0.5])
 
@@ -366,21 +560,17 @@ with chat_container:
                 st.session_state.text_to_speech_enabled):
                 
                 with st.spinner("🔊 Génération de l'audio..."):
-                    audio_path = text_to_speech(message["content"])
-                    if audio_path:
+                    audio_bytes = speak(message["content"])
+                    if audio_bytes:
                         # Lire l'audio automatiquement
-                        with open(audio_path, "rb") as audio_file:
-                            audio_bytes = audio_file.read()
-                            st.audio(audio_bytes, format="audio/mp3", autoplay=True)
-                        
-                        # Nettoyer le fichier temporaire
-                        try:
-                            os.unlink(audio_path)
-                        except:
-                            pass
+                        st.audio(audio_bytes, format="audio/mp3", autoplay=True)
                         
                         # Marquer ce message comme lu
                         st.session_state.last_played_message_index = idx
+    
+    # Tâche en cours (transcription, réponse en streaming) et messages en attente
+    if st.session_state.jobs.busy:
+        show_jobs_progress()
 
 # Section pour les modes d'entrée
 st.divider()
@@ -462,253 +652,29 @@ elif st.session_state.should_process_message and st.session_state.pending_messag
     st.session_state.should_process_message = False
     st.session_state.pending_message = None
 
+# Les envois sont mis en file : ils sont traités dès qu'aucune tâche ne tourne
 if message_to_process:
-    # Vérifier si le mode fiche est activé sans manager initialisé
-    if st.session_state.fiche_mode and st.session_state.fiche_manager is None:
-        # Auto-créer un manager en mode sélection
-        keywords = ["fiche", "chantier", "défaut", "anomalie", "contrôle", "maintenance", "mes"]
-        if any(keyword in message_to_process.lower() for keyword in keywords):
-            # Essayer de détecter le type de fiche
-            detected_type = detect_fiche_type_from_message(message_to_process)
-            
-            if detected_type:
-                # Type détecté : créer directement la bonne fiche
-                st.session_state.fiche_manager = FicheDefautChatManager(fiche_type=detected_type)
-            else:
-                # Type non détecté : créer en mode sélection
-                st.session_state.fiche_manager = FicheDefautChatManager()
-            
-            initial_msg = get_initial_fiche_message(st.session_state.fiche_manager)
-            st.session_state.messages = [{"role": "assistant", "content": initial_msg}]
-            st.rerun()
-    
-    # Si le manager est en mode sélection, vérifier si l'utilisateur choisit un type
-    if (st.session_state.fiche_mode and 
-        st.session_state.fiche_manager and 
-        st.session_state.fiche_manager.mode == "selection"):
-        
-        detected_type = detect_fiche_type_from_message(message_to_process)
-        if detected_type:
-            # Type détecté : initialiser la fiche
-            st.session_state.fiche_manager.set_fiche_type(detected_type)
-            initial_msg = get_initial_fiche_message(st.session_state.fiche_manager)
-            st.session_state.messages = [{"role": "assistant", "content": initial_msg}]
-            st.rerun()
-    
-    # Mode texte
-    user_message = message_to_process
-    
-    # Ajouter le message de l'utilisateur à l'historique
-    st.session_state.messages.append({"role": "user", "content": user_message})
-    
-    # Détection automatique d'intention de créer une fiche
-    if auto_detect_and_activate_fiche_mode(user_message):
-        st.rerun()
-    
-    # Mettre à jour la fiche si le mode est activé
-    if st.session_state.fiche_mode and st.session_state.fiche_manager:
-        # Récupérer la dernière question du chatbot pour le contexte
-        last_question = ""
-        if st.session_state.messages:
-            for msg in reversed(st.session_state.messages):
-                if msg["role"] == "assistant":
-                    last_question = msg["content"]
-                    break
-        
-        champs_mis_a_jour = st.session_state.fiche_manager.update_from_conversation(
-            user_message, 
-            last_question=last_question
-        )
-        if champs_mis_a_jour:
-            print(f"✅ Champs mis à jour: {', '.join(champs_mis_a_jour)}")
-    
-    # Générer la réponse du chatbot
-    with st.spinner("🤔 Réflexion en cours..."):
-        try:
-            # Préparer les messages pour l'API
-            api_messages = [
-                {"role": msg["role"], "content": msg["content"]} 
-                for msg in st.session_state.messages
-            ]
-            
-            # Ajouter le contexte de la fiche si le mode est activé
-            if st.session_state.fiche_mode and st.session_state.fiche_manager:
-                system_msg = create_fiche_system_message(st.session_state.fiche_manager)
-                api_messages = [system_msg] + api_messages
-            
-            # Obtenir la réponse
-            response = get_chat_response(api_messages)
-            
-            # Ajouter la réponse à l'historique
-            st.session_state.messages.append({"role": "assistant", "content": response})
-            
-        except Exception as e:
-            error_msg = f"❌ Erreur: {str(e)}"
-            st.session_state.messages.append({"role": "assistant", "content": error_msg})
+    st.session_state.pending_inputs.append(("text", message_to_process))
     
     # Vider le champ de saisie en changeant la clé
     st.session_state.text_input_key += 1
-    
-    # Recharger la page pour afficher les nouveaux messages
     st.rerun()
 
 elif send_audio_file and uploaded_file is not None:
     # Mode fichier audio uploadé
-    with st.spinner("🎤 Transcription de l'audio en cours..."):
-        try:
-            # Sauvegarder temporairement le fichier
-            with tempfile.NamedTemporaryFile(delete=False, suffix=Path(uploaded_file.name).suffix) as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                tmp_path = tmp_file.name
-            
-            try:
-                # Transcrire l'audio
-                transcription = transcribe_audio(tmp_path)
-                
-                # Ajouter le message de l'utilisateur avec transcription
-                st.session_state.messages.append({
-                    "role": "user", 
-                    "content": transcription,
-                    "transcription": transcription
-                })
-                
-                # Détection automatique d'intention de créer une fiche
-                if auto_detect_and_activate_fiche_mode(transcription):
-                    st.rerun()
-                
-                # Mettre à jour la fiche si le mode est activé
-                if st.session_state.fiche_mode and st.session_state.fiche_manager:
-                    # Récupérer la dernière question du chatbot pour le contexte
-                    last_question = ""
-                    if st.session_state.messages:
-                        for msg in reversed(st.session_state.messages):
-                            if msg["role"] == "assistant":
-                                last_question = msg["content"]
-                                break
-                    
-                    champs_mis_a_jour = st.session_state.fiche_manager.update_from_conversation(
-                        transcription,
-                        last_question=last_question
-                    )
-                    if champs_mis_a_jour:
-                        print(f"✅ Champs mis à jour: {', '.join(champs_mis_a_jour)}")
-                
-                # Générer la réponse du chatbot
-                with st.spinner("🤔 Réflexion en cours..."):
-                    try:
-                        # Préparer les messages pour l'API
-                        api_messages = [
-                            {"role": msg["role"], "content": msg["content"]} 
-                            for msg in st.session_state.messages
-                        ]
-                        
-                        # Ajouter le contexte de la fiche si le mode est activé
-                        if st.session_state.fiche_mode and st.session_state.fiche_manager:
-                            system_msg = create_fiche_system_message(st.session_state.fiche_manager)
-                            api_messages = [system_msg] + api_messages
-                        
-                        # Obtenir la réponse
-                        response = get_chat_response(api_messages)
-                        
-                        # Ajouter la réponse à l'historique
-                        st.session_state.messages.append({"role": "assistant", "content": response})
-                        
-                    except Exception as e:
-                        error_msg = f"❌ Erreur: {str(e)}"
-                        st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                
-            finally:
-                # Nettoyer le fichier temporaire
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
-            
-            # Vider la zone de fichier en changeant la clé
-            st.session_state.audio_upload_key += 1
-            
-            # Recharger la page
-            st.rerun()
-            
-        except Exception as e:
-            st.error(f"❌ Erreur lors de la transcription: {str(e)}")
+    st.session_state.pending_inputs.append(("audio", uploaded_file.getvalue()))
+    
+    # Vider la zone de fichier en changeant la clé
+    st.session_state.audio_upload_key += 1
+    st.rerun()
 
 elif send_recording and audio_recording is not None:
     # Mode enregistrement audio
-    with st.spinner("🎤 Transcription de l'enregistrement en cours..."):
-        try:
-            # Sauvegarder temporairement le fichier audio
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-                tmp_file.write(audio_recording.read())
-                tmp_path = tmp_file.name
-            
-            try:
-                # Transcrire l'audio
-                transcription = transcribe_audio(tmp_path)
-                
-                # Ajouter le message de l'utilisateur avec transcription
-                st.session_state.messages.append({
-                    "role": "user", 
-                    "content": transcription,
-                    "transcription": transcription
-                })
-                
-                # Détection automatique d'intention de créer une fiche
-                if auto_detect_and_activate_fiche_mode(transcription):
-                    st.rerun()
-                
-                # Mettre à jour la fiche si le mode est activé
-                if st.session_state.fiche_mode and st.session_state.fiche_manager:
-                    # Récupérer la dernière question du chatbot pour le contexte
-                    last_question = ""
-                    if st.session_state.messages:
-                        for msg in reversed(st.session_state.messages):
-                            if msg["role"] == "assistant":
-                                last_question = msg["content"]
-                                break
-                    
-                    champs_mis_a_jour = st.session_state.fiche_manager.update_from_conversation(
-                        transcription,
-                        last_question=last_question
-                    )
-                    if champs_mis_a_jour:
-                        print(f"✅ Champs mis à jour: {', '.join(champs_mis_a_jour)}")
-                
-                # Générer la réponse du chatbot
-                with st.spinner("🤔 Réflexion en cours..."):
-                    try:
-                        # Préparer les messages pour l'API
-                        api_messages = [
-                            {"role": msg["role"], "content": msg["content"]} 
-                            for msg in st.session_state.messages
-                        ]
-                        
-                        # Ajouter le contexte de la fiche si le mode est activé
-                        if st.session_state.fiche_mode and st.session_state.fiche_manager:
-                            system_msg = create_fiche_system_message(st.session_state.fiche_manager)
-                            api_messages = [system_msg] + api_messages
-                        
-                        # Obtenir la réponse
-                        response = get_chat_response(api_messages)
-                        
-                        # Ajouter la réponse à l'historique
-                        st.session_state.messages.append({"role": "assistant", "content": response})
-                        
-                    except Exception as e:
-                        error_msg = f"❌ Erreur: {str(e)}"
-                        st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                
-            finally:
-                # Nettoyer le fichier temporaire
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
-            
-            # Vider la zone d'enregistrement en changeant la clé
-            st.session_state.audio_recording_key += 1
-            
-            # Recharger la page
-            st.rerun()
-            
-        except Exception as e:
-            st.error(f"❌ Erreur lors de la transcription: {str(e)}")
+    st.session_state.pending_inputs.append(("audio", audio_recording.getvalue()))
+    
+    # Vider la zone d'enregistrement en changeant la clé
+    st.session_state.audio_recording_key += 1
+    st.rerun()
 
 # Sidebar avec informations et actions
 with st.sidebar:
@@ -849,12 +815,16 @@ with st.sidebar:
                 
                 # Bouton pour afficher le détail
                 with st.expander("📊 Détails de la fiche"):
-                    st.markdown(st.session_state.fiche_manager.get_completion_summary())
+                    if st.session_state.jobs.busy:
+                        # L'extraction peut modifier la fiche pendant la lecture
+                        st.caption("⏳ Mise à jour de la fiche en cours...")
+                    else:
+                        st.markdown(st.session_state.fiche_manager.get_completion_summary())
             else:
                 st.warning("⏳ En attente de sélection du type de fiche...")
             
-            # Boutons pour exporter
-            if completude >= 100:
+            # Boutons pour exporter (fiche stable : aucune extraction en cours)
+            if completude >= 100 and not st.session_state.jobs.busy:
                 st.success("✅ Fiche complète à 100% !")
                 
                 # Export TXT
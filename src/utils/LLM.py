@@ -1,49 +1,123 @@
-from openai import AzureOpenAI
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
-
-# Vérification des variables d'environnement
-api_key = os.getenv("AZURE_OPENAI_API_KEY")
-azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-
-if not api_key:
-    raise ValueError("AZURE_OPENAI_API_KEY n'est pas définie dans les variables d'environnement")
-if not azure_endpoint:
-    raise ValueError("AZURE_OPENAI_ENDPOINT n'est pas définie dans les variables d'environnement")
-
-client = AzureOpenAI(
-    api_key=api_key,
-    api_version="2024-02-15-preview",
-    azure_endpoint=azure_endpoint
-)
+from utils.azure_client import create_chat_completion, acreate_chat_completion, stream_chat_completion
 
 def get_response(prompt):
     """Fonction de compatibilité pour un prompt simple"""
     return get_chat_response([{"role": "user", "content": prompt}])
 
+def _format_api_error(e):
+    """Construit le message d'erreur affiché pour un échec d'appel Azure OpenAI"""
+    error_msg = f"Erreur lors de l'appel à l'API Azure OpenAI: {str(e)}"
+    if "401" in str(e) or "Unauthorized" in str(e):
+        error_msg += "\nVérifiez que votre clé API (AZURE_OPENAI_API_KEY) est valide et que votre endpoint (AZURE_OPENAI_ENDPOINT) est correct."
+    return error_msg
+
 def get_chat_response(messages):
     """
     Génère une réponse du chatbot basée sur l'historique de conversation
-    
+
+    Args:
+        messages: Liste de dictionnaires avec 'role' ('user' ou 'assistant') et 'content'
+
+    Returns:
+        str: La réponse du chatbot
+    """
+    try:
+        response = create_chat_completion(
+            model="gpt-4o",
+            messages=messages
+        )
+        return response.choices[0].message.content
+    except Exception as e:
+        raise Exception(_format_api_error(e)) from e
+
+async def aget_chat_response(messages):
+    """
+    Version asynchrone de get_chat_response, pour lancer plusieurs appels en parallèle
+
     Args:
         messages: Liste de dictionnaires avec 'role' ('user' ou 'assistant') et 'content'
-    
+
     Returns:
         str: La réponse du chatbot
     """
     try:
-        response = client.chat.completions.create(
+        response = await acreate_chat_completion(
             model="gpt-4o",
             messages=messages
         )
         return response.choices[0].message.content
     except Exception as e:
-        error_msg = f"Erreur lors de l'appel à l'API Azure OpenAI: {str(e)}"
-        if "401" in str(e) or "Unauthorized" in str(e):
-            error_msg += "\nVérifiez que votre clé API (AZURE_OPENAI_API_KEY) est valide et que votre endpoint (AZURE_OPENAI_ENDPOINT) est correct."
-        raise Exception(error_msg) from e
+        raise Exception(_format_api_error(e)) from e
+
+def _json_schema_format(schema, schema_name):
+    """Paramètre response_format des sorties structurées (schéma JSON strict)"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema_name, "schema": schema, "strict": True}
+    }
+
+def get_structured_response(messages, schema, schema_name):
+    """
+    Génère une réponse JSON conforme à un schéma (sorties structurées,
+    API Azure OpenAI 2024-08-01-preview ou plus récente)
+
+    Args:
+        messages: Liste de dictionnaires avec 'role' ('user' ou 'assistant') et 'content'
+        schema: Schéma JSON de la réponse (mode strict)
+        schema_name: Nom du schéma (lettres, chiffres, _ et -)
+
+    Returns:
+        str: Le JSON renvoyé par le modèle (vide si le modèle refuse de répondre)
+    """
+    try:
+        response = create_chat_completion(
+            model="gpt-4o",
+            messages=messages,
+            response_format=_json_schema_format(schema, schema_name)
+        )
+        return response.choices[0].message.content or ""
+    except Exception as e:
+        raise Exception(_format_api_error(e)) from e
+
+async def aget_structured_response(messages, schema, schema_name):
+    """
+    Version asynchrone de get_structured_response
+
+    Args:
+        messages: Liste de dictionnaires avec 'role' ('user' ou 'assistant') et 'content'
+        schema: Schéma JSON de la réponse (mode strict)
+        schema_name: Nom du schéma (lettres, chiffres, _ et -)
+
+    Returns:
+        str: Le JSON renvoyé par le modèle (vide si le modèle refuse de répondre)
+    """
+    try:
+        response = await acreate_chat_completion(
+            model="gpt-4o",
+            messages=messages,
+            response_format=_json_schema_format(schema, schema_name)
+        )
+        return response.choices[0].message.content or ""
+    except Exception as e:
+        raise Exception(_format_api_error(e)) from e
+
+def stream_chat_response(messages):
+    """
+    Génère la réponse du chatbot en streaming, fragment par fragment
+
+    Args:
+        messages: Liste de dictionnaires avec 'role' ('user' ou 'assistant') et 'content'
+
+    Yields:
+        str: Les fragments de texte de la réponse au fur et à mesure de leur génération
+    """
+    try:
+        for chunk in stream_chat_completion(model="gpt-4o", messages=messages):
+            # Azure envoie des fragments sans choix (résultats du filtrage de contenu)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        raise Exception(_format_api_error(e)) from e
 
 
 #if __name__ == "__main__":
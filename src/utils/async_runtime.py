@@ -0,0 +1,50 @@
+"""
+Boucle asyncio persistante exécutée dans un thread d'arrière-plan
+Permet au script Streamlit (synchrone) de lancer des coroutines sans recréer
+une boucle d'événements, ni les clients qui y sont liés, à chaque message
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Coroutine, Optional
+
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Retourne la boucle d'arrière-plan du processus (démarrée au premier appel).
+
+    Returns:
+        La boucle asyncio qui tourne dans un thread démon dédié
+    """
+    global _loop
+
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="async-runtime",
+                    daemon=True
+                )
+                thread.start()
+                _loop = loop
+
+    return _loop
+
+
+def submit_coroutine(coro: Coroutine) -> Future:
+    """
+    Planifie une coroutine sur la boucle d'arrière-plan.
+
+    Args:
+        coro: Coroutine à exécuter
+
+    Returns:
+        Future (concurrent.futures) portant le résultat de la coroutine
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop())
@@ -0,0 +1,134 @@
+"""
+Décodage en mémoire des enregistrements audio pour Whisper
+Les octets reçus de st.audio_input / st.file_uploader sont convertis
+directement en échantillons mono float32 à 16 kHz : pas de fichier temporaire,
+et pas de processus ffmpeg tant que PyAV est installé (ou que le clip est un WAV PCM)
+  - WAV PCM : module wave de la bibliothèque standard
+  - autres formats (mp3, m4a...) : PyAV (pip install av), sinon ffmpeg par tube
+"""
+
+import io
+import shutil
+import subprocess
+import wave
+from functools import lru_cache
+
+import numpy as np
+
+# Fréquence d'échantillonnage attendue par Whisper
+SAMPLE_RATE = 16000
+
+
+@lru_cache(maxsize=1)
+def _has_pyav() -> bool:
+    """Indique si PyAV est installé"""
+    try:
+        import av  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def decoder_available() -> bool:
+    """
+    Indique si les formats compressés (mp3, m4a...) peuvent être décodés :
+    PyAV installé, ou à défaut ffmpeg présent dans le PATH.
+    Les enregistrements WAV sont toujours décodables.
+    """
+    return _has_pyav() or shutil.which("ffmpeg") is not None
+
+
+def _resample(samples: np.ndarray, source_rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Rééchantillonne un signal mono.
+    Rapport entier (48 kHz -> 16 kHz) : moyenne par blocs, qui filtre aussi le
+    repliement ; sinon interpolation linéaire.
+    """
+    if source_rate == target_rate:
+        return samples
+    if source_rate % target_rate == 0:
+        factor = source_rate // target_rate
+        usable = len(samples) // factor * factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1)
+    duration = len(samples) / source_rate
+    target_times = np.arange(int(duration * target_rate)) / target_rate
+    source_times = np.arange(len(samples)) / source_rate
+    return np.interp(target_times, source_times, samples)
+
+
+def _decode_wav(data: bytes) -> np.ndarray:
+    """Décode un WAV PCM (8, 16, 24 ou 32 bits) avec le module wave"""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+        source_rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+
+    if sample_width == 1:
+        # PCM 8 bits : non signé
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+    elif sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        values = raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16)
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        samples = values.astype(np.float32) / (1 << 23)
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / (1 << 31)
+    else:
+        raise wave.Error(f"Taille d'échantillon non gérée: {sample_width} octets")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return _resample(samples, source_rate)
+
+
+def _decode_pyav(data: bytes) -> np.ndarray:
+    """Décode n'importe quel format reconnu par FFmpeg, en mémoire, avec PyAV"""
+    import av
+
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+    parts = []
+    with av.open(io.BytesIO(data), mode="r") as container:
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                parts.append(resampled.to_ndarray().reshape(-1))
+    # Vider le tampon du rééchantillonneur
+    for resampled in resampler.resample(None):
+        parts.append(resampled.to_ndarray().reshape(-1))
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+
+def _decode_ffmpeg_pipe(data: bytes) -> np.ndarray:
+    """Dernier recours sans PyAV : ffmpeg lit et écrit par tubes (aucun fichier sur disque)"""
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+        input=data,
+        capture_output=True,
+        check=True
+    )
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def decode_audio(data: bytes) -> np.ndarray:
+    """
+    Décode un enregistrement audio en mémoire.
+
+    Args:
+        data: Contenu du fichier audio (wav, mp3, m4a...)
+
+    Returns:
+        Échantillons mono float32 à 16 kHz, prêts pour Whisper
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            return _decode_wav(data).astype(np.float32, copy=False)
+        except (wave.Error, EOFError, ValueError):
+            # WAV compressé ou flottant : on passe par le décodeur générique
+            pass
+
+    if _has_pyav():
+        return _decode_pyav(data)
+    return _decode_ffmpeg_pipe(data)
@@ -0,0 +1,130 @@
+"""
+Découpage de l'audio aux silences (détection d'activité vocale par énergie)
+Les longs mémos vocaux sont découpés en segments de parole transcrits l'un
+après l'autre : le texte des premiers segments est disponible pendant que la
+suite est encore en cours de décodage
+"""
+
+import os
+from typing import List, NamedTuple
+
+import numpy as np
+
+# Fréquence d'échantillonnage attendue par Whisper
+SAMPLE_RATE = 16000
+# Durée d'une trame d'analyse de l'énergie
+FRAME_MS = 30
+# Silence minimum pour couper entre deux segments
+MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "500"))
+# Durée minimum d'un segment avant de chercher un silence où couper
+MIN_CHUNK_SECONDS = float(os.getenv("VAD_MIN_CHUNK_SECONDS", "8"))
+# Durée maximum d'un segment : fenêtre d'analyse de Whisper
+MAX_CHUNK_SECONDS = 30.0
+# Seuil de parole : énergie du bruit de fond multipliée par ce facteur...
+SPEECH_THRESHOLD_RATIO = 3.0
+# ... sans dépasser cette fraction de l'énergie de la parole (dictée sans pauses)
+SPEECH_LEVEL_RATIO = 0.25
+# Seuil absolu en dessous duquel une trame est toujours du silence
+MIN_SPEECH_RMS = 0.005
+# Marge de silence conservée autour de la parole (évite de couper une syllabe)
+PADDING_MS = 200
+
+
+class AudioChunk(NamedTuple):
+    """Segment de parole à transcrire"""
+    start: float         # Début dans l'enregistrement (s)
+    end: float           # Fin dans l'enregistrement (s)
+    samples: np.ndarray  # Échantillons float32 à 16 kHz
+
+
+def _frame_energies(samples: np.ndarray, frame_size: int) -> np.ndarray:
+    """Énergie RMS de chaque trame complète"""
+    frame_count = len(samples) // frame_size
+    frames = samples[:frame_count * frame_size].reshape(frame_count, frame_size)
+    return np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+
+def speech_frames(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Indique pour chaque trame de FRAME_MS si elle contient de la parole.
+    Le seuil s'adapte au bruit de fond (10e centile de l'énergie) et au niveau
+    de la parole (90e centile) de l'enregistrement.
+
+    Args:
+        samples: Échantillons mono float32
+        sample_rate: Fréquence d'échantillonnage
+
+    Returns:
+        Tableau booléen, une valeur par trame
+    """
+    frame_size = sample_rate * FRAME_MS // 1000
+    energies = _frame_energies(samples, frame_size)
+    if len(energies) == 0:
+        return np.zeros(0, dtype=bool)
+
+    noise_floor, speech_level = np.percentile(energies, [10, 90])
+    threshold = max(MIN_SPEECH_RMS, min(noise_floor * SPEECH_THRESHOLD_RATIO,
+                                        speech_level * SPEECH_LEVEL_RATIO))
+    return energies > threshold
+
+
+def split_on_silence(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[AudioChunk]:
+    """
+    Découpe un enregistrement en segments de parole.
+
+    Un segment est coupé au milieu du premier silence d'au moins MIN_SILENCE_MS
+    une fois qu'il dure MIN_CHUNK_SECONDS, et au plus tard à MAX_CHUNK_SECONDS,
+    sur la trame la moins énergétique. Les segments sans parole sont ignorés.
+
+    Args:
+        samples: Échantillons mono float32
+        sample_rate: Fréquence d'échantillonnage
+
+    Returns:
+        Liste des segments, dans l'ordre de l'enregistrement
+    """
+    frame_size = sample_rate * FRAME_MS // 1000
+    is_speech = speech_frames(samples, sample_rate)
+    frame_count = len(is_speech)
+    if frame_count == 0 or not is_speech.any():
+        return []
+
+    energies = _frame_energies(samples, frame_size)
+    min_silence = max(1, MIN_SILENCE_MS // FRAME_MS)
+    min_chunk = int(MIN_CHUNK_SECONDS * 1000) // FRAME_MS
+    max_chunk = int(MAX_CHUNK_SECONDS * 1000) // FRAME_MS
+    padding = PADDING_MS // FRAME_MS
+
+    # Points de coupe, en trames
+    cuts = [0]
+    silence_start = None
+    for index in range(frame_count):
+        if not is_speech[index]:
+            if silence_start is None:
+                silence_start = index
+            length = index - cuts[-1]
+            if index - silence_start + 1 >= min_silence and length >= min_chunk:
+                cuts.append((silence_start + index + 1) // 2)
+                silence_start = None
+            continue
+        silence_start = None
+        if index - cuts[-1] >= max_chunk:
+            # Pas de silence assez long : coupe sur la trame la plus calme de la 2e moitié
+            window_start = cuts[-1] + max_chunk // 2
+            cuts.append(window_start + int(np.argmin(energies[window_start:index])))
+    cuts.append(frame_count)
+
+    chunks = []
+    for start, end in zip(cuts, cuts[1:]):
+        speech = np.flatnonzero(is_speech[start:end])
+        if len(speech) == 0:
+            continue
+        # Resserrer le segment autour de la parole, avec une marge
+        first = max(start, start + speech[0] - padding)
+        last = min(end, start + speech[-1] + 1 + padding)
+        chunks.append(AudioChunk(
+            start=first * frame_size / sample_rate,
+            end=last * frame_size / sample_rate,
+            samples=samples[first * frame_size:last * frame_size]
+        ))
+    return chunks
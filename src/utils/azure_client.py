@@ -0,0 +1,434 @@
+"""
+Client Azure OpenAI partagé
+Fabrique unique utilisée par le chat, l'extraction NER et l'OCR Vision :
+réutilisation des connexions HTTP (keep-alive), limitation du nombre
+de requêtes simultanées, respect des quotas RPM/TPM du déploiement Azure
+et relances coordonnées sur les erreurs transitoires
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, asynccontextmanager
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from openai import AzureOpenAI, AsyncAzureOpenAI, APIConnectionError, APIStatusError, RateLimitError
+from dotenv import load_dotenv
+
+from utils.rate_limiter import estimate_request_tokens, get_rate_limiter
+
+load_dotenv()
+
+# Configuration (surchargeable par variables d'environnement)
+# Les sorties structurées (response_format json_schema) demandent 2024-08-01-preview ou plus
+API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-08-01-preview")
+MAX_CONCURRENT_REQUESTS = int(os.getenv("AZURE_OPENAI_MAX_CONCURRENCY", "8"))
+KEEPALIVE_EXPIRY = float(os.getenv("AZURE_OPENAI_KEEPALIVE_EXPIRY", "60"))
+REQUEST_TIMEOUT = float(os.getenv("AZURE_OPENAI_TIMEOUT", "120"))
+RETRY_MAX_ATTEMPTS = int(os.getenv("AZURE_OPENAI_RETRY_ATTEMPTS", "6"))
+# Appels interactifs (chat) : peu de relances pour ne pas faire attendre l'utilisateur
+INTERACTIVE_RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_client: Optional[AzureOpenAI] = None
+_http_session: Optional[requests.Session] = None
+
+# Un client asynchrone par boucle d'événements (un AsyncClient httpx est lié à sa boucle)
+_async_clients = weakref.WeakKeyDictionary()
+
+# Nombre maximum d'appels en vol, tous usages confondus (chat, NER, OCR)
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+# Threads qui attendent une place pour les appels asynchrones : l'attente se fait
+# dans la file du sémaphore, au même titre que les appels synchrones
+_slot_waiters = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix="request-slot")
+
+
+def _get_credentials():
+    """Lit et vérifie les variables d'environnement Azure OpenAI"""
+    api_key = os.getenv("AZURE_OPENAI_API_KEY")
+    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+
+    if not api_key:
+        raise ValueError("AZURE_OPENAI_API_KEY n'est pas définie dans les variables d'environnement")
+    if not azure_endpoint:
+        raise ValueError("AZURE_OPENAI_ENDPOINT n'est pas définie dans les variables d'environnement")
+
+    return api_key, azure_endpoint
+
+
+def get_client() -> AzureOpenAI:
+    """
+    Retourne le client Azure OpenAI partagé (créé au premier appel).
+
+    Le client s'appuie sur un pool de connexions httpx persistant :
+    la poignée de main TLS n'est payée qu'une fois par connexion.
+    Les relances automatiques du SDK sont désactivées : elles sont gérées
+    par call_with_retry, qui prévient le planificateur de débit.
+
+    Returns:
+        Instance AzureOpenAI partagée par tout le processus
+    """
+    global _client
+
+    if _client is None:
+        with _lock:
+            if _client is None:
+                api_key, azure_endpoint = _get_credentials()
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONCURRENT_REQUESTS,
+                        max_keepalive_connections=MAX_CONCURRENT_REQUESTS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY
+                    ),
+                    timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=10.0)
+                )
+                _client = AzureOpenAI(
+                    api_key=api_key,
+                    api_version=API_VERSION,
+                    azure_endpoint=azure_endpoint,
+                    http_client=http_client,
+                    max_retries=0
+                )
+
+    return _client
+
+
+def get_async_client() -> AsyncAzureOpenAI:
+    """
+    Retourne le client AsyncAzureOpenAI associé à la boucle asyncio courante.
+
+    Le client est créé une seule fois par boucle : avec la boucle persistante
+    de utils.async_runtime, le pool de connexions est donc réutilisé d'un
+    appel à l'autre.
+
+    Returns:
+        Instance AsyncAzureOpenAI de la boucle courante
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+
+    if client is None:
+        api_key, azure_endpoint = _get_credentials()
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONCURRENT_REQUESTS,
+                max_keepalive_connections=MAX_CONCURRENT_REQUESTS,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=10.0)
+        )
+        client = AsyncAzureOpenAI(
+            api_key=api_key,
+            api_version=API_VERSION,
+            azure_endpoint=azure_endpoint,
+            http_client=http_client,
+            max_retries=0
+        )
+        _async_clients[loop] = client
+
+    return client
+
+
+def get_http_session() -> requests.Session:
+    """
+    Retourne une session HTTP partagée pour les API hors SDK OpenAI
+    (ex: Mistral Document AI), avec le même pool de connexions keep-alive.
+
+    Returns:
+        Session requests partagée
+    """
+    global _http_session
+
+    if _http_session is None:
+        with _lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=MAX_CONCURRENT_REQUESTS,
+                    pool_maxsize=MAX_CONCURRENT_REQUESTS
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+
+    return _http_session
+
+
+@contextmanager
+def request_slot():
+    """
+    Réserve une place parmi les requêtes simultanées autorisées.
+    Bloque tant que MAX_CONCURRENT_REQUESTS appels sont déjà en cours.
+    """
+    _request_slots.acquire()
+    try:
+        yield
+    finally:
+        _request_slots.release()
+
+
+def _release_abandoned_slot(waiter: Future):
+    """Rend une place obtenue pour un appel asynchrone annulé entre-temps"""
+    if not waiter.cancelled() and waiter.exception() is None:
+        _request_slots.release()
+
+
+@asynccontextmanager
+async def async_request_slot():
+    """
+    Équivalent asynchrone de request_slot : partage la même limite que les
+    appels synchrones, sans bloquer la boucle d'événements pendant l'attente.
+    L'attente bloquante se fait dans un thread dédié : la place est obtenue dès
+    qu'elle se libère, dans la même file que les appels synchrones.
+    """
+    waiter = _slot_waiters.submit(_request_slots.acquire)
+    try:
+        await asyncio.wrap_future(waiter)
+    except asyncio.CancelledError:
+        # Tâche annulée pendant l'attente : la place obtenue ensuite est rendue
+        waiter.add_done_callback(_release_abandoned_slot)
+        raise
+    try:
+        yield
+    finally:
+        _request_slots.release()
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Indique si une erreur d'appel est transitoire et mérite une relance :
+    limitation de débit (429), erreur serveur (5xx), timeout ou coupure réseau.
+    """
+    if isinstance(error, (RateLimitError, APIConnectionError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Délai avant la relance numéro `attempt` : en-tête Retry-After envoyé par
+    Azure s'il est présent, sinon backoff exponentiel avec gigue.
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        headers = response.headers
+        try:
+            if headers.get("retry-after-ms"):
+                return min(float(headers["retry-after-ms"]) / 1000, RETRY_MAX_DELAY)
+            if headers.get("retry-after"):
+                return min(float(headers["retry-after"]), RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempt - 1), RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _next_retry_delay(error: Exception, attempt: int, max_attempts: int,
+                      deadline: Optional[float]) -> Optional[float]:
+    """
+    Décide de la relance après un échec.
+
+    Returns:
+        Le délai avant la prochaine tentative, ou None pour abandonner
+    """
+    if attempt >= max_attempts or not is_retryable_error(error):
+        return None
+    delay = _retry_delay(error, attempt)
+    if deadline is not None and time.monotonic() + delay >= deadline:
+        return None
+
+    # Quota dépassé : tous les appels du processus attendent, pas seulement celui-ci
+    if isinstance(error, RateLimitError):
+        get_rate_limiter().pause(delay)
+    print(f"⏳ Erreur transitoire ({type(error).__name__}), nouvelle tentative dans {delay:.1f}s")
+    return delay
+
+
+def call_with_retry(func: Callable[[], T], max_attempts: int = RETRY_MAX_ATTEMPTS,
+                    deadline: Optional[float] = None) -> T:
+    """
+    Exécute func en relançant les erreurs transitoires (voir is_retryable_error).
+
+    Args:
+        func: Fonction sans argument réalisant l'appel
+        max_attempts: Nombre maximum de tentatives
+        deadline: Échéance absolue (time.monotonic()) au-delà de laquelle on abandonne
+
+    Returns:
+        Le résultat de func
+
+    Raises:
+        La dernière erreur si elle n'est pas transitoire, si les tentatives sont
+        épuisées ou si la prochaine relance dépasserait l'échéance
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return func()
+        except Exception as e:
+            delay = _next_retry_delay(e, attempt, max_attempts, deadline)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+
+async def acall_with_retry(func: Callable[[], Awaitable[T]], max_attempts: int = RETRY_MAX_ATTEMPTS,
+                           deadline: Optional[float] = None) -> T:
+    """
+    Version asynchrone de call_with_retry.
+
+    Args:
+        func: Fonction sans argument retournant la coroutine de l'appel
+        max_attempts: Nombre maximum de tentatives
+        deadline: Échéance absolue (time.monotonic()) au-delà de laquelle on abandonne
+
+    Returns:
+        Le résultat de la coroutine
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await func()
+        except Exception as e:
+            delay = _next_retry_delay(e, attempt, max_attempts, deadline)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+
+
+def _estimate_tokens(kwargs) -> int:
+    """Estimation des tokens réservés sur le quota TPM pour ces paramètres"""
+    return estimate_request_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+
+
+def _apply_deadline(kwargs, deadline: Optional[float]):
+    """
+    Copie des paramètres avec un timeout HTTP borné par l'échéance.
+    Appelé une fois la place obtenue : l'attente compte dans le délai.
+    """
+    options = dict(kwargs)
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Délai maximum dépassé avant l'appel")
+        options["timeout"] = min(remaining, REQUEST_TIMEOUT)
+    return options
+
+
+def _parse_raw_response(raw):
+    """Recale le planificateur sur les en-têtes de quota puis retourne la réponse du SDK"""
+    get_rate_limiter().update_from_headers(raw.headers)
+    return raw.parse()
+
+
+def create_chat_completion(**kwargs):
+    """
+    Appelle chat.completions.create sur le client partagé, en respectant
+    les quotas du déploiement et la limite de requêtes simultanées.
+
+    Args:
+        **kwargs: Paramètres transmis tels quels à chat.completions.create
+
+    Returns:
+        La réponse ChatCompletion du SDK
+    """
+    return create_chat_completion_with_retry(max_attempts=INTERACTIVE_RETRY_ATTEMPTS, **kwargs)
+
+
+def create_chat_completion_with_retry(max_attempts: int = RETRY_MAX_ATTEMPTS,
+                                      deadline: Optional[float] = None, **kwargs):
+    """
+    Variante de create_chat_completion pour les traitements batch : relance avec
+    backoff sur 429/5xx et borne la durée totale de l'appel par `deadline`.
+    La place de requête est libérée pendant l'attente entre deux tentatives.
+
+    Args:
+        max_attempts: Nombre maximum de tentatives
+        deadline: Échéance absolue (time.monotonic()), optionnelle
+        **kwargs: Paramètres transmis tels quels à chat.completions.create
+
+    Returns:
+        La réponse ChatCompletion du SDK
+    """
+    client = get_client()
+    tokens = _estimate_tokens(kwargs)
+
+    def attempt():
+        get_rate_limiter().acquire(tokens)
+        with request_slot():
+            raw = client.chat.completions.with_raw_response.create(**_apply_deadline(kwargs, deadline))
+            return _parse_raw_response(raw)
+
+    return call_with_retry(attempt, max_attempts=max_attempts, deadline=deadline)
+
+
+async def acreate_chat_completion(**kwargs):
+    """
+    Version asynchrone de create_chat_completion.
+
+    Args:
+        **kwargs: Paramètres transmis tels quels à chat.completions.create
+
+    Returns:
+        La réponse ChatCompletion du SDK
+    """
+    client = get_async_client()
+    tokens = _estimate_tokens(kwargs)
+
+    async def attempt():
+        await get_rate_limiter().aacquire(tokens)
+        async with async_request_slot():
+            raw = await client.chat.completions.with_raw_response.create(**kwargs)
+            return _parse_raw_response(raw)
+
+    return await acall_with_retry(attempt, max_attempts=INTERACTIVE_RETRY_ATTEMPTS)
+
+
+def stream_chat_completion(**kwargs):
+    """
+    Appelle chat.completions.create en mode streaming sur le client partagé.
+    La place de requête est conservée jusqu'à la fin du flux ; seule
+    l'ouverture du flux est relancée en cas d'erreur transitoire.
+
+    Args:
+        **kwargs: Paramètres transmis tels quels à chat.completions.create
+
+    Yields:
+        Les fragments (ChatCompletionChunk) au fur et à mesure de leur arrivée
+    """
+    client = get_client()
+    tokens = _estimate_tokens(kwargs)
+
+    def open_stream():
+        get_rate_limiter().acquire(tokens)
+        _request_slots.acquire()
+        try:
+            raw = client.chat.completions.with_raw_response.create(stream=True, **kwargs)
+            return _parse_raw_response(raw)
+        except BaseException:
+            _request_slots.release()
+            raise
+
+    stream = call_with_retry(open_stream, max_attempts=INTERACTIVE_RETRY_ATTEMPTS)
+    try:
+        for chunk in stream:
+            yield chunk
+    finally:
+        stream.close()
+        _request_slots.release()
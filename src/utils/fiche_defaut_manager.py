@@ -5,7 +5,9 @@ Support de plusieurs types de fiches
 """
 
 import json
-from typing import Dict, Optional, List
+import re
+from collections import Counter
+from typing import Dict, Optional, List, Set, Tuple
 from pathlib import Path
 import sys
 
@@ -13,15 +15,102 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from utils.ner_defaut_documents import extract_entities_from_defaut_document
+from utils.json_repair import parse_llm_json
+from utils.fiche_rules import (
+    normalize_answer,
+    parse_boolean,
+    parse_duration,
+    parse_field_answer,
+    parse_nothing_to_report,
+    question_sentence
+)
 from utils.fiche_types import (
+    FICHE_INDEX,
+    ChampSpec,
+    SectionSpec,
     FicheType, 
     get_available_fiches, 
     get_fiche_structure,
+    get_fiche_index,
     create_empty_fiche,
-    format_fiche_type_list
+    format_fiche_type_list,
+    label_words
 )
 
 
+# Questions de la fiche de défauts, dans l'ordre où elles sont posées
+DEFAUTS_MES_QUESTIONS = {
+    "nom_chantier": "Quel est le nom du chantier ?",
+    "ao": "Quel est le numéro d'Appel d'Offres (AO) ?",
+    "num_chantier": "Quel est le numéro de chantier ?",
+    "nom_technicien": "Qui est le technicien intervenant ?",
+    "date": "Quelle est la date d'intervention ? (format JJ/MM/AAAA)",
+    "signature": "Le document a-t-il été signé ?"
+}
+DEFAUTS_SECTIONS_ORDRE = [
+    "Partie DC",
+    "Partie AC", 
+    "Partie Communication",
+    "Liaison Equipotentielle / Mesure de terre",
+    "Divers / Remarques"
+]
+DEFAUTS_ANOMALIES_QUESTION = "Pour la section '{section}', as-tu rencontré des anomalies ? (RAS si rien à signaler)"
+DEFAUTS_TEMPS_QUESTION = "Combien de temps as-tu passé sur '{section}' ?"
+# Libellé des cellules du tableau des défauts dans les champs manquants
+DEFAUTS_LIGNE_LABELS = {"anomalies": "anomalies", "temps_passe": "temps"}
+# Mots qui désignent une section du tableau dans une question (comme dans le prompt d'extraction)
+DEFAUTS_SECTION_KEYWORDS = {
+    "Partie DC": ("partie dc",),
+    "Partie AC": ("partie ac",),
+    "Partie Communication": ("communication",),
+    "Liaison Equipotentielle / Mesure de terre": ("liaison equipotentielle", "mesure de terre"),
+    "Divers / Remarques": ("divers", "remarques")
+}
+# Signature de la fiche de défauts : valeur enregistrée pour oui / non
+DEFAUTS_SIGNATURE_VALUES = {True: "présente", False: "absente"}
+
+# Champs déjà remplis gardés dans le prompt d'extraction quand la dernière
+# question les vise (corrections) : libellés les mieux couverts par la question
+# (part minimale de leurs mots présente) et leurs voisins de section
+NEAR_QUESTION_MAX_FIELDS = 3
+NEAR_QUESTION_MIN_OVERLAP = 0.5
+NEAR_QUESTION_NEIGHBOURS = 1
+
+# Dictée groupée ("tout OK sauf serrages armoire AC NOK, terre 12 ohms...") :
+# fiches à longues check-lists concernées, et formule globale qui la déclenche
+# ("tout est OK", "tous les points conformes", "le reste NA"), suivie ou non
+# d'une liste d'exceptions. Un "sauf" isolé ou un long message ne suffisent pas
+BULK_FICHE_TYPES = (FicheType.CONTROLE_MES,)
+BULK_PATTERN = re.compile(
+    r"\b(?:tout|tous|toutes|le reste)\b(?:\s+[\w']+){0,3}?\s+(?:ok|bons?|conformes?|na|nok|valides?)\b"
+)
+# Raison signalée pour un champ obligatoire laissé vide par une dictée groupée
+BULK_UNDICTATED_REASON = "non dicté, pas de valeur par défaut"
+
+
+def _format_field_question(champ: ChampSpec) -> str:
+    """Question posée pour un champ d'une fiche générique, selon son type"""
+    label = champ.label
+    if champ.type == "boolean":
+        return f"{label} ? (Oui/Non)"
+    elif champ.type == "select":
+        return f"{label} ? ({'/'.join(champ.options)})"
+    elif champ.type == "date":
+        return f"{label} ? (format JJ/MM/AAAA)"
+    else:
+        return f"{label} ?"
+
+
+def _template_value(champ: ChampSpec) -> str:
+    """Valeur attendue d'un champ dans le JSON d'extraction, selon son type"""
+    if champ.type == "boolean":
+        return "true/false/null"
+    elif champ.type == "select":
+        return f"'{'/'.join(champ.options)}' ou null"
+    else:
+        return "valeur ou null"
+
+
 class FicheDefautChatManager:
     """
     Gestionnaire de fiches pour intégration chatbot.
@@ -54,8 +143,8 @@ class FicheDefautChatManager:
             self.entities = {}
             self.mode = "selection"
         
-        self.champs_manquants = self.entities.get("champs_manquants", []) if self.entities else []
         self.conversation_updates = []  # Historique des mises à jour
+        self._update_champs_manquants()
     
     def set_fiche_type(self, fiche_type: FicheType):
         """
@@ -83,69 +172,137 @@ class FicheDefautChatManager:
         # Tout le reste est considéré comme rempli (y compris "RAS", "Non renseigné", etc.)
         return False
     
+    @property
+    def champs_manquants(self) -> List[str]:
+        """Libellés des champs encore manquants, dans l'ordre des questions"""
+        return list(self._missing.values())
+    
+    @property
+    def champs_ambigus(self) -> Dict[str, str]:
+        """Champs à faire préciser après une dictée groupée : libellé -> raison"""
+        champs = get_fiche_index(self.fiche_type).champs if self.fiche_type else {}
+        return {
+            f"{champs[champ_id].section_nom} - {champs[champ_id].label}": raison
+            for (section_id, champ_id), raison in self._ambiguous.items()
+        }
+    
     def _update_champs_manquants(self):
-        """Met à jour la liste des champs manquants selon le type de fiche"""
+        """
+        Recalcule entièrement le suivi de complétion (création ou chargement de la fiche).
+        Ensuite, seuls les champs modifiés par une extraction sont mis à jour (_track_field).
+        
+        Chaque cellule suivie est identifiée par (section, champ), ou
+        (section, n° de ligne, champ) pour un tableau.
+        """
+        self._cells = {}                        # clé -> (section, comptée dans la complétude, libellé si manquant à demander)
+        self._filled = set()                    # clés des cellules remplies
+        self._missing = {}                      # clé -> libellé, dans l'ordre des questions
+        self._filled_count = 0
+        self._total_count = 0
+        self._section_filled = Counter()        # cellules comptées remplies, par section
+        self._section_required_filled = Counter()  # cellules obligatoires remplies, par section
+        self._ambiguous = {}                    # clé -> raison, champs à faire préciser (dictée groupée)
+        
         if not self.fiche_type or not self.entities:
-            self.champs_manquants = []
             return
         
-        manquants = []
-        structure = get_fiche_structure(self.fiche_type)
+        index = get_fiche_index(self.fiche_type)
+        is_defauts = self.fiche_type == FicheType.DEFAUTS
         
-        if self.fiche_type == FicheType.DEFAUTS:
-            # Logique spécifique pour les fiches de défauts
-            mes = self.entities.get("mise_en_service", {})
-            for key, value in mes.items():
-                if self._is_field_empty(value):
-                    manquants.append(key)
+        for section in index.sections:
+            if section.is_table:
+                # Tableau : une cellule par ligne présente dans la fiche et par colonne
+                # (obligatoires pour la fiche de défauts)
+                for i, ligne in enumerate(self.entities.get(section.id, [])):
+                    loc = ligne.get("localisation", "")
+                    for champ in section.ligne_champs:
+                        label = f"{loc} - {DEFAUTS_LIGNE_LABELS.get(champ, champ)}" if is_defauts else None
+                        self._register_cell((section.id, i, champ), section.id, True, label, ligne.get(champ))
+                continue
             
-            tableau = self.entities.get("tableau_defauts", [])
-            for ligne in tableau:
-                loc = ligne.get("localisation", "")
-                if self._is_field_empty(ligne.get("anomalies")):
-                    manquants.append(f"{loc} - anomalies")
-                if self._is_field_empty(ligne.get("temps_passe")):
-                    manquants.append(f"{loc} - temps")
+            section_entity = self.entities.get(section.id, {})
+            if is_defauts:
+                # Fiche de défauts : toutes les clés présentes dans la fiche sont à
+                # demander (y compris celles extraites d'un document)
+                for key, value in section_entity.items():
+                    self._register_cell((section.id, key), section.id, key in index.champs, key, value)
+            for champ in section.champs:
+                if (section.id, champ.id) in self._cells:
+                    continue
+                label = f"{section.nom} - {champ.label}" if champ.obligatoire and not is_defauts else None
+                self._register_cell((section.id, champ.id), section.id, True, label, section_entity.get(champ.id))
+    
+    def _register_cell(self, key: Tuple, section_id: str, counted: bool, label: Optional[str], value):
+        """Ajoute une cellule (vide au départ) au suivi de complétion, puis applique sa valeur"""
+        self._cells[key] = (section_id, counted, label)
+        if counted:
+            self._total_count += 1
+        if label:
+            self._missing[key] = label
+        self._track_field(key, value)
+    
+    def _track_field(self, key: Tuple, value):
+        """
+        Met à jour les compteurs de complétion pour une seule cellule modifiée.
+        
+        Args:
+            key: (section, champ) ou (section, n° de ligne, champ)
+            value: Nouvelle valeur de la cellule
+        """
+        cell = self._cells.get(key)
+        if cell is None:
+            # Champ hors structure : pas suivi
+            return
+        
+        filled = not self._is_field_empty(value)
+        if filled:
+            # Champ (re)dicté : il n'est plus à faire préciser
+            self._ambiguous.pop(key, None)
+        if filled == (key in self._filled):
+            return
+        
+        section_id, counted, label = cell
+        delta = 1 if filled else -1
+        if filled:
+            self._filled.add(key)
         else:
-            # Logique générique pour les autres types
-            for section_id, section_data in structure["sections"].items():
-                if "champs" in section_data:
-                    section_entity = self.entities.get(section_id, {})
-                    for champ in section_data["champs"]:
-                        if champ["obligatoire"] and self._is_field_empty(section_entity.get(champ["id"])):
-                            manquants.append(f"{section_data['nom']} - {champ['label']}")
-        
-        self.champs_manquants = manquants
+            self._filled.discard(key)
+        
+        if counted:
+            self._filled_count += delta
+            self._section_filled[section_id] += delta
+        if label:
+            self._section_required_filled[section_id] += delta
+            if filled:
+                del self._missing[key]
+            else:
+                # Champ vidé : il reprend sa place dans l'ordre des questions
+                self._missing[key] = label
+                self._missing = {k: self._missing[k] for k in self._cells if k in self._missing}
     
     def _get_section_summary(self) -> str:
         """Génère un résumé de l'état des sections selon le type de fiche"""
         if not self.fiche_type:
             return ""
         
-        structure = get_fiche_structure(self.fiche_type)
         summary = []
         
-        for section_id, section_data in structure["sections"].items():
-            section_name = section_data.get("nom", section_id)
-            section_entity = self.entities.get(section_id, {})
-            
-            if "lignes" in section_data:
+        for section in get_fiche_index(self.fiche_type).sections:
+            if section.is_table:
                 # Section tableau (ex: défauts)
-                lignes = self.entities.get(section_id, [])
-                for ligne in lignes:
+                total_count = len(section.ligne_champs)
+                for ligne in self.entities.get(section.id, []):
                     loc = ligne.get("localisation", "?")
-                    filled_count = sum(1 for champ in section_data["lignes"][0]["champs"] 
+                    filled_count = sum(1 for champ in section.ligne_champs 
                                      if not self._is_field_empty(ligne.get(champ)))
-                    total_count = len(section_data["lignes"][0]["champs"])
                     status = "✅" if filled_count == total_count else "⚠️" if filled_count > 0 else "❌"
                     summary.append(f"- {loc}: {status} ({filled_count}/{total_count})")
-            elif "champs" in section_data:
+            else:
                 # Section normale
-                filled_count = sum(1 for champ in section_data["champs"] 
-                                 if not self._is_field_empty(section_entity.get(champ["id"])))
-                total_count = len([c for c in section_data["champs"] if c.get("obligatoire", True)])
+                filled_count = self._section_filled[section.id]
+                total_count = len(section.obligatoires)
                 status = "✅" if filled_count == total_count else "⚠️" if filled_count > 0 else "❌"
-                summary.append(f"**{section_name}:** {status} ({filled_count}/{total_count})")
+                summary.append(f"**{section.nom}:** {status} ({filled_count}/{total_count})")
         
         return "\n".join(summary)
     
@@ -247,7 +404,7 @@ Indique le numéro ou le nom de la fiche."
 {section_summary}
 
 **CHAMPS ENCORE MANQUANTS:** {len(self.champs_manquants)}
-
+{self._get_ambiguities_prompt()}
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 🎯 **TON RÔLE PRÉCIS:**
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -322,142 +479,166 @@ RAPPEL CRITIQUE: Tu remplis une VRAIE fiche, pas un modèle théorique !
 """
         return prompt
     
+    def _get_ambiguities_prompt(self) -> str:
+        """Bloc du prompt système listant les champs à faire préciser (vide s'il n'y en a pas)"""
+        if not self._ambiguous:
+            return ""
+        lignes = "\n".join(f"- {label} : {raison}" for label, raison in self.champs_ambigus.items())
+        return f"""
+**CHAMPS À FAIRE PRÉCISER (dictée groupée):**
+{lignes}
+Demande ces précisions en priorité, une à la fois.
+"""
+    
     def get_completion_percentage(self) -> float:
-        """Calcule le pourcentage de complétion de la fiche"""
+        """
+        Pourcentage de complétion de la fiche, lu sur les compteurs tenus à jour.
+        Compte TOUS LES CHAMPS (pas seulement obligatoires) : les champs
+        obligatoires sont juste prioritaires dans les questions.
+        """
         if not self.fiche_type:
             return 0
         
-        structure = get_fiche_structure(self.fiche_type)
-        total_champs = 0
-        champs_remplis = 0
-        
-        for section_id, section_data in structure["sections"].items():
-            if "lignes" in section_data:
-                # Section tableau
-                lignes = self.entities.get(section_id, [])
-                for ligne in lignes:
-                    for champ in section_data["lignes"][0]["champs"]:
-                        total_champs += 1
-                        if not self._is_field_empty(ligne.get(champ)):
-                            champs_remplis += 1
-            elif "champs" in section_data:
-                # Section normale - COMPTER TOUS LES CHAMPS (pas seulement obligatoires)
-                section_entity = self.entities.get(section_id, {})
-                for champ in section_data["champs"]:
-                    # Pour la Fiche FC MES et autres: compter tous les champs
-                    # Les champs obligatoires seront juste prioritaires dans les questions
-                    total_champs += 1
-                    if not self._is_field_empty(section_entity.get(champ["id"])):
-                        champs_remplis += 1
-        
-        return (champs_remplis / total_champs * 100) if total_champs > 0 else 0
+        return (self._filled_count / self._total_count * 100) if self._total_count > 0 else 0
     
     def get_next_question(self) -> Optional[str]:
         """
         Génère la prochaine question à poser basée sur les champs manquants.
         Retourne None si la fiche est complète.
         """
-        if not self.champs_manquants or not self.fiche_type:
+        if not self.fiche_type:
+            return None
+        
+        # Après une dictée groupée, faire préciser d'abord les champs ambigus
+        if self._ambiguous:
+            section_id, champ_id = next(iter(self._ambiguous))
+            return _format_field_question(get_fiche_index(self.fiche_type).champs[champ_id])
+        
+        if not self._missing:
             return None
         
         # Pour les fiches de défauts, utiliser la logique spécifique
         if self.fiche_type == FicheType.DEFAUTS:
             return self._get_next_question_defauts()
         
-        # Pour les autres types, logique générique
-        structure = get_fiche_structure(self.fiche_type)
-        
-        # Parcourir les sections dans l'ordre
-        for section_id, section_data in structure["sections"].items():
-            section_name = section_data.get("nom", section_id)
-            
-            if "champs" in section_data:
-                section_entity = self.entities.get(section_id, {})
-                for champ in section_data["champs"]:
-                    if champ.get("obligatoire", True) and self._is_field_empty(section_entity.get(champ["id"])):
-                        # Générer une question appropriée
-                        label = champ["label"]
-                        if champ["type"] == "boolean":
-                            return f"{label} ? (Oui/Non)"
-                        elif champ["type"] == "select":
-                            options = champ.get("options", [])
-                            return f"{label} ? ({'/'.join(options)})"
-                        elif champ["type"] == "date":
-                            return f"{label} ? (format JJ/MM/AAAA)"
-                        else:
-                            return f"{label} ?"
-        
-        return None
+        # Pour les autres types, logique générique : premier champ manquant,
+        # les champs manquants étant gardés dans l'ordre des questions
+        section_id, champ_id = next(iter(self._missing))
+        return _format_field_question(get_fiche_index(self.fiche_type).champs[champ_id])
     
     def _get_next_question_defauts(self) -> Optional[str]:
         """Logique spécifique pour les fiches de défauts"""
-        # Prioriser les champs de mise en service
-        mes_fields = {
-            "nom_chantier": "Quel est le nom du chantier ?",
-            "ao": "Quel est le numéro d'Appel d'Offres (AO) ?",
-            "num_chantier": "Quel est le numéro de chantier ?",
-            "nom_technicien": "Qui est le technicien intervenant ?",
-            "date": "Quelle est la date d'intervention ? (format JJ/MM/AAAA)",
-            "signature": "Le document a-t-il été signé ?"
-        }
+        manquants = set(self._missing.values())
         
-        for champ, question in mes_fields.items():
-            if champ in self.champs_manquants:
+        # Prioriser les champs de mise en service
+        for champ, question in DEFAUTS_MES_QUESTIONS.items():
+            if champ in manquants:
                 return question
         
         # Pour le tableau : traiter section par section (anomalies + temps ensemble)
-        sections_ordre = [
-            "Partie DC",
-            "Partie AC", 
-            "Partie Communication",
-            "Liaison Equipotentielle / Mesure de terre",
-            "Divers / Remarques"
-        ]
-        
-        for section in sections_ordre:
+        for section in DEFAUTS_SECTIONS_ORDRE:
             section_anomalies = f"{section} - anomalies"
             section_temps = f"{section} - temps"
             
-            if section_anomalies in self.champs_manquants:
-                return f"Pour la section '{section}', as-tu rencontré des anomalies ? (RAS si rien à signaler)"
+            if section_anomalies in manquants:
+                return DEFAUTS_ANOMALIES_QUESTION.format(section=section)
             
-            if section_temps in self.champs_manquants:
-                return f"Combien de temps as-tu passé sur '{section}' ?"
+            if section_temps in manquants:
+                return DEFAUTS_TEMPS_QUESTION.format(section=section)
         
         return None
     
-    def _update_from_conversation_generic(self, user_message: str, last_question: str = "") -> List[str]:
-        """
-        Version générique de l'extraction qui s'adapte au type de fiche.
-        Utilisée pour tous les types sauf DEFAUTS.
+    def _best_matching_fields(self, last_question: str) -> List[ChampSpec]:
         """
-        from utils.LLM import get_chat_response
-        import json
+        Champs dont le libellé est le mieux couvert par la question posée
+        (dernière phrase interrogative du message), ex-aequo compris.
         
-        if not self.fiche_type:
+        Args:
+            last_question: Dernière question posée par l'assistant
+            
+        Returns:
+            Champs correspondants, du plus au moins couvert en nombre de mots
+        """
+        mots = label_words(question_sentence(last_question))
+        if not mots:
             return []
         
-        structure = get_fiche_structure(self.fiche_type)
-        fiche_nom = structure["nom"]
+        scored = []
+        for champ in get_fiche_index(self.fiche_type).champs.values():
+            if not champ.mots:
+                continue
+            common = len(champ.mots & mots)
+            overlap = common / len(champ.mots)
+            if overlap >= NEAR_QUESTION_MIN_OVERLAP:
+                scored.append((overlap, common, champ))
+        scored.sort(key=lambda item: item[:2], reverse=True)
+        best_score = scored[0][:2] if scored else None
+        return [champ for overlap, common, champ in scored if (overlap, common) == best_score]
+    
+    def _fields_near_question(self, last_question: str) -> Set[str]:
+        """
+        Champs visés par la dernière question : ceux dont le libellé y figure le
+        mieux, et leurs voisins dans la section (ex: État + Remarque).
+        
+        Args:
+            last_question: Dernière question posée par l'assistant
+            
+        Returns:
+            Identifiants des champs
+        """
+        index = get_fiche_index(self.fiche_type)
+        near = set()
+        for champ in self._best_matching_fields(last_question)[:NEAR_QUESTION_MAX_FIELDS]:
+            section = next(s for s in index.sections if s.id == champ.section_id)
+            start = max(0, champ.rang - NEAR_QUESTION_NEIGHBOURS)
+            near.update(c.id for c in section.champs[start:champ.rang + NEAR_QUESTION_NEIGHBOURS + 1])
+        return near
+    
+    def _build_extraction_template(self, last_question: str) -> Dict:
+        """
+        Template JSON de l'extraction générique, limité aux champs utiles :
+        champs encore vides et champs visés par la dernière question.
+        Si tout est rempli et qu'aucun champ n'est visé, toute la fiche est proposée.
+        
+        Returns:
+            {section: {champ: valeur attendue}}
+        """
+        index = get_fiche_index(self.fiche_type)
+        near = self._fields_near_question(last_question)
         
-        # Construire le JSON template basé sur la structure réelle
         json_template = {}
-        for section_id, section_data in structure["sections"].items():
-            if "champs" in section_data:
-                json_template[section_id] = {}
-                for champ in section_data["champs"]:
-                    champ_id = champ["id"]
-                    champ_type = champ["type"]
-                    
-                    if champ_type == "boolean":
-                        json_template[section_id][champ_id] = "true/false/null"
-                    elif champ_type == "select":
-                        options = champ.get("options", [])
-                        json_template[section_id][champ_id] = f"'{'/'.join(options)}' ou null"
-                    else:
-                        json_template[section_id][champ_id] = "valeur ou null"
+        for section in index.sections:
+            if section.is_table:
+                continue
+            champs = {
+                champ.id: _template_value(champ)
+                for champ in section.champs
+                if (section.id, champ.id) not in self._filled or champ.id in near
+            }
+            if champs:
+                json_template[section.id] = champs
         
-        json_template_str = json.dumps(json_template, indent=2, ensure_ascii=False)
+        if not json_template:
+            json_template = {
+                section.id: {champ.id: _template_value(champ) for champ in section.champs}
+                for section in index.sections
+                if not section.is_table
+            }
+        return json_template
+    
+    def _build_generic_extraction_prompt(self, user_message: str, last_question: str = "") -> str:
+        """
+        Construit le prompt d'extraction générique à partir de la structure de la fiche.
+        Seuls les champs encore vides ou visés par la dernière question sont envoyés,
+        en JSON compact : la taille du prompt suit ce qu'il reste à remplir.
+        """
+        fiche_nom = get_fiche_index(self.fiche_type).nom
+        
+        json_template_str = json.dumps(
+            self._build_extraction_template(last_question),
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
         
         # Prompt d'extraction générique
         extraction_prompt = f"""Tu es un extracteur d'informations pour une {fiche_nom}.
@@ -468,7 +649,7 @@ Dernière question posée: "{last_question}"
 **MESSAGE UTILISATEUR:**
 {user_message}
 
-**STRUCTURE ATTENDUE (retourne UNIQUEMENT les champs mentionnés):**
+**CHAMPS À EXTRAIRE (identifiant: valeur attendue, par section):**
 
 {json_template_str}
 
@@ -482,65 +663,335 @@ Dernière question posée: "{last_question}"
 - Ne retourne QUE les champs mentionnés (ne mets pas tous les champs à null)
 
 **FORMAT:**
+{{"champs": [{{"id": "identifiant du champ", "valeur": ...}}]}} avec une entrée par champ mentionné.
 Retourne UNIQUEMENT le JSON, rien d'autre (pas de texte avant ou après, pas de markdown).
 
 JSON:"""
         
+        return extraction_prompt
+    
+    def _update_from_conversation_generic(self, user_message: str, last_question: str = "") -> List[str]:
+        """
+        Version générique de l'extraction qui s'adapte au type de fiche.
+        Utilisée pour tous les types sauf DEFAUTS.
+        """
+        from utils.LLM import get_structured_response
+        
+        if not self.fiche_type:
+            return []
+        
+        extraction_prompt = self._build_generic_extraction_prompt(user_message, last_question)
+        
+        try:
+            # Appeler le LLM (réponse contrainte par le schéma de la fiche)
+            response = get_structured_response(
+                [{"role": "user", "content": extraction_prompt}],
+                *self._extraction_schema()
+            )
+        except Exception as e:
+            print(f"❌ Erreur lors de l'extraction: {e}")
+            return []
+        
+        return self._apply_generic_extraction(response)
+    
+    async def _aupdate_from_conversation_generic(self, user_message: str, last_question: str = "") -> List[str]:
+        """Version asynchrone de _update_from_conversation_generic"""
+        from utils.LLM import aget_structured_response
+        
+        if not self.fiche_type:
+            return []
+        
+        extraction_prompt = self._build_generic_extraction_prompt(user_message, last_question)
+        
+        try:
+            response = await aget_structured_response(
+                [{"role": "user", "content": extraction_prompt}],
+                *self._extraction_schema()
+            )
+        except Exception as e:
+            print(f"❌ Erreur lors de l'extraction: {e}")
+            return []
+        
+        return self._apply_generic_extraction(response)
+    
+    def _extraction_schema(self) -> Tuple[Dict, str]:
+        """Schéma JSON de la réponse d'extraction pour le type de fiche, et son nom"""
+        return get_fiche_index(self.fiche_type).extraction_schema, f"extraction_{self.fiche_type.value}"
+    
+    def _group_by_section(self, extracted: Dict) -> Dict:
+        """
+        Convertit la réponse structurée {"champs": [{"id", "valeur"}]} en
+        {section: {champ: valeur}}. Une réponse déjà groupée par section
+        (ancien format) est retournée telle quelle.
+        """
+        if not isinstance(extracted.get("champs"), list):
+            return extracted
+        
+        index = get_fiche_index(self.fiche_type)
+        grouped = {}
+        for entry in extracted["champs"]:
+            if not isinstance(entry, dict):
+                continue
+            champ = index.champs.get(entry.get("id"))
+            if champ is None or "valeur" not in entry:
+                # Champ inconnu, ou entrée tronquée récupérée par la réparation du JSON
+                continue
+            value = entry["valeur"]
+            if champ.type == "select" and isinstance(value, str):
+                # Le schéma n'impose pas les options : on recale la casse ("ok" -> "OK")
+                value = next((option for option in champ.options if option.lower() == value.lower()), value)
+            grouped.setdefault(champ.section_id, {})[champ.id] = value
+        return grouped
+    
+    def _apply_generic_extraction(self, response: str) -> List[str]:
+        """
+        Applique la réponse JSON du LLM (extraction générique) à la fiche.
+        
+        Returns:
+            Liste des champs mis à jour
+        """
         try:
-            # Appeler le LLM
-            response = get_chat_response([{"role": "user", "content": extraction_prompt}])
-            
-            # Nettoyer la réponse
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.startswith("```"):
-                response = response[3:]
-            if response.endswith("```"):
-                response = response[:-3]
-            response = response.strip()
-            
             print(f"📝 Réponse extraction: {response[:300]}...")
             
-            # Parser le JSON
-            extracted = json.loads(response)
+            # Parser le JSON (réparé s'il est tronqué)
+            extracted = self._group_by_section(parse_llm_json(response))
             print(f"✅ JSON parsé: {extracted}")
             
-            champs_mis_a_jour = []
+            return self._apply_section_values(extracted)
             
-            # Mettre à jour les sections
-            for section_id, section_values in extracted.items():
-                if section_id not in self.entities:
-                    self.entities[section_id] = {}
-                
-                current_section = self.entities[section_id]
-                
-                for champ_id, value in section_values.items():
-                    if value is not None and value != "null" and value != "":
-                        # Convertir les strings "true"/"false" en boolean
-                        if isinstance(value, str):
-                            if value.lower() == "true":
-                                value = True
-                            elif value.lower() == "false":
-                                value = False
-                        
-                        current_section[champ_id] = value
-                        champs_mis_a_jour.append(f"{section_id}.{champ_id}")
-                        print(f"✓ Mis à jour: {section_id}.{champ_id} = {value}")
+        except json.JSONDecodeError as e:
+            print(f"❌ Erreur JSON: {e}")
+            print(f"Réponse brute: {response}")
+            return []
+        except Exception as e:
+            print(f"❌ Erreur lors de l'extraction: {e}")
+            return []
+
+    def _apply_section_values(self, extracted: Dict) -> List[str]:
+        """
+        Enregistre les valeurs extraites dans la fiche.
+        
+        Args:
+            extracted: {section: {champ: valeur}}
             
-            # Mettre à jour les champs manquants
-            self._update_champs_manquants()
+        Returns:
+            Liste des champs mis à jour
+        """
+        champs_mis_a_jour = []
+        
+        # Mettre à jour les sections
+        for section_id, section_values in extracted.items():
+            if section_id not in self.entities:
+                self.entities[section_id] = {}
             
-            return champs_mis_a_jour
+            current_section = self.entities[section_id]
             
+            for champ_id, value in section_values.items():
+                if value is not None and value != "null" and value != "":
+                    # Convertir les strings "true"/"false" en boolean
+                    if isinstance(value, str):
+                        if value.lower() == "true":
+                            value = True
+                        elif value.lower() == "false":
+                            value = False
+                    
+                    current_section[champ_id] = value
+                    self._track_field((section_id, champ_id), value)
+                    champs_mis_a_jour.append(f"{section_id}.{champ_id}")
+                    print(f"✓ Mis à jour: {section_id}.{champ_id} = {value}")
+        
+        return champs_mis_a_jour
+    
+    def _is_bulk_dictation(self, user_message: str) -> bool:
+        """
+        Le message est-il une dictée groupée ? ("tout OK sauf ...", "le reste NA" :
+        formule globale sur une section, voir BULK_PATTERN)
+        """
+        if self.fiche_type not in BULK_FICHE_TYPES or not get_fiche_index(self.fiche_type).bulk_schema:
+            return False
+        return bool(BULK_PATTERN.search(normalize_answer(user_message)))
+    
+    def _current_section(self) -> Optional[SectionSpec]:
+        """Section du prochain champ manquant (section en cours de remplissage)"""
+        if not self._missing:
+            return None
+        section_id = next(iter(self._missing))[0]
+        return next(s for s in get_fiche_index(self.fiche_type).sections if s.id == section_id)
+    
+    def _build_bulk_extraction_prompt(self, user_message: str, last_question: str = "") -> str:
+        """
+        Construit le prompt d'une dictée groupée : mêmes champs que l'extraction
+        générique, plus une valeur par défaut par section ("tout OK") et la liste
+        des points cités dont la valeur n'est pas claire.
+        """
+        index = get_fiche_index(self.fiche_type)
+        section = self._current_section()
+        section_en_cours = f"{section.nom} ({section.id})" if section else "aucune"
+        
+        json_template_str = json.dumps(
+            self._build_extraction_template(last_question),
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        
+        return f"""Tu es un extracteur d'informations pour une {index.nom}.
+L'utilisateur dicte plusieurs points de contrôle en un seul message.
+
+**CONTEXTE:**
+Dernière question posée: "{last_question}"
+Section en cours: {section_en_cours}
+
+**MESSAGE UTILISATEUR:**
+{user_message}
+
+**CHAMPS À EXTRAIRE (identifiant: valeur attendue, par section):**
+
+{json_template_str}
+
+**RÈGLES:**
+- "tout OK", "tout est bon", "le reste NA" : ajoute {{"section": ..., "valeur": ...}} dans "tout" pour la section concernée (la section en cours si aucune n'est citée), sans lister ses champs un par un
+- Les exceptions ("sauf serrages armoire AC NOK") vont dans "champs" avec leur valeur
+- Les mesures et valeurs dictées ("terre 12 ohms") vont dans "champs" pour le champ correspondant
+- Si un point est cité mais que sa valeur ou le champ visé n'est pas clair, mets-le dans "ambigus" avec la raison, et pas dans "champs"
+- Pour les options OK/NOK/NA: retourne exactement "OK", "NOK" ou "NA"
+- Si l'utilisateur dit "oui" pour un champ boolean: true, "non" / "pas de": false
+- Si l'utilisateur dit "RAS", "rien à signaler": mets "RAS" comme valeur
+
+**FORMAT:**
+{{"champs": [{{"id": ..., "valeur": ...}}], "tout": [{{"section": ..., "valeur": ...}}], "ambigus": [{{"id": ..., "raison": ...}}]}}
+Retourne UNIQUEMENT le JSON, rien d'autre (pas de texte avant ou après, pas de markdown).
+
+JSON:"""
+    
+    def _bulk_schema(self) -> Tuple[Dict, str]:
+        """Schéma JSON de la réponse d'une dictée groupée, et son nom"""
+        return get_fiche_index(self.fiche_type).bulk_schema, f"dictee_{self.fiche_type.value}"
+    
+    def _update_from_bulk_dictation(self, user_message: str, last_question: str = "") -> List[str]:
+        """Remplit plusieurs sections en un seul appel au LLM (dictée groupée)"""
+        from utils.LLM import get_structured_response
+        
+        extraction_prompt = self._build_bulk_extraction_prompt(user_message, last_question)
+        
+        try:
+            response = get_structured_response(
+                [{"role": "user", "content": extraction_prompt}],
+                *self._bulk_schema()
+            )
+        except Exception as e:
+            print(f"❌ Erreur lors de l'extraction: {e}")
+            return []
+        
+        return self._apply_bulk_extraction(response)
+    
+    async def _aupdate_from_bulk_dictation(self, user_message: str, last_question: str = "") -> List[str]:
+        """Version asynchrone de _update_from_bulk_dictation"""
+        from utils.LLM import aget_structured_response
+        
+        extraction_prompt = self._build_bulk_extraction_prompt(user_message, last_question)
+        
+        try:
+            response = await aget_structured_response(
+                [{"role": "user", "content": extraction_prompt}],
+                *self._bulk_schema()
+            )
+        except Exception as e:
+            print(f"❌ Erreur lors de l'extraction: {e}")
+            return []
+        
+        return self._apply_bulk_extraction(response)
+    
+    def _apply_bulk_extraction(self, response: str) -> List[str]:
+        """
+        Applique une dictée groupée : valeurs explicites d'abord, puis valeur par
+        défaut de chaque section citée ("tout OK") sur ses listes de choix encore
+        vides. Les champs ambigus, et les obligatoires de ces sections restés vides,
+        sont gardés à faire préciser (champs_ambigus).
+        
+        Returns:
+            Liste des champs mis à jour
+        """
+        try:
+            print(f"📝 Réponse dictée groupée: {response[:300]}...")
+            extracted = parse_llm_json(response)
         except json.JSONDecodeError as e:
             print(f"❌ Erreur JSON: {e}")
             print(f"Réponse brute: {response}")
             return []
+        
+        # Réponse d'une autre forme (liste, clés manquantes, entrées tronquées
+        # par la réparation du JSON) : on garde seulement les entrées bien formées
+        if not isinstance(extracted, dict):
+            print(f"❌ Réponse de dictée groupée inattendue: {response[:300]}")
+            return []
+        entries = {}
+        for key in ("champs", "tout", "ambigus"):
+            value = extracted.get(key) or []
+            if not isinstance(value, list):
+                print(f"❌ Réponse de dictée groupée inattendue ({key}): {response[:300]}")
+                return []
+            entries[key] = [entry for entry in value if isinstance(entry, dict)]
+        
+        try:
+            return self._apply_bulk_entries(entries["champs"], entries["tout"], entries["ambigus"])
         except Exception as e:
             print(f"❌ Erreur lors de l'extraction: {e}")
             return []
-
+    
+    def _apply_bulk_entries(self, champs: List[Dict], tout: List[Dict], ambigus_llm: List[Dict]) -> List[str]:
+        """
+        Enregistre les entrées (déjà validées) d'une dictée groupée.
+        
+        Args:
+            champs: Valeurs explicites [{id, valeur}]
+            tout: Valeurs par défaut des sections [{section, valeur}]
+            ambigus_llm: Champs à préciser [{id, raison}]
+            
+        Returns:
+            Liste des champs mis à jour
+        """
+        index = get_fiche_index(self.fiche_type)
+        sections = {section.id: section for section in index.sections}
+        
+        ambigus = {}
+        for entry in ambigus_llm:
+            champ = index.champs.get(entry.get("id"))
+            if champ is not None:
+                ambigus[(champ.section_id, champ.id)] = str(entry.get("raison") or "valeur à préciser")
+        
+        # Un champ ambigu n'est pas rempli, même si une valeur a été proposée
+        grouped = self._group_by_section({"champs": champs})
+        for section_id, champ_id in ambigus:
+            grouped.get(section_id, {}).pop(champ_id, None)
+        champs_mis_a_jour = self._apply_section_values(grouped)
+        
+        for entry in tout:
+            section = sections.get(entry.get("section"))
+            valeur = entry.get("valeur")
+            if section is None or section.is_table:
+                continue
+            
+            section_entity = self.entities.setdefault(section.id, {})
+            for champ in section.champs:
+                key = (section.id, champ.id)
+                if champ.type != "select" or valeur not in champ.options or key in self._filled or key in ambigus:
+                    continue
+                section_entity[champ.id] = valeur
+                self._track_field(key, valeur)
+                champs_mis_a_jour.append(f"{section.id}.{champ.id}")
+            print(f"✓ Section {section.id}: {valeur} par défaut")
+            
+            for champ in section.obligatoires:
+                key = (section.id, champ.id)
+                if key not in self._filled and key not in ambigus:
+                    ambigus[key] = BULK_UNDICTATED_REASON
+        
+        self._ambiguous.update(ambigus)
+        if ambigus:
+            print(f"❓ Champs à préciser: {list(self.champs_ambigus)}")
+        
+        return champs_mis_a_jour
+    
     def update_from_conversation(self, user_message: str, assistant_response: str = "", last_question: str = "") -> List[str]:
         """
         Met à jour la fiche basé sur la conversation.
@@ -554,21 +1005,196 @@ JSON:"""
         Returns:
             Liste des champs mis à jour
         """
-        from utils.LLM import get_chat_response
-        import json
+        from utils.LLM import get_structured_response
         
-        # Obtenir la prochaine question pour le contexte
-        if not last_question:
-            last_question = self.get_next_question() or ""
+        last_question = self._resolve_last_question(user_message, last_question)
         
-        print(f"🔍 Extraction avec contexte: '{last_question[:100]}...'")
-        print(f"📝 Message utilisateur: '{user_message}'")
+        # Réponse courte reconnue localement : pas d'appel au LLM
+        updated = self._apply_rules(user_message, last_question)
+        if updated:
+            return updated
+        
+        # Dictée groupée : toute une check-list en un seul appel
+        if self._is_bulk_dictation(user_message):
+            return self._update_from_bulk_dictation(user_message, last_question)
         
         # NOUVEAU: Utiliser la structure réelle de la fiche pour l'extraction
         if self.fiche_type and self.fiche_type != FicheType.DEFAUTS:
             return self._update_from_conversation_generic(user_message, last_question)
         
         # Ancien code pour les fiches de défauts (conservé pour compatibilité)
+        extraction_prompt = self._build_defauts_extraction_prompt(user_message, last_question)
+        
+        try:
+            # Appeler le LLM pour extraire
+            response = get_structured_response(
+                [{"role": "user", "content": extraction_prompt}],
+                *self._extraction_schema()
+            )
+        except Exception as e:
+            print(f"Erreur lors de l'extraction: {e}")
+            return []
+        
+        return self._apply_defauts_extraction(response)
+    
+    async def aupdate_from_conversation(self, user_message: str, assistant_response: str = "", last_question: str = "") -> List[str]:
+        """
+        Version asynchrone de update_from_conversation.
+        Permet de lancer l'extraction en parallèle de la génération de la réponse du chatbot.
+        
+        Args:
+            user_message: Message de l'utilisateur
+            assistant_response: Réponse de l'assistant (non utilisé pour l'instant)
+            last_question: Dernière question posée pour avoir le contexte
+        
+        Returns:
+            Liste des champs mis à jour
+        """
+        from utils.LLM import aget_structured_response
+        
+        last_question = self._resolve_last_question(user_message, last_question)
+        
+        updated = self._apply_rules(user_message, last_question)
+        if updated:
+            return updated
+        
+        if self._is_bulk_dictation(user_message):
+            return await self._aupdate_from_bulk_dictation(user_message, last_question)
+        
+        if self.fiche_type and self.fiche_type != FicheType.DEFAUTS:
+            return await self._aupdate_from_conversation_generic(user_message, last_question)
+        
+        extraction_prompt = self._build_defauts_extraction_prompt(user_message, last_question)
+        
+        try:
+            response = await aget_structured_response(
+                [{"role": "user", "content": extraction_prompt}],
+                *self._extraction_schema()
+            )
+        except Exception as e:
+            print(f"Erreur lors de l'extraction: {e}")
+            return []
+        
+        return self._apply_defauts_extraction(response)
+    
+    def _rule_target_field(self, question: str) -> Optional[ChampSpec]:
+        """
+        Champ visé sans ambiguïté par la question : question fixe de la fiche de
+        défauts, meilleur libellé unique, ou seul champ encore vide parmi les
+        meilleurs ex-aequo. None sinon.
+        """
+        if self.fiche_type == FicheType.DEFAUTS:
+            normalized = normalize_answer(question)
+            for champ_id, fixed_question in DEFAUTS_MES_QUESTIONS.items():
+                if normalize_answer(fixed_question) in normalized:
+                    return get_fiche_index(self.fiche_type).champs[champ_id]
+        
+        best = self._best_matching_fields(question)
+        if len(best) > 1:
+            best = [champ for champ in best if (champ.section_id, champ.id) not in self._filled]
+        return best[0] if len(best) == 1 else None
+    
+    def _rule_target_defauts_row(self, question: str) -> Optional[Tuple[int, str]]:
+        """
+        Cellule du tableau des défauts visée par la question : (n° de ligne, colonne).
+        Sans section citée ("cette partie"), c'est la section en cours : la seule
+        dont les anomalies sont notées sans le temps, sinon celle de la prochaine question.
+        """
+        normalized = normalize_answer(question)
+        if "temps" in normalized:
+            colonne = "temps_passe"
+        elif "anomalie" in normalized:
+            colonne = "anomalies"
+        else:
+            return None
+        
+        def find_section(text: str) -> Optional[str]:
+            found = [section for section, keywords in DEFAUTS_SECTION_KEYWORDS.items()
+                     if any(keyword in text for keyword in keywords)]
+            return found[0] if len(found) == 1 else None
+        
+        lignes = self.entities.get("tableau_defauts", [])
+        section = find_section(normalized)
+        if section is None:
+            en_cours = [ligne.get("localisation") for ligne in lignes
+                        if not self._is_field_empty(ligne.get("anomalies"))
+                        and self._is_field_empty(ligne.get("temps_passe"))]
+            if len(en_cours) == 1:
+                section = en_cours[0]
+            else:
+                section = find_section(normalize_answer(self.get_next_question() or ""))
+        if section is None:
+            return None
+        
+        for i, ligne in enumerate(lignes):
+            if ligne.get("localisation") == section:
+                return i, colonne
+        return None
+    
+    def _apply_rules(self, user_message: str, last_question: str) -> List[str]:
+        """
+        Voie rapide : si la dernière question vise un seul champ et que la réponse
+        se lit directement selon le type du champ ("RAS", "OK", "oui", date,
+        durée, numéro...), la valeur est enregistrée sans appel au LLM.
+        
+        Args:
+            user_message: Message de l'utilisateur
+            last_question: Dernière question posée
+        
+        Returns:
+            Liste des champs mis à jour (vide : la réponse part au LLM)
+        """
+        if not self.fiche_type or not last_question:
+            return []
+        
+        question = question_sentence(last_question)
+        
+        if self.fiche_type == FicheType.DEFAUTS:
+            cell = self._rule_target_defauts_row(question)
+            if cell is not None:
+                i, colonne = cell
+                parse = parse_duration if colonne == "temps_passe" else parse_nothing_to_report
+                value = parse(user_message)
+                if value is None:
+                    return []
+                ligne = self.entities["tableau_defauts"][i]
+                ligne[colonne] = value
+                self._track_field(("tableau_defauts", i, colonne), value)
+                updated = f"{ligne['localisation']} - {DEFAUTS_LIGNE_LABELS[colonne]}"
+                print(f"⚡ Réponse reconnue sans LLM: {updated} = {value}")
+                return [updated]
+        
+        champ = self._rule_target_field(question)
+        if champ is None:
+            return []
+        
+        if self.fiche_type == FicheType.DEFAUTS and champ.id == "signature":
+            # Fiche de défauts : la signature est notée présente / absente
+            answer = parse_boolean(user_message)
+            value = DEFAUTS_SIGNATURE_VALUES[answer] if answer is not None else None
+        else:
+            value = parse_field_answer(champ, user_message)
+        if value is None:
+            return []
+        
+        self.entities.setdefault(champ.section_id, {})[champ.id] = value
+        self._track_field((champ.section_id, champ.id), value)
+        print(f"⚡ Réponse reconnue sans LLM: {champ.section_id}.{champ.id} = {value}")
+        return [f"{champ.section_id}.{champ.id}"]
+    
+    def _resolve_last_question(self, user_message: str, last_question: str) -> str:
+        """Complète le contexte de la dernière question et trace l'extraction"""
+        # Obtenir la prochaine question pour le contexte
+        if not last_question:
+            last_question = self.get_next_question() or ""
+        
+        print(f"🔍 Extraction avec contexte: '{last_question[:100]}...'")
+        print(f"📝 Message utilisateur: '{user_message}'")
+        
+        return last_question
+    
+    def _build_defauts_extraction_prompt(self, user_message: str, last_question: str) -> str:
+        """Construit le prompt d'extraction spécifique aux fiches de défauts"""
         extraction_prompt = f"""Tu es un extracteur d'informations pour des fiches de défauts.
         
 **CONTEXTE DE LA CONVERSATION:**
@@ -627,24 +1253,20 @@ Réponse utilisateur: "5 minutes"
 
 RETOURNE LE JSON:"""
         
+        return extraction_prompt
+    
+    def _apply_defauts_extraction(self, response: str) -> List[str]:
+        """
+        Applique la réponse JSON du LLM (fiche de défauts) à la fiche.
+        
+        Returns:
+            Liste des champs mis à jour
+        """
         try:
-            # Appeler le LLM pour extraire
-            response = get_chat_response([{"role": "user", "content": extraction_prompt}])
-            
-            # Nettoyer la réponse pour extraire le JSON
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.startswith("```"):
-                response = response[3:]
-            if response.endswith("```"):
-                response = response[:-3]
-            response = response.strip()
-            
             print(f"📝 Réponse extraction: {response[:200]}...")  # Debug
             
-            # Parser le JSON
-            extracted = json.loads(response)
+            # Parser le JSON (réparé s'il est tronqué)
+            extracted = parse_llm_json(response)
             print(f"✅ JSON parsé: {extracted}")  # Debug
             
             champs_mis_a_jour = []
@@ -657,6 +1279,7 @@ RETOURNE LE JSON:"""
                 for key, value in mes.items():
                     if value and value != "null":
                         current_mes[key] = value
+                        self._track_field(("mise_en_service", key), value)
                         champs_mis_a_jour.append(f"mise_en_service.{key}")
                 
                 self.entities["mise_en_service"] = current_mes
@@ -676,7 +1299,7 @@ RETOURNE LE JSON:"""
                     
                     # Trouver la ligne correspondante dans le tableau
                     ligne_existante = None
-                    for ligne in current_tableau:
+                    for i, ligne in enumerate(current_tableau):
                         ligne_loc = ligne.get("localisation")
                         # Essayer une correspondance exacte
                         if ligne_loc == loc:
@@ -692,18 +1315,17 @@ RETOURNE LE JSON:"""
                         # Mettre à jour les champs
                         if new_ligne.get("anomalies"):
                             ligne_existante["anomalies"] = new_ligne["anomalies"]
+                            self._track_field(("tableau_defauts", i, "anomalies"), new_ligne["anomalies"])
                             champs_mis_a_jour.append(f"{ligne_existante.get('localisation')} - anomalies")
                         if new_ligne.get("temps_passe"):
                             ligne_existante["temps_passe"] = new_ligne["temps_passe"]
+                            self._track_field(("tableau_defauts", i, "temps_passe"), new_ligne["temps_passe"])
                             champs_mis_a_jour.append(f"{ligne_existante.get('localisation')} - temps")
                     else:
                         print(f"❌ Aucune ligne trouvée pour localisation: '{loc}'")
                 
                 self.entities["tableau_defauts"] = current_tableau
             
-            # Recalculer les champs manquants
-            self._update_champs_manquants()
-            
             return champs_mis_a_jour
             
         except Exception as e:
@@ -716,25 +1338,25 @@ RETOURNE LE JSON:"""
         
         # Version générique pour tous les types de fiches
         if self.fiche_type and self.fiche_type != FicheType.DEFAUTS:
-            structure = get_fiche_structure(self.fiche_type)
-            fiche_nom = structure["nom"]
+            index = get_fiche_index(self.fiche_type)
             
-            summary = f"📊 **{fiche_nom}** ({completude:.0f}% complète)\n\n"
+            summary = f"📊 **{index.nom}** ({completude:.0f}% complète)\n\n"
             
             # Parcourir toutes les sections
-            for section_id, section_data in structure["sections"].items():
-                section_name = section_data.get("nom", section_id)
-                section_entity = self.entities.get(section_id, {})
+            for section in index.sections:
+                if section.is_table:
+                    continue
+                # Compter les champs obligatoires remplis vs total
+                total = len(section.obligatoires)
+                remplis = self._section_required_filled[section.id]
                 
-                if "champs" in section_data:
-                    # Compter les champs remplis vs total
-                    total = len([c for c in section_data["champs"] if c.get("obligatoire", True)])
-                    remplis = sum(1 for c in section_data["champs"] 
-                                if c.get("obligatoire", True) and 
-                                not self._is_field_empty(section_entity.get(c["id"])))
-                    
-                    icon = "✅" if remplis == total else "⚠️" if remplis > 0 else "❌"
-                    summary += f"{icon} **{section_name}:** {remplis}/{total}\n"
+                icon = "✅" if remplis == total else "⚠️" if remplis > 0 else "❌"
+                summary += f"{icon} **{section.nom}:** {remplis}/{total}\n"
+            
+            if self._ambiguous:
+                summary += "\n❓ **À préciser:**\n"
+                for label, raison in self.champs_ambigus.items():
+                    summary += f"- {label} ({raison})\n"
             
             return summary
         
@@ -784,8 +1406,8 @@ RETOURNE LE JSON:"""
         if not self.fiche_type:
             return "Erreur: Type de fiche non défini"
         
-        structure = get_fiche_structure(self.fiche_type)
-        fiche_nom = structure["nom"].upper()
+        index = get_fiche_index(self.fiche_type)
+        fiche_nom = index.nom.upper()
         
         txt = "=" * 60 + "\n"
         txt += f"{fiche_nom}\n"
@@ -795,34 +1417,31 @@ RETOURNE LE JSON:"""
         txt += "=" * 60 + "\n\n"
         
         # Parcourir toutes les sections
-        for section_id, section_data in structure["sections"].items():
-            section_name = section_data.get("nom", section_id)
-            txt += f"📋 {section_name.upper()}\n"
+        for section in index.sections:
+            txt += f"📋 {section.nom.upper()}\n"
             txt += "-" * 60 + "\n"
             
-            section_entity = self.entities.get(section_id, {})
-            
-            if "lignes" in section_data:
+            if section.is_table:
                 # Section tableau
                 txt += "\n"
-                lignes = self.entities.get(section_id, [])
+                lignes = self.entities.get(section.id, [])
                 for ligne in lignes:
                     loc = ligne.get("localisation", "?")
                     txt += f"🔹 {loc}\n"
-                    for champ in section_data["lignes"][0]["champs"]:
+                    for champ in section.ligne_champs:
                         valeur = ligne.get(champ, "N/A")
                         champ_label = champ.replace("_", " ").title()
                         txt += f"   {champ_label:15}: {valeur}\n"
                     txt += "\n"
-            elif "champs" in section_data:
+            else:
                 # Section normale
-                for champ in section_data["champs"]:
-                    label = champ["label"]
-                    valeur = section_entity.get(champ["id"], "N/A")
+                section_entity = self.entities.get(section.id, {})
+                for champ in section.champs:
+                    valeur = section_entity.get(champ.id, "N/A")
                     # Formater la valeur selon le type
-                    if champ["type"] == "boolean":
+                    if champ.type == "boolean":
                         valeur = "Oui" if valeur else "Non" if valeur is False else "N/A"
-                    txt += f"{label:30}: {valeur}\n"
+                    txt += f"{champ.label:30}: {valeur}\n"
                 txt += "\n"
         
         txt += "=" * 60 + "\n"
@@ -833,7 +1452,7 @@ RETOURNE LE JSON:"""
     
     def is_complete(self) -> bool:
         """Vérifie si la fiche est complète"""
-        return len(self.champs_manquants) == 0
+        return not self._missing
 
 
 def detect_fiche_type_from_message(message: str) -> Optional[FicheType]:
@@ -884,7 +1503,6 @@ def _get_fiche_info_summary(manager: FicheDefautChatManager) -> str:
     if not manager.fiche_type:
         return ""
     
-    structure = get_fiche_structure(manager.fiche_type)
     summary = "\n**📝 Informations à fournir :**\n\n"
     
     if manager.fiche_type == FicheType.DEFAUTS:
@@ -1039,6 +1657,13 @@ def _get_fiche_info_summary(manager: FicheDefautChatManager) -> str:
     
     return summary
 
+def _get_dictation_tip(manager: FicheDefautChatManager) -> str:
+    """Astuce de fin du message d'accueil (dictée groupée pour les longues check-lists)"""
+    if manager.fiche_type in BULK_FICHE_TYPES:
+        return "💡 *Tu peux dicter une section entière : « tout OK sauf serrages armoire AC NOK, terre 12 ohms »*"
+    return "💡 *Tu peux donner plusieurs infos à la fois si tu veux !*"
+
+
 def get_initial_fiche_message(manager: FicheDefautChatManager) -> str:
     """
     Génère le message initial du chatbot pour démarrer la complétion.
@@ -1084,7 +1709,7 @@ Je vais t'aider à remplir ta {fiche_nom.lower()}. Donne-moi les informations au
 
 {manager.get_next_question()}
 
-💡 *Tu peux donner plusieurs infos à la fois si tu veux !*"""
+{_get_dictation_tip(manager)}"""
     
     # Mode complétion
     else:
@@ -1105,3 +1730,29 @@ J'ai extrait ce qui était disponible. Il manque encore **{champs_manquants_coun
 {manager.get_next_question()}
 
 💡 *Donne-moi les infos manquantes et je complète la fiche !*"""
+
+
+def get_fixed_prompts() -> List[str]:
+    """
+    Textes fixes que le chatbot prononce souvent : questions de chaque type de
+    fiche et messages d'accueil d'une nouvelle fiche.
+    Sert à pré-générer leur synthèse vocale.
+    
+    Returns:
+        Liste des textes, sans doublons
+    """
+    prompts = [get_initial_fiche_message(FicheDefautChatManager())]
+    
+    for fiche_type, index in FICHE_INDEX.items():
+        prompts.append(get_initial_fiche_message(FicheDefautChatManager(fiche_type=fiche_type)))
+        
+        if fiche_type == FicheType.DEFAUTS:
+            prompts.extend(DEFAUTS_MES_QUESTIONS.values())
+            for section in DEFAUTS_SECTIONS_ORDRE:
+                prompts.append(DEFAUTS_ANOMALIES_QUESTION.format(section=section))
+                prompts.append(DEFAUTS_TEMPS_QUESTION.format(section=section))
+            continue
+        
+        prompts.extend(_format_field_question(champ) for champ in index.obligatoires)
+    
+    return list(dict.fromkeys(prompts))
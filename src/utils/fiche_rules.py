@@ -0,0 +1,208 @@
+"""
+Reconnaissance locale des réponses courtes, avant l'extraction par LLM
+Beaucoup de réponses du technicien se lisent sans ambiguïté à partir du type
+du champ demandé (fiche_types.py) : "RAS", "5 minutes", "OK", "NOK", "oui",
+une date JJ/MM/AAAA, un numéro de chantier. Elles sont reconnues ici par des
+règles déterministes ; toute réponse qui ne correspond pas exactement à une
+règle renvoie None et part à l'extraction par LLM.
+"""
+
+import re
+import unicodedata
+from datetime import date, datetime
+from typing import Any, Optional, Sequence
+
+from utils.fiche_types import ChampSpec
+
+# Réponses booléennes (message entier, normalisé)
+TRUE_ANSWERS = frozenset({
+    "oui", "ouais", "yes", "ok", "d'accord", "exact", "exactement", "tout a fait",
+    "bien sur", "affirmatif", "c'est bon", "oui c'est bon", "c'est fait", "fait"
+})
+FALSE_ANSWERS = frozenset({
+    "non", "nan", "no", "pas du tout", "negatif", "pas encore", "non pas encore", "aucun", "aucune"
+})
+
+# Synonymes des options de liste (la clé est l'option telle que déclarée dans la fiche)
+SELECT_SYNONYMS = {
+    "OK": frozenset({"ok", "oui", "c'est ok", "conforme", "bon", "c'est bon", "valide"}),
+    "NOK": frozenset({"nok", "ko", "pas ok", "non ok", "non conforme", "pas conforme"}),
+    "NA": frozenset({"na", "n/a", "n a", "non applicable", "sans objet", "pas concerne", "non concerne"}),
+    "VALIDE": frozenset({"valide", "oui", "ok", "c'est bon", "present"}),
+}
+
+# "Rien à signaler" et "non renseigné", selon les règles du prompt d'extraction
+NOTHING_TO_REPORT_ANSWERS = frozenset({
+    "ras", "r a s", "rien", "rien a signaler", "rien a dire", "pas de probleme",
+    "pas de souci", "aucun probleme", "aucune anomalie", "pas d'anomalie", "tout est ok"
+})
+NOT_PROVIDED_ANSWERS = frozenset({
+    "non renseigne", "aucun", "aucune", "je ne sais pas", "je sais pas", "inconnu",
+    "non communique", "pas communique", "pas d'info", "pas d'infos", "pas d'information",
+    "pas d'informations", "pas de numero", "pas de n", "pas de reference", "pas de ref", "pas d'ao"
+})
+# "RAS" n'est accepté que pour les champs d'observation (remarques, réserves, anomalies)
+OBSERVATION_WORDS = ("remarque", "observation", "reserve", "anomalie", "commentaire", "defaut")
+
+# Date JJ/MM/AAAA (séparateurs / - . ou espace, année sur 2 ou 4 chiffres)
+DATE_PATTERN = re.compile(r"^(\d{1,2})[/\-. ](\d{1,2})[/\-. ](\d{2}|\d{4})$")
+TODAY_ANSWERS = frozenset({"aujourd'hui", "ce jour", "aujourd hui"})
+
+# Durée : "5 minutes", "5 min", "1 heure", "1h30", "1 h 30", "2 heures 15"
+DURATION_PATTERN = re.compile(
+    r"^(?:(?P<hours>\d{1,2})\s*(?:h|heures?)\s*(?P<hour_minutes>\d{1,2})?(?:\s*(?:min|minutes?))?"
+    r"|(?P<minutes>\d{1,3})\s*(?:mn|min|mins|minutes?))$"
+)
+ZERO_DURATION_ANSWERS = NOTHING_TO_REPORT_ANSWERS | frozenset({"0", "zero", "pas de temps", "aucun temps"})
+
+# Numéro (de chantier, de série...) : un seul mot commençant par un chiffre, ou
+# par un préfixe en majuscules ou suivi d'un tiret ("CH2291", "ch-2291"). Les
+# mots d'introduction ("le", "au", "N°", "c'est"...) ne sont pas enregistrés
+IDENTIFIER_PATTERN = re.compile(
+    r"^(?i:(?:(?:c'est|le|la|au|du|num[eé]ro|num)\s+|n[°o]\.?\s*))*"
+    r"(\d[\w\-/]*|[A-Z]{1,4}\d[\w\-/]*|[A-Za-z]{1,4}-\d[\w\-/]*)$"
+)
+
+# Fin de phrase, pour isoler la question dans le dernier message de l'assistant
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def normalize_answer(message: str) -> str:
+    """
+    Forme normalisée d'une réponse : minuscules, sans accents, sans ponctuation
+    ni emojis autour, espaces réduits.
+
+    Args:
+        message: Message de l'utilisateur
+
+    Returns:
+        Le message normalisé
+    """
+    # Apostrophe typographique (claviers mobiles, dictée) avant le passage en ASCII, qui la supprimerait
+    text = message.lower().replace("’", "'").replace("‘", "'")
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" \t.,;:!?\"'()[]*_-")
+
+
+def question_sentence(text: str) -> str:
+    """
+    Dernière phrase interrogative d'un message de l'assistant
+    ("Noté ! Partie DC complète. Passons à la Partie AC, des anomalies ?" -> la dernière phrase).
+
+    Args:
+        text: Message de l'assistant (ou question seule)
+
+    Returns:
+        La question, ou le texte entier s'il n'en contient pas
+    """
+    questions = [sentence for sentence in _SENTENCE_BREAK.split(text) if "?" in sentence]
+    return questions[-1].strip() if questions else text
+
+
+def parse_boolean(message: str) -> Optional[bool]:
+    """Oui/Non -> True/False, None si la réponse n'est pas un oui ou un non franc"""
+    answer = normalize_answer(message)
+    if answer in TRUE_ANSWERS:
+        return True
+    if answer in FALSE_ANSWERS:
+        return False
+    return None
+
+
+def parse_select(message: str, options: Sequence[str]) -> Optional[str]:
+    """Option de liste citée (ou synonyme : "conforme" -> OK), None si ambigu"""
+    answer = normalize_answer(message)
+    matches = [
+        option for option in options
+        if answer == normalize_answer(option) or answer in SELECT_SYNONYMS.get(option, ())
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+def parse_date(message: str, today: Optional[date] = None) -> Optional[str]:
+    """Date valide au format JJ/MM/AAAA ("aujourd'hui" compris), None sinon"""
+    answer = normalize_answer(message)
+    if answer in TODAY_ANSWERS:
+        return (today or date.today()).strftime("%d/%m/%Y")
+
+    match = DATE_PATTERN.match(answer)
+    if not match:
+        return None
+    day, month, year = match.groups()
+    if len(year) == 2:
+        year = "20" + year
+    try:
+        return datetime(int(year), int(month), int(day)).strftime("%d/%m/%Y")
+    except ValueError:
+        return None
+
+
+def parse_duration(message: str) -> Optional[str]:
+    """Durée normalisée ("5 minutes" -> "5 min", "1 heure" -> "1h", "RAS" -> "0 min"), None sinon"""
+    answer = normalize_answer(message)
+    if answer in ZERO_DURATION_ANSWERS:
+        return "0 min"
+
+    match = DURATION_PATTERN.match(answer)
+    if not match:
+        return None
+    if match.group("minutes"):
+        return f"{int(match.group('minutes'))} min"
+    hours = int(match.group("hours"))
+    minutes = int(match.group("hour_minutes") or 0)
+    return f"{hours}h{minutes:02d}" if minutes else f"{hours}h"
+
+
+def parse_nothing_to_report(message: str) -> Optional[str]:
+    """"RAS" si la réponse est un rien à signaler, None sinon"""
+    return "RAS" if normalize_answer(message) in NOTHING_TO_REPORT_ANSWERS else None
+
+
+def parse_not_provided(message: str) -> Optional[str]:
+    """"Non renseigné" si la réponse est explicitement un "pas de numéro", "aucun"..., None sinon"""
+    return "Non renseigné" if normalize_answer(message) in NOT_PROVIDED_ANSWERS else None
+
+
+def parse_identifier(message: str) -> Optional[str]:
+    """Numéro seul ("2291", "N° 2291", "le 2291", "CH-2291"), sans les mots d'introduction, None sinon"""
+    match = IDENTIFIER_PATTERN.match(message.replace("’", "'").strip().strip(".!"))
+    return match.group(1) if match else None
+
+
+def _is_number_field(champ: ChampSpec) -> bool:
+    """Champ texte qui attend un numéro (N° de chantier, numéro de série...)"""
+    label = champ.label.lower()
+    return "num" in champ.id or "n°" in label or "numéro" in label
+
+
+def _is_observation_field(champ: ChampSpec) -> bool:
+    """Champ de remarques, de réserves ou d'anomalies ("RAS" y a un sens)"""
+    label = normalize_answer(champ.label)
+    return champ.type == "textarea" or any(word in label for word in OBSERVATION_WORDS)
+
+
+def parse_field_answer(champ: ChampSpec, message: str) -> Optional[Any]:
+    """
+    Valeur d'un champ lue directement dans la réponse, selon le type du champ.
+
+    Args:
+        champ: Champ visé par la dernière question
+        message: Réponse de l'utilisateur
+
+    Returns:
+        La valeur à enregistrer, ou None si la réponse demande l'extraction par LLM
+    """
+    if champ.type == "boolean":
+        return parse_boolean(message)
+    if champ.type == "select":
+        return parse_select(message, champ.options)
+    if champ.type == "date":
+        return parse_date(message)
+
+    # Texte libre : seules les réponses sans ambiguïté sont reconnues
+    value = parse_nothing_to_report(message) if _is_observation_field(champ) else None
+    value = value or parse_not_provided(message)
+    if value is None and _is_number_field(champ):
+        value = parse_identifier(message)
+    return value
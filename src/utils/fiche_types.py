@@ -1,8 +1,13 @@
 """
 Définition des différents types de fiches et leurs structures
+Chaque structure est aussi compilée une fois à l'import en un index
+(champs par identifiant, champs obligatoires, ordre des questions) pour
+éviter de reparcourir les sections à chaque tour de conversation
 """
 
-from typing import Dict, List
+import re
+import unicodedata
+from typing import Dict, FrozenSet, List, NamedTuple, Tuple
 from enum import Enum
 
 
@@ -305,6 +310,237 @@ FICHE_STRUCTURES = {
 }
 
 
+# Mots ignorés pour rapprocher un texte (question posée) des libellés de champs
+LABEL_STOPWORDS = frozenset({
+    "au", "aux", "avec", "ce", "de", "des", "du", "en", "est", "et", "la", "le",
+    "les", "ou", "par", "pour", "quel", "quelle", "sur", "un", "une"
+})
+
+
+def label_words(text: str) -> FrozenSet[str]:
+    """
+    Mots significatifs d'un texte, sans accents ni majuscules.
+    Sert à rapprocher la dernière question posée des libellés de champs.
+    
+    Args:
+        text: Libellé ou question
+        
+    Returns:
+        Ensemble des mots (nombres compris, mots vides exclus)
+    """
+    text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+    return frozenset(
+        mot for mot in re.findall(r"[a-z0-9]+", text)
+        if mot not in LABEL_STOPWORDS and (len(mot) > 1 or mot.isdigit())
+    )
+
+
+class ChampSpec(NamedTuple):
+    """Champ d'une fiche, avec la section qui le contient"""
+    id: str
+    section_id: str
+    section_nom: str
+    label: str
+    type: str
+    options: Tuple[str, ...]
+    obligatoire: bool
+    rang: int                 # position du champ dans sa section
+    mots: FrozenSet[str]      # mots du libellé (voir label_words)
+
+
+class SectionSpec(NamedTuple):
+    """Section d'une fiche : liste de champs, ou tableau de lignes (fiche de défauts)"""
+    id: str
+    nom: str
+    champs: Tuple[ChampSpec, ...]
+    obligatoires: Tuple[ChampSpec, ...]
+    lignes: Tuple[str, ...]
+    ligne_champs: Tuple[str, ...]
+
+    @property
+    def is_table(self) -> bool:
+        """Indique si la section est un tableau (une ligne par localisation)"""
+        return bool(self.lignes)
+
+
+class FicheIndex(NamedTuple):
+    """Structure d'une fiche compilée pour des recherches directes"""
+    fiche_type: "FicheType"
+    nom: str
+    sections: Tuple[SectionSpec, ...]
+    champs: Dict[str, ChampSpec]          # identifiant -> champ, dans l'ordre de la fiche
+    obligatoires: Tuple[ChampSpec, ...]   # champs obligatoires, dans l'ordre des questions
+    nb_champs: int                        # champs + cellules des tableaux (calcul de complétude)
+    extraction_schema: Dict               # schéma JSON de la réponse d'extraction (voir _build_extraction_schema)
+    bulk_schema: Dict                     # schéma JSON de la dictée groupée (voir _build_bulk_schema)
+
+
+def _strict_object(properties: Dict) -> Dict:
+    """Objet JSON en mode strict : toutes les propriétés requises, aucune autre admise"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+
+def _build_extraction_schema(sections: List[SectionSpec], champs: Dict[str, ChampSpec]) -> Dict:
+    """
+    Schéma JSON de la réponse d'extraction, pour les sorties structurées en mode strict
+    (toutes les propriétés requises, aucune propriété supplémentaire).
+    - Fiche avec tableau (défauts) : un objet par section, champs à null si non
+      mentionnés, et les lignes du tableau mentionnées
+    - Autres fiches : liste des seuls champs mentionnés {id, valeur}, pour que la
+      taille de la réponse ne dépende pas du nombre de champs de la fiche
+    
+    Args:
+        sections: Sections compilées
+        champs: Champs compilés, par identifiant
+        
+    Returns:
+        Schéma JSON
+    """
+    if any(section.is_table for section in sections):
+        properties = {}
+        for section in sections:
+            if section.is_table:
+                ligne = {"localisation": {"type": "string", "enum": list(section.lignes)}}
+                ligne.update({champ: {"type": ["string", "null"]} for champ in section.ligne_champs})
+                properties[section.id] = {"type": "array", "items": _strict_object(ligne)}
+            else:
+                # Valeurs textuelles, comme dans le prompt de la fiche de défauts (signature : "présente"/"absente")
+                properties[section.id] = _strict_object({
+                    champ.id: {"type": ["string", "null"]} for champ in section.champs
+                })
+        return _strict_object(properties)
+    
+    return _strict_object({"champs": _mentioned_fields_schema(champs)})
+
+
+def _mentioned_fields_schema(champs: Dict[str, ChampSpec]) -> Dict:
+    """Liste des champs mentionnés : [{id, valeur}]"""
+    return {
+        "type": "array",
+        "items": _strict_object({
+            "id": {"type": "string", "enum": list(champs)},
+            "valeur": {"anyOf": [{"type": "string"}, {"type": "boolean"}]}
+        })
+    }
+
+
+def _build_bulk_schema(sections: List[SectionSpec], champs: Dict[str, ChampSpec]) -> Dict:
+    """
+    Schéma JSON de la réponse d'une dictée groupée ("tout OK sauf ...") :
+    - champs : valeurs dictées explicitement (exceptions, mesures)
+    - tout : valeur par défaut d'une section entière (appliquée localement à
+      chaque liste de choix encore vide qui la propose)
+    - ambigus : champs cités dont la valeur n'est pas claire, avec la raison
+    
+    Args:
+        sections: Sections compilées
+        champs: Champs compilés, par identifiant
+        
+    Returns:
+        Schéma JSON (vide si la fiche n'a aucune liste de choix)
+    """
+    checklist_sections = [
+        section.id for section in sections
+        if any(champ.type == "select" for champ in section.champs)
+    ]
+    if not checklist_sections:
+        return {}
+    options = list(dict.fromkeys(
+        option for champ in champs.values() if champ.type == "select" for option in champ.options
+    ))
+    
+    return _strict_object({
+        "champs": _mentioned_fields_schema(champs),
+        "tout": {
+            "type": "array",
+            "items": _strict_object({
+                "section": {"type": "string", "enum": checklist_sections},
+                "valeur": {"type": "string", "enum": options}
+            })
+        },
+        "ambigus": {
+            "type": "array",
+            "items": _strict_object({
+                "id": {"type": "string", "enum": list(champs)},
+                "raison": {"type": "string"}
+            })
+        }
+    })
+
+
+def _compile_structure(fiche_type: FicheType, structure: Dict) -> FicheIndex:
+    """
+    Compile la structure d'une fiche en index.
+    
+    Args:
+        fiche_type: Type de fiche
+        structure: Structure déclarée dans FICHE_STRUCTURES
+        
+    Returns:
+        Index de la fiche
+        
+    Raises:
+        ValueError: Si un identifiant de champ apparaît dans deux sections
+    """
+    sections = []
+    champs = {}
+    
+    for section_id, section_data in structure["sections"].items():
+        section_nom = section_data.get("nom", section_id)
+        section_champs = tuple(
+            ChampSpec(
+                id=champ["id"],
+                section_id=section_id,
+                section_nom=section_nom,
+                label=champ["label"],
+                type=champ["type"],
+                options=tuple(champ.get("options", [])),
+                obligatoire=champ.get("obligatoire", True),
+                rang=rang,
+                mots=label_words(champ["label"])
+            )
+            for rang, champ in enumerate(section_data.get("champs", []))
+        )
+        for champ in section_champs:
+            if champ.id in champs:
+                raise ValueError(f"Champ '{champ.id}' défini deux fois dans {structure['nom']}")
+            champs[champ.id] = champ
+        
+        lignes = section_data.get("lignes", [])
+        sections.append(SectionSpec(
+            id=section_id,
+            nom=section_nom,
+            champs=section_champs,
+            obligatoires=tuple(champ for champ in section_champs if champ.obligatoire),
+            lignes=tuple(ligne["localisation"] for ligne in lignes),
+            ligne_champs=tuple(lignes[0]["champs"]) if lignes else ()
+        ))
+    
+    return FicheIndex(
+        fiche_type=fiche_type,
+        nom=structure["nom"],
+        sections=tuple(sections),
+        champs=champs,
+        obligatoires=tuple(champ for champ in champs.values() if champ.obligatoire),
+        nb_champs=sum(len(section.champs) + len(section.lignes) * len(section.ligne_champs)
+                      for section in sections),
+        extraction_schema=_build_extraction_schema(sections, champs),
+        bulk_schema=_build_bulk_schema(sections, champs)
+    )
+
+
+# Index compilé de chaque type de fiche
+FICHE_INDEX = {
+    fiche_type: _compile_structure(fiche_type, structure)
+    for fiche_type, structure in FICHE_STRUCTURES.items()
+}
+
+
 def get_available_fiches() -> List[Dict]:
     """
     Retourne la liste des fiches disponibles.
@@ -335,6 +571,19 @@ def get_fiche_structure(fiche_type: FicheType) -> Dict:
     return FICHE_STRUCTURES.get(fiche_type)
 
 
+def get_fiche_index(fiche_type: FicheType) -> FicheIndex:
+    """
+    Retourne l'index compilé d'un type de fiche.
+    
+    Args:
+        fiche_type: Type de fiche
+        
+    Returns:
+        Index de la fiche (None si le type est inconnu)
+    """
+    return FICHE_INDEX.get(fiche_type)
+
+
 def create_empty_fiche(fiche_type: FicheType) -> Dict:
     """
     Crée une structure de fiche vide pour un type donné.
@@ -385,16 +634,7 @@ def get_fiche_questions(fiche_type: FicheType) -> List[str]:
     Returns:
         Liste de questions
     """
-    structure = get_fiche_structure(fiche_type)
-    questions = []
-    
-    for section_id, section_data in structure["sections"].items():
-        if "champs" in section_data:
-            for champ in section_data["champs"]:
-                if champ["obligatoire"]:
-                    questions.append(f"{champ['label']} ?")
-    
-    return questions
+    return [f"{champ.label} ?" for champ in FICHE_INDEX[fiche_type].obligatoires]
 
 
 def format_fiche_type_list() -> str:
@@ -0,0 +1,119 @@
+"""
+Lecture tolérante des réponses JSON du LLM
+Dernier recours quand une réponse ne se parse pas telle quelle (balises
+```json, texte autour du JSON, réponse tronquée par max_tokens ou par le
+filtrage de contenu, virgule en trop) : on garde tout ce qui est complet
+plutôt que de perdre l'extraction du tour
+"""
+
+import json
+from typing import Any, Iterator, Tuple
+
+# Nombre maximum de points de coupure essayés sur un JSON tronqué (en partant de la fin)
+MAX_REPAIR_ATTEMPTS = 200
+
+# Fermeture de chaque conteneur ouvert
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def strip_markdown_fences(text: str) -> str:
+    """Retire les balises ```json ... ``` éventuelles autour d'une réponse JSON du LLM"""
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def _cut_points(text: str) -> Iterator[Tuple[int, str]]:
+    """
+    Parcourt le JSON et produit les positions où il peut être coupé proprement,
+    avec les fermetures à ajouter : après une chaîne, après l'ouverture ou la
+    fermeture d'un conteneur, et juste avant une virgule.
+
+    Yields:
+        (position de coupure, suffixe fermant les conteneurs ouverts)
+    """
+    stack = []
+    in_string = False
+    escape = False
+
+    for i, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+                yield i + 1, "".join(reversed(stack))
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+            yield i + 1, "".join(reversed(stack))
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            yield i + 1, "".join(reversed(stack))
+        elif char == ",":
+            yield i, "".join(reversed(stack))
+
+
+def repair_json(text: str) -> Any:
+    """
+    Récupère la plus grande partie complète d'un JSON invalide ou tronqué.
+    Les coupures sont essayées de la fin vers le début : une paire clé/valeur
+    inachevée est abandonnée, les conteneurs ouverts sont refermés.
+
+    Args:
+        text: Réponse du LLM (sans balises Markdown)
+
+    Returns:
+        La valeur JSON récupérée
+
+    Raises:
+        ValueError: Si aucun JSON exploitable n'a été trouvé
+    """
+    starts = [pos for pos in (text.find("{"), text.find("[")) if pos >= 0]
+    if not starts:
+        raise ValueError("Aucun objet JSON dans la réponse")
+    text = text[min(starts):]
+
+    candidates = list(_cut_points(text))
+    for position, closing in reversed(candidates[-MAX_REPAIR_ATTEMPTS:]):
+        try:
+            return json.loads(text[:position] + closing)
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("JSON irréparable")
+
+
+def parse_llm_json(response: str) -> Any:
+    """
+    Parse une réponse JSON du LLM, en la réparant si besoin.
+
+    Args:
+        response: Texte renvoyé par le LLM
+
+    Returns:
+        La valeur JSON
+
+    Raises:
+        json.JSONDecodeError: Si la réponse n'est pas du JSON, même après réparation
+    """
+    text = strip_markdown_fences(response)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as error:
+        try:
+            repaired = repair_json(text)
+        except ValueError:
+            raise error
+        print(f"🩹 JSON réparé (réponse invalide ou tronquée à {len(text)} caractères)")
+        return repaired
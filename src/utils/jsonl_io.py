@@ -0,0 +1,97 @@
+"""
+Lecture et écriture en flux de fichiers JSONL (un objet JSON par ligne)
+Utilisé pour les résumés OCR et NER : chaque page ou document est écrit dès
+qu'il est traité, et relu un par un, sans charger tout le fichier en mémoire
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+
+class JsonlWriter:
+    """
+    Écrit des enregistrements dans un fichier JSONL, au fur et à mesure.
+    Le fichier est écrit sous un nom temporaire puis renommé à la fermeture :
+    un traitement interrompu ne laisse pas de résumé partiel à la place du précédent.
+
+    Exemple:
+        with JsonlWriter("data/ocr_results/ocr_summary.jsonl") as writer:
+            writer.write({"type": "page", "page": 1, "text": "..."})
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Chemin du fichier JSONL
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.count = 0
+        self._tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+
+    def write(self, record: Dict):
+        """
+        Ajoute un enregistrement (une ligne).
+
+        Args:
+            record: Objet sérialisable en JSON
+        """
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write("\n")
+        self.count += 1
+
+    def flush(self):
+        """Force l'écriture sur disque des enregistrements en attente"""
+        self._file.flush()
+
+    def close(self):
+        """Ferme le fichier et le met en place sous son nom définitif"""
+        if self._file.closed:
+            return
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self):
+        """Ferme le fichier sans remplacer le fichier existant (traitement interrompu)"""
+        if self._file.closed:
+            return
+        self._file.close()
+        self._tmp_path.unlink()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def iter_jsonl(path, record_type: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Parcourt un fichier JSONL enregistrement par enregistrement.
+    Une dernière ligne incomplète (écriture interrompue) est ignorée.
+
+    Args:
+        path: Chemin du fichier JSONL
+        record_type: Ne retourner que les enregistrements dont le champ "type" a cette valeur
+
+    Yields:
+        Les enregistrements, dans l'ordre du fichier
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                if not line.endswith("\n"):
+                    break
+                raise
+            if record_type is None or record.get("type") == record_type:
+                yield record
@@ -0,0 +1,152 @@
+"""
+Cache persistant des résultats d'extraction NER
+Les résultats sont indexés par hash(texte OCR, modèle, version du prompt) et
+stockés dans une base SQLite, avec une éviction LRU bornée en taille
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = Path(os.getenv(
+    "NER_CACHE_PATH",
+    str(Path(__file__).resolve().parents[2] / "data" / "ner_cache.sqlite3")
+))
+DEFAULT_MAX_BYTES = int(float(os.getenv("NER_CACHE_MAX_MB", "50")) * 1024 * 1024)
+
+
+def compute_prompt_version(*parts: str) -> str:
+    """
+    Calcule une empreinte courte des éléments du prompt.
+    Toute modification du template change la version, et donc invalide le cache.
+
+    Args:
+        *parts: Textes composant le prompt (message système, template...)
+
+    Returns:
+        Empreinte hexadécimale de 16 caractères
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class NerCache:
+    """
+    Cache LRU sur disque des entités extraites.
+    Utilisable depuis plusieurs threads (une connexion protégée par un verrou).
+    """
+
+    def __init__(self, prompt_version: str, path: Path = DEFAULT_CACHE_PATH,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Ouvre (ou crée) le cache et purge les entrées d'une autre version du prompt.
+
+        Args:
+            prompt_version: Version courante du prompt (voir compute_prompt_version)
+            path: Chemin du fichier SQLite
+            max_bytes: Taille maximale cumulée des résultats stockés
+        """
+        self.prompt_version = prompt_version
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " prompt_version TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)"
+            )
+            # Invalidation : le template du prompt a changé
+            self._conn.execute(
+                "DELETE FROM entries WHERE prompt_version != ?", (prompt_version,)
+            )
+
+    def make_key(self, text: str, model: str) -> str:
+        """Clé de contenu : hash du texte, du modèle et de la version du prompt"""
+        digest = hashlib.sha256()
+        for part in (self.prompt_version, model, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, text: str, model: str) -> Optional[Dict]:
+        """
+        Retourne le résultat en cache pour ce texte, ou None.
+
+        Args:
+            text: Texte OCR du document
+            model: Modèle utilisé pour l'extraction
+
+        Returns:
+            Les entités extraites (nouvelle copie à chaque appel) ou None
+        """
+        key = self.make_key(text, model)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(row[0])
+
+    def set(self, text: str, model: str, entities: Dict):
+        """
+        Enregistre un résultat puis évince les entrées les moins récemment utilisées
+        si la taille maximale est dépassée.
+
+        Args:
+            text: Texte OCR du document
+            model: Modèle utilisé pour l'extraction
+            entities: Entités extraites
+        """
+        key = self.make_key(text, model)
+        value = json.dumps(entities, ensure_ascii=False)
+        size = len(value.encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, prompt_version, value, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, self.prompt_version, value, size, time.time())
+            )
+            self._evict()
+
+    def _evict(self):
+        """Supprime les entrées les plus anciennes jusqu'à repasser sous max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        to_delete = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+
+    def clear(self):
+        """Vide entièrement le cache"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
@@ -5,34 +5,29 @@ Utilise un LLM (Azure GPT-4o) pour extraire et structurer les informations
 
 import json
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Dict, List, Optional
-from openai import AzureOpenAI
-from dotenv import load_dotenv
 
-load_dotenv()
+# Ajouter le dossier parent au path pour les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
-# Configuration Azure OpenAI
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version="2024-02-15-preview",
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
+from utils.azure_client import (
+    MAX_CONCURRENT_REQUESTS,
+    create_chat_completion,
+    create_chat_completion_with_retry,
 )
+from utils.jsonl_io import JsonlWriter
+from utils.ner_cache import NerCache, compute_prompt_version
 
 
-def extract_entities_from_defaut_document(text: str, model: str = "gpt-4o") -> Dict:
-    """
-    Extrait les entités nommées d'une fiche de défauts en utilisant un LLM.
-    
-    Args:
-        text: Le texte OCR de la fiche de défauts
-        model: Le modèle Azure à utiliser (par défaut: gpt-4o)
-    
-    Returns:
-        Dict contenant toutes les entités extraites et structurées
-    """
-    
-    prompt = f"""Tu es un expert en extraction d'informations structurées.
+# Prompt d'extraction NER (le texte OCR est injecté via {text})
+NER_SYSTEM_MESSAGE = "Tu es un assistant expert en extraction d'informations structurées. Tu réponds toujours en JSON valide."
+
+NER_PROMPT_TEMPLATE = """Tu es un expert en extraction d'informations structurées.
 Analyse ce document OCR d'une fiche de défauts de mise en service et extrait toutes les informations.
 
 Le document contient:
@@ -102,35 +97,87 @@ Règles importantes:
 - Retourne UNIQUEMENT le JSON, sans texte additionnel
 """
 
+
+# Traitement batch (surchargeable par variables d'environnement)
+BATCH_MAX_WORKERS = int(os.getenv("NER_BATCH_WORKERS", str(MAX_CONCURRENT_REQUESTS)))
+BATCH_FILE_TIMEOUT = float(os.getenv("NER_BATCH_FILE_TIMEOUT", "300"))
+
+# Toute modification du prompt invalide les résultats NER mis en cache
+NER_PROMPT_VERSION = compute_prompt_version(NER_SYSTEM_MESSAGE, NER_PROMPT_TEMPLATE)
+
+_ner_cache: Optional[NerCache] = None
+_ner_cache_lock = threading.Lock()
+
+
+def get_ner_cache() -> NerCache:
+    """Retourne le cache NER partagé (ouvert au premier appel)"""
+    global _ner_cache
+    if _ner_cache is None:
+        with _ner_cache_lock:
+            if _ner_cache is None:
+                _ner_cache = NerCache(NER_PROMPT_VERSION)
+    return _ner_cache
+
+
+def _build_ner_request(text: str, model: str) -> Dict:
+    """Construit les paramètres de l'appel chat.completions pour l'extraction NER"""
+    return {
+        "model": model,
+        "messages": [
+            {
+                "role": "system",
+                "content": NER_SYSTEM_MESSAGE
+            },
+            {
+                "role": "user",
+                "content": NER_PROMPT_TEMPLATE.format(text=text)
+            }
+        ],
+        "temperature": 0.1,  # Faible température pour des résultats plus déterministes
+        "response_format": {"type": "json_object"}  # Force le retour en JSON
+    }
+
+
+def _error_entities(error: Exception) -> Dict:
+    """Résultat retourné quand l'extraction échoue"""
+    print(f"❌ Erreur lors de l'extraction: {str(error)}")
+    return {
+        "error": str(error),
+        "mise_en_service": {},
+        "tableau_defauts": [],
+        "champs_manquants": [],
+        "qualite_ocr": "erreur"
+    }
+
+
+def extract_entities_from_defaut_document(text: str, model: str = "gpt-4o", use_cache: bool = True) -> Dict:
+    """
+    Extrait les entités nommées d'une fiche de défauts en utilisant un LLM.
+    Un document déjà traité (même texte, modèle et prompt) est lu depuis le cache.
+    
+    Args:
+        text: Le texte OCR de la fiche de défauts
+        model: Le modèle Azure à utiliser (par défaut: gpt-4o)
+        use_cache: Utiliser le cache persistant des résultats (par défaut: True)
+    
+    Returns:
+        Dict contenant toutes les entités extraites et structurées
+    """
+    if use_cache:
+        cached = get_ner_cache().get(text, model)
+        if cached is not None:
+            return cached
+    
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Tu es un assistant expert en extraction d'informations structurées. Tu réponds toujours en JSON valide."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.1,  # Faible température pour des résultats plus déterministes
-            response_format={"type": "json_object"}  # Force le retour en JSON
-        )
+        response = create_chat_completion(**_build_ner_request(text, model))
+        result = json.loads(response.choices[0].message.content)
         
-        result = response.choices[0].message.content
-        return json.loads(result)
+        if use_cache:
+            get_ner_cache().set(text, model, result)
+        return result
         
     except Exception as e:
-        print(f"❌ Erreur lors de l'extraction: {str(e)}")
-        return {
-            "error": str(e),
-            "mise_en_service": {},
-            "tableau_defauts": [],
-            "champs_manquants": [],
-            "qualite_ocr": "erreur"
-        }
+        return _error_entities(e)
 
 
 def generate_rag_completion_prompt(entities: Dict) -> str:
@@ -181,6 +228,21 @@ def generate_rag_completion_prompt(entities: Dict) -> str:
     return prompt
 
 
+def _build_document_result(file_path: str, entities: Dict) -> Dict:
+    """Assemble le résultat d'un document : entités et prompt de complétion RAG"""
+    return {
+        "fichier_source": file_path,
+        "entites_extraites": entities,
+        "prompt_completion_rag": generate_rag_completion_prompt(entities)
+    }
+
+
+def _save_json(data: Dict, output_json: str):
+    """Sauvegarde un résultat au format JSON"""
+    with open(output_json, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
 def process_defaut_document(file_path: str, output_json: Optional[str] = None) -> Dict:
     """
     Traite un document de fiche de défauts et extrait toutes les entités.
@@ -203,19 +265,11 @@ def process_defaut_document(file_path: str, output_json: Optional[str] = None) -
     entities = extract_entities_from_defaut_document(text)
     
     # Générer le prompt de complétion pour le RAG
-    rag_prompt = generate_rag_completion_prompt(entities)
-    
-    # Ajouter le prompt au résultat
-    result = {
-        "fichier_source": file_path,
-        "entites_extraites": entities,
-        "prompt_completion_rag": rag_prompt
-    }
+    result = _build_document_result(file_path, entities)
     
     # Sauvegarder si demandé
     if output_json:
-        with open(output_json, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        _save_json(result, output_json)
         print(f"💾 Résultat sauvegardé dans: {output_json}")
     
     return result
@@ -264,55 +318,134 @@ def display_entities(entities: Dict):
     print("\n" + "="*80)
 
 
-def batch_process_ocr_results(ocr_dir: str, output_dir: str):
+def _extract_entities_for_batch(text: str, model: str, timeout: float) -> Dict:
+    """
+    Extraction NER d'un document du batch : cache, relances avec backoff sur
+    429/5xx et durée totale bornée à `timeout` secondes.
+    Les erreurs définitives sont propagées à l'appelant.
     """
-    Traite tous les fichiers OCR d'un répertoire.
+    cache = get_ner_cache()
+    cached = cache.get(text, model)
+    if cached is not None:
+        return cached
+    
+    response = create_chat_completion_with_retry(
+        deadline=time.monotonic() + timeout,
+        **_build_ner_request(text, model)
+    )
+    result = json.loads(response.choices[0].message.content)
+    cache.set(text, model, result)
+    return result
+
+
+def _process_batch_file(ocr_file: Path, output_path: Path, model: str, timeout: float) -> Dict:
+    """
+    Traite un fichier du batch et sauvegarde son résultat JSON.
+    Un échec est converti en résultat d'erreur pour ne pas interrompre le batch.
+    """
+    with open(ocr_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    
+    try:
+        entities = _extract_entities_for_batch(text, model, timeout)
+    except Exception as e:
+        entities = _error_entities(e)
+    
+    result = _build_document_result(str(ocr_file), entities)
+    _save_json(result, str(output_path / f"{ocr_file.stem}_entities.json"))
+    return result
+
+
+def batch_process_ocr_results(ocr_dir: str, output_dir: str, max_workers: int = BATCH_MAX_WORKERS,
+                              file_timeout: float = BATCH_FILE_TIMEOUT, model: str = "gpt-4o",
+                              verbose: bool = False):
+    """
+    Traite tous les fichiers OCR d'un répertoire, en parallèle.
+    
+    Les appels au LLM sont répartis sur `max_workers` threads (le nombre de requêtes
+    simultanées reste plafonné par le client Azure partagé). Les erreurs transitoires
+    (429, 5xx, timeouts) sont relancées avec backoff, dans la limite de `file_timeout`
+    secondes par fichier. Le résumé ner_summary.jsonl (un document par ligne, puis
+    les totaux) est écrit au fil de l'eau, dans l'ordre des fichiers.
     
     Args:
         ocr_dir: Répertoire contenant les fichiers OCR .txt
         output_dir: Répertoire pour sauvegarder les résultats JSON
+        max_workers: Nombre de fichiers traités simultanément
+        file_timeout: Durée maximale (en secondes) de l'extraction d'un fichier, relances comprises
+        model: Le modèle Azure à utiliser (par défaut: gpt-4o)
+        verbose: Afficher le détail des entités de chaque fichier
     """
     ocr_path = Path(ocr_dir)
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
     
     # Trouver tous les fichiers _ocr.txt qui contiennent "DEFAUT" dans leur nom
-    ocr_files = list(ocr_path.glob("*DEFAUT*_ocr.txt"))
+    ocr_files = sorted(ocr_path.glob("*DEFAUT*_ocr.txt"))
     
-    print(f"📂 Trouvé {len(ocr_files)} fichiers de défauts à traiter\n")
+    print(f"📂 Trouvé {len(ocr_files)} fichiers de défauts à traiter ({max_workers} en parallèle)\n")
     
-    results = []
-    for ocr_file in ocr_files:
-        output_json = output_path / f"{ocr_file.stem}_entities.json"
+    start_time = time.monotonic()
+    summary_path = output_path / "ner_summary.jsonl"
+    processed = 0
+    failed = 0
+    
+    # Les résultats terminés dans le désordre attendent ceux qui les précèdent,
+    # puis sont écrits dans le résumé JSONL dans l'ordre des fichiers
+    completed: Dict[int, Optional[Dict]] = {}
+    next_index = 0
+    
+    with JsonlWriter(summary_path) as summary, \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ner-batch") as executor:
+        futures = {
+            executor.submit(_process_batch_file, ocr_file, output_path, model, file_timeout): index
+            for index, ocr_file in enumerate(ocr_files)
+        }
         
-        try:
-            result = process_defaut_document(str(ocr_file), str(output_json))
-            results.append(result)
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures.pop(future)
+            ocr_file = ocr_files[index]
             
-            # Afficher les résultats
-            display_entities(result["entites_extraites"])
-            print(f"\n{result['prompt_completion_rag']}\n")
+            try:
+                result = future.result()
+            except Exception as e:
+                # Erreur hors extraction (lecture ou écriture de fichier)
+                print(f"❌ [{done}/{len(ocr_files)}] Erreur avec {ocr_file.name}: {str(e)}")
+                result = None
             
-        except Exception as e:
-            print(f"❌ Erreur avec {ocr_file.name}: {str(e)}\n")
-    
-    # Créer un résumé global
-    summary = {
-        "total_fichiers": len(ocr_files),
-        "fichiers_traites": len(results),
-        "resultats": results
-    }
-    
-    summary_path = output_path / "ner_summary.json"
-    with open(summary_path, 'w', encoding='utf-8') as f:
-        json.dump(summary, f, indent=2, ensure_ascii=False)
-    
-    print(f"\n📊 Résumé global sauvegardé dans: {summary_path}")
+            if result is not None:
+                entities = result["entites_extraites"]
+                status = "❌" if "error" in entities else "✅"
+                print(f"{status} [{done}/{len(ocr_files)}] {ocr_file.name}")
+                
+                if verbose:
+                    display_entities(entities)
+                    print(f"\n{result['prompt_completion_rag']}\n")
+            
+            completed[index] = result
+            while next_index in completed:
+                result = completed.pop(next_index)
+                next_index += 1
+                if result is None:
+                    continue
+                summary.write({"type": "document", **result})
+                processed += 1
+                failed += "error" in result["entites_extraites"]
+            summary.flush()
+        
+        # Totaux en fin de fichier
+        summary.write({
+            "type": "summary",
+            "total_fichiers": len(ocr_files),
+            "fichiers_traites": processed,
+            "fichiers_en_erreur": failed
+        })
+    
+    print(f"\n⏱️  {len(ocr_files)} fichiers traités en {time.monotonic() - start_time:.1f}s")
+    print(f"📊 Résumé global sauvegardé dans: {summary_path}")
 
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) > 1:
         # Mode fichier unique
         file_path = sys.argv[1]
@@ -0,0 +1,224 @@
+"""
+Reprise des traitements OCR interrompus
+Chaque page terminée est ajoutée à un journal JSONL (écriture immédiate) ; un
+manifeste indexé par l'empreinte SHA-256 des PDF récapitule l'état des pages.
+Une relance ne retraite que les pages en erreur, modifiées ou jamais traitées
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path) -> str:
+    """
+    Empreinte SHA-256 du contenu d'un fichier (lu par blocs).
+
+    Args:
+        path: Chemin du fichier
+
+    Returns:
+        Empreinte hexadécimale
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class OcrCheckpoint:
+    """
+    Journal et manifeste d'un traitement OCR, dans le dossier de sortie :
+      - <nom>_journal.jsonl : un enregistrement par page traitée (texte compris),
+        ajouté et synchronisé sur disque dès que la page est terminée
+      - <nom>_manifest.json : état des pages et des documents, avec la position
+        de chaque page dans le journal ; réécrit de façon atomique après chaque PDF
+
+    Au chargement, les enregistrements du journal postérieurs au dernier manifeste
+    (interruption en cours de PDF) sont rejoués.
+
+    Les pages sont identifiées par une clé : empreinte du contenu de la page quand
+    elle est calculable, sinon "<empreinte du PDF>:<numéro de page>".
+    """
+
+    def __init__(self, output_dir, name: str = "ocr"):
+        """
+        Args:
+            output_dir: Dossier de sortie du traitement
+            name: Préfixe des fichiers de journal et de manifeste
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        self.journal_path = output_dir / f"{name}_journal.jsonl"
+        self.manifest_path = output_dir / f"{name}_manifest.json"
+        self._lock = threading.Lock()
+
+        self.manifest = {
+            "version": MANIFEST_VERSION,
+            "journal_offset": 0,
+            "pages": {},
+            "documents": {}
+        }
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.manifest = manifest
+
+        self._replay_journal()
+        self._journal = open(self.journal_path, "ab")
+
+    def _replay_journal(self):
+        """Rejoue les enregistrements écrits après le dernier manifeste sauvegardé"""
+        if not self.journal_path.exists():
+            self._reset()
+            return
+        if self.journal_path.stat().st_size < self.manifest["journal_offset"]:
+            # Journal remplacé ou tronqué : le manifeste n'est plus fiable
+            self._reset()
+
+        offset = self.manifest["journal_offset"]
+        with open(self.journal_path, "rb+") as f:
+            f.seek(offset)
+            for line in iter(f.readline, b""):
+                if not line.endswith(b"\n"):
+                    # Dernière ligne tronquée par une interruption : on la supprime
+                    f.truncate(offset)
+                    break
+                try:
+                    self._apply(json.loads(line), offset)
+                except (ValueError, KeyError):
+                    pass
+                offset += len(line)
+
+        self.manifest["journal_offset"] = offset
+
+    def _reset(self):
+        """Repart d'un manifeste vide"""
+        self.manifest["journal_offset"] = 0
+        self.manifest["pages"] = {}
+        self.manifest["documents"] = {}
+
+    def _apply(self, record: Dict, offset: int):
+        """Reporte un enregistrement du journal dans le manifeste"""
+        if record["type"] == "page":
+            self.manifest["pages"][record["key"]] = {
+                "status": "error" if record.get("error") else "done",
+                "offset": offset
+            }
+        elif record["type"] == "document":
+            self.manifest["documents"][record["sha256"]] = {
+                "file": record["file"],
+                "total_pages": record["total_pages"],
+                "page_keys": record["page_keys"],
+                "error": record.get("error")
+            }
+
+    def _append(self, record: Dict):
+        """Ajoute un enregistrement au journal et le synchronise sur disque"""
+        record["timestamp"] = datetime.now().isoformat()
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            offset = self.manifest["journal_offset"]
+            self._journal.write(line)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._apply(record, offset)
+            self.manifest["journal_offset"] = offset + len(line)
+
+    def is_page_done(self, key: str) -> bool:
+        """Indique si la page a déjà été traitée avec succès"""
+        page = self.manifest["pages"].get(key)
+        return page is not None and page["status"] == "done"
+
+    def get_page_text(self, key: str) -> Optional[str]:
+        """
+        Relit dans le journal le texte d'une page traitée avec succès.
+
+        Args:
+            key: Clé de la page
+
+        Returns:
+            Le texte OCR de la page, ou None si elle n'est pas terminée
+        """
+        if not self.is_page_done(key):
+            return None
+        with self._lock:
+            self._journal.flush()
+        with open(self.journal_path, "rb") as f:
+            f.seek(self.manifest["pages"][key]["offset"])
+            return json.loads(f.readline())["text"]
+
+    def record_page(self, sha256: str, file: str, page: int, key: str,
+                    text: Optional[str] = None, error: Optional[str] = None):
+        """
+        Enregistre le résultat d'une page.
+
+        Args:
+            sha256: Empreinte du PDF
+            file: Nom du PDF
+            page: Numéro de page (à partir de 1)
+            key: Clé de la page
+            text: Texte extrait (si succès)
+            error: Message d'erreur (si échec)
+        """
+        self._append({
+            "type": "page",
+            "sha256": sha256,
+            "file": file,
+            "page": page,
+            "key": key,
+            "text": text,
+            "error": error
+        })
+
+    def record_document(self, sha256: str, file: str, page_keys: List[str], error: Optional[str] = None):
+        """
+        Enregistre la structure d'un document traité puis sauvegarde le manifeste.
+
+        Args:
+            sha256: Empreinte du PDF
+            file: Nom du PDF
+            page_keys: Clés de ses pages, dans l'ordre
+            error: Erreur au niveau du document (ex: échec de l'appel API)
+        """
+        self._append({
+            "type": "document",
+            "sha256": sha256,
+            "file": file,
+            "total_pages": len(page_keys),
+            "page_keys": page_keys,
+            "error": error
+        })
+        self.save()
+
+    def get_document(self, sha256: str) -> Optional[Dict]:
+        """État connu d'un document (fichier, nombre et clés de pages), ou None"""
+        return self.manifest["documents"].get(sha256)
+
+    def is_document_done(self, sha256: str) -> bool:
+        """Indique si toutes les pages du document ont été traitées avec succès"""
+        document = self.get_document(sha256)
+        if document is None or document.get("error"):
+            return False
+        return all(self.is_page_done(key) for key in document["page_keys"])
+
+    def save(self):
+        """Réécrit le manifeste de façon atomique (fichier temporaire puis renommage)"""
+        with self._lock:
+            tmp_path = self.manifest_path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+
+    def close(self):
+        """Sauvegarde le manifeste et ferme le journal"""
+        self.save()
+        self._journal.close()
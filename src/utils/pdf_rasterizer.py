@@ -0,0 +1,291 @@
+"""
+Rastérisation des PDF pour l'OCR Vision
+Les pages sont rendues en parallèle dans un pool de processus et restent en
+mémoire : aucun fichier image temporaire n'est écrit sur disque.
+L'encodage est adaptatif (résolution, niveaux de gris, qualité JPEG) pour
+tenir chaque page sous une taille de requête cible
+"""
+
+import base64
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+# GPT-4o (détail "high") ramène l'image dans un carré de 2048px, puis son petit
+# côté à 768px : rendre plus grand ne fait qu'alourdir la requête
+MAX_IMAGE_SIDE = 2048
+MIN_SHORT_SIDE = 768
+# Taille cible d'une page encodée (avant base64)
+TARGET_IMAGE_BYTES = int(float(os.getenv("OCR_IMAGE_TARGET_KB", "350")) * 1024)
+# Qualités JPEG essayées, de la meilleure à la plus compacte
+JPEG_QUALITIES = (85, 75, 65, 50)
+# Réduction de résolution appliquée quand aucune qualité ne tient la cible
+DOWNSCALE_STEP = 0.85
+# Détection des pages sans couleur utile (formulaires scannés)
+GRAYSCALE_PROBE_ZOOM = 0.25
+GRAYSCALE_CHANNEL_DELTA = 24
+GRAYSCALE_MAX_COLOR_RATIO = 0.02
+
+# Nombre de processus de rendu (par défaut : nombre de cœurs)
+RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(os.cpu_count() or 1)))
+# En dessous de ce nombre de pages, le rendu direct coûte moins que l'envoi au pool
+MIN_PAGES_FOR_POOL = 3
+
+# Références indirectes ("12 0 R") d'un objet PDF, et clés qui remontent vers
+# la page ou l'arbre des pages (non suivies : elles ne font pas partie du contenu)
+_INDIRECT_REF = re.compile(r"(\d+) 0 R")
+_BACK_REFS = re.compile(r"/(?:P|Parent|StructParent|Dest)\s+\d+ 0 R")
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class RenderedPage(NamedTuple):
+    """Page rendue et encodée en mémoire"""
+    page: int            # Numéro de page (à partir de 1)
+    image: bytes         # Image encodée
+    mime_type: str       # "image/jpeg" ou "image/png"
+    width: int
+    height: int
+
+    def data_url(self) -> str:
+        """URL data: base64 à transmettre dans un message image_url"""
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.image).decode('utf-8')}"
+
+
+def _is_grayscale(page: "fitz.Page") -> bool:
+    """
+    Indique si la page ne contient (presque) pas de couleur, d'après une
+    vignette basse résolution : elle peut alors être envoyée en niveaux de gris.
+    """
+    pix = page.get_pixmap(matrix=fitz.Matrix(GRAYSCALE_PROBE_ZOOM, GRAYSCALE_PROBE_ZOOM),
+                          colorspace=fitz.csRGB, alpha=False)
+    samples = pix.samples
+    pixel_count = pix.width * pix.height
+    if pixel_count == 0:
+        return True
+
+    colored = 0
+    max_colored = pixel_count * GRAYSCALE_MAX_COLOR_RATIO
+    for offset in range(0, len(samples) - 2, 3):
+        r, g, b = samples[offset], samples[offset + 1], samples[offset + 2]
+        if max(r, g, b) - min(r, g, b) > GRAYSCALE_CHANNEL_DELTA:
+            colored += 1
+            if colored > max_colored:
+                return False
+    return True
+
+
+def _render_page(pdf_path: str, page_number: int, target_bytes: int,
+                 high_quality: bool) -> Tuple[int, bytes, str, int, int]:
+    """
+    Rend et encode une page d'un PDF (exécuté dans un processus du pool).
+    Chaque processus ouvre lui-même le document : un fitz.Document n'est pas transférable.
+
+    Mode normal : JPEG, en niveaux de gris si la page n'a pas de couleur utile,
+    qualité puis résolution réduites jusqu'à passer sous target_bytes (sans
+    descendre sous la résolution effectivement vue par le modèle).
+    Mode haute qualité : PNG couleur à la résolution maximale.
+    """
+    with fitz.open(pdf_path) as document:
+        page = document[page_number]
+        long_side = max(page.rect.width, page.rect.height)
+        short_side = min(page.rect.width, page.rect.height)
+        zoom = MAX_IMAGE_SIDE / long_side
+        min_zoom = min(zoom, MIN_SHORT_SIDE / short_side)
+
+        if high_quality:
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            return page_number + 1, pix.tobytes("png"), "image/png", pix.width, pix.height
+
+        colorspace = fitz.csGRAY if _is_grayscale(page) else fitz.csRGB
+        while True:
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False)
+            for quality in JPEG_QUALITIES:
+                data = pix.tobytes("jpg", jpg_quality=quality)
+                if len(data) <= target_bytes:
+                    return page_number + 1, data, "image/jpeg", pix.width, pix.height
+            if zoom <= min_zoom:
+                # Cible inatteignable sans perdre en lisibilité : on garde le plus compact
+                return page_number + 1, data, "image/jpeg", pix.width, pix.height
+            zoom = max(min_zoom, zoom * DOWNSCALE_STEP)
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Retourne le pool de processus de rendu partagé (créé au premier appel)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS)
+    return _pool
+
+
+def get_page_count(pdf_path) -> int:
+    """Nombre de pages d'un PDF"""
+    with fitz.open(str(pdf_path)) as document:
+        return document.page_count
+
+
+def _hash_object_tree(document: "fitz.Document", source: str, digest, seen: set):
+    """
+    Ajoute à l'empreinte un objet PDF et, récursivement, tous les objets qu'il
+    référence (XObjects de formulaire et leurs ressources, images, polices
+    embarquées, apparences des annotations...), flux compris.
+    Les numéros d'objets ne sont pas hachés : une page recopiée dans un autre
+    PDF garde la même empreinte.
+    """
+    source = _BACK_REFS.sub("", source)
+    digest.update(_INDIRECT_REF.sub("R", source).encode("utf-8"))
+    for match in _INDIRECT_REF.finditer(source):
+        xref = int(match.group(1))
+        if xref in seen or not 0 < xref < document.xref_length():
+            continue
+        seen.add(xref)
+        _hash_object_tree(document, document.xref_object(xref, compressed=True), digest, seen)
+        if document.xref_is_stream(xref):
+            digest.update(document.xref_stream_raw(xref) or b"")
+
+
+def _page_key_source(document: "fitz.Document", xref: int, key: str) -> str:
+    """
+    Valeur d'une clé du dictionnaire de la page, sous forme de source PDF
+    (les ressources peuvent être héritées de l'arbre des pages)
+    """
+    while xref:
+        kind, value = document.xref_get_key(xref, key)
+        if kind != "null":
+            return value
+        if key != "Resources":
+            return ""
+        kind, parent = document.xref_get_key(xref, "Parent")
+        xref = int(parent.split()[0]) if kind == "xref" else 0
+    return ""
+
+
+def get_page_fingerprints(pdf_path) -> List[str]:
+    """
+    Empreinte du contenu de chaque page : flux de dessin, format, et tous les
+    objets utilisés pour le rendu (ressources parcourues récursivement : XObjects
+    de formulaire, images, données des polices ; annotations et leurs apparences).
+    Une page inchangée garde la même empreinte même si le reste du PDF est modifié,
+    ce qui permet de ne refaire l'OCR que des pages modifiées.
+
+    Args:
+        pdf_path: Chemin vers le fichier PDF
+
+    Returns:
+        Liste des empreintes hexadécimales, dans l'ordre des pages
+    """
+    fingerprints = []
+    with fitz.open(str(pdf_path)) as document:
+        for page in document:
+            digest = hashlib.sha256()
+            digest.update(page.read_contents())
+            digest.update(repr(tuple(page.rect)).encode("utf-8"))
+            seen = set()
+            for key in ("Resources", "Annots"):
+                digest.update(key.encode("utf-8"))
+                _hash_object_tree(document, _page_key_source(document, page.xref, key), digest, seen)
+            fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+def render_page(pdf_path, page: int, target_bytes: int = TARGET_IMAGE_BYTES,
+                high_quality: bool = False) -> RenderedPage:
+    """
+    Rend une seule page, dans le processus courant.
+
+    Args:
+        pdf_path: Chemin vers le fichier PDF
+        page: Numéro de page (à partir de 1)
+        target_bytes: Taille cible de l'image encodée
+        high_quality: Rendu PNG couleur pleine résolution (nouvelle tentative d'OCR)
+
+    Returns:
+        La page rendue
+    """
+    return RenderedPage(*_render_page(str(pdf_path), page - 1, target_bytes, high_quality))
+
+
+def iter_pdf_pages(pdf_path, target_bytes: int = TARGET_IMAGE_BYTES,
+                   pages: Optional[List[int]] = None) -> Iterator[RenderedPage]:
+    """
+    Rend les pages d'un PDF et les retourne dans l'ordre, au fur et à mesure :
+    l'OCR de la page 1 peut commencer pendant que les suivantes sont rendues.
+
+    Args:
+        pdf_path: Chemin vers le fichier PDF
+        target_bytes: Taille cible de chaque image encodée
+        pages: Numéros des pages à rendre (à partir de 1), toutes par défaut
+
+    Yields:
+        RenderedPage pour chaque page, dans l'ordre du document
+    """
+    pdf_path = str(pdf_path)
+    if pages is None:
+        page_numbers = list(range(get_page_count(pdf_path)))
+    else:
+        page_numbers = [page - 1 for page in sorted(pages)]
+
+    if len(page_numbers) < MIN_PAGES_FOR_POOL or RENDER_WORKERS <= 1:
+        for page_number in page_numbers:
+            yield RenderedPage(*_render_page(pdf_path, page_number, target_bytes, False))
+        return
+
+    # Une page par tâche : les premières pages sont disponibles au plus tôt
+    pool = get_render_pool()
+    futures = [
+        pool.submit(_render_page, pdf_path, page_number, target_bytes, False)
+        for page_number in page_numbers
+    ]
+    try:
+        for future in futures:
+            yield RenderedPage(*future.result())
+    finally:
+        # Consommateur interrompu : on abandonne les rendus pas encore démarrés
+        for future in futures:
+            future.cancel()
+
+
+def render_pdf_pages(pdf_path, target_bytes: int = TARGET_IMAGE_BYTES) -> List[RenderedPage]:
+    """
+    Rend toutes les pages d'un PDF en mémoire.
+
+    Args:
+        pdf_path: Chemin vers le fichier PDF
+        target_bytes: Taille cible de chaque image encodée
+
+    Returns:
+        Liste des pages rendues, dans l'ordre du document
+    """
+    return list(iter_pdf_pages(Path(pdf_path), target_bytes))
+
+
+def is_poor_ocr_text(text: Optional[str], min_chars: int = 40) -> bool:
+    """
+    Heuristique de qualité d'un texte OCR : texte quasi vide, ou dominé par
+    des caractères non alphanumériques (symptôme d'une image illisible ;
+    le seuil tolère les bordures des tableaux Markdown).
+    Sert à décider d'un nouveau rendu en haute qualité.
+
+    Args:
+        text: Texte retourné par l'OCR
+        min_chars: Nombre minimal de caractères attendus sur une page
+
+    Returns:
+        True si la page mérite une nouvelle tentative
+    """
+    if not text:
+        return True
+    visible = [c for c in text if not c.isspace()]
+    if len(visible) < min_chars:
+        return True
+    alnum = sum(1 for c in visible if c.isalnum())
+    return alnum / len(visible) < 0.3 or text.count("�") > len(visible) * 0.01
@@ -0,0 +1,195 @@
+"""
+Régulation du débit vers le déploiement Azure OpenAI
+Seaux à jetons sur les quotas requêtes/minute (RPM) et tokens/minute (TPM),
+recalés sur les en-têtes x-ratelimit-remaining-* renvoyés par Azure
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Quotas du déploiement (0 = non configuré, pas de régulation locale)
+REQUESTS_PER_MINUTE = int(os.getenv("AZURE_OPENAI_RPM", "0"))
+TOKENS_PER_MINUTE = int(os.getenv("AZURE_OPENAI_TPM", "0"))
+
+# Estimation grossière : ~4 caractères par token pour du texte français
+CHARS_PER_TOKEN = 4
+# Coût d'une image en détail "high" pour une page A4 (6 tuiles de 512px + base)
+IMAGE_TOKENS = 1105
+IMAGE_TOKENS_LOW_DETAIL = 85
+# Surcoût de structure par message (rôle, séparateurs)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_request_tokens(messages: List[Dict], max_tokens: Optional[int] = None) -> int:
+    """
+    Estime les tokens décomptés par Azure pour une requête, avant son envoi.
+    Azure réserve le prompt et max_tokens sur le quota TPM dès la réception.
+
+    Args:
+        messages: Messages de la requête chat.completions
+        max_tokens: Limite de tokens générés demandée (optionnelle)
+
+    Returns:
+        Nombre de tokens estimé
+    """
+    tokens = 0
+    for message in messages:
+        tokens += MESSAGE_OVERHEAD_TOKENS
+        content = message.get("content") or ""
+        if isinstance(content, str):
+            tokens += len(content) // CHARS_PER_TOKEN
+            continue
+        # Contenu multimodal : liste de parties texte / image
+        for part in content:
+            if part.get("type") == "image_url":
+                detail = part.get("image_url", {}).get("detail", "auto")
+                tokens += IMAGE_TOKENS_LOW_DETAIL if detail == "low" else IMAGE_TOKENS
+            else:
+                tokens += len(part.get("text", "")) // CHARS_PER_TOKEN
+
+    return tokens + (max_tokens or 0)
+
+
+class TokenBucket:
+    """
+    Seau à jetons rempli en continu à raison de `capacity` jetons par minute.
+    Non synchronisé : l'accès est protégé par le verrou de RateLimiter.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.rate = capacity / 60.0
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        """Ajoute les jetons accumulés depuis la dernière mise à jour"""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: int) -> float:
+        """Temps d'attente (s) avant de disposer de `amount` jetons"""
+        # Une requête plus grosse que le seau passe dès qu'il est plein
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+
+class RateLimiter:
+    """
+    Planificateur partagé par tous les threads (chat, NER, OCR) du processus.
+    Chaque appel réserve une requête et son estimation de tokens ; il attend si
+    l'un des deux quotas est épuisé, ou si Azure a renvoyé une erreur 429.
+    """
+
+    def __init__(self, requests_per_minute: int = REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = TOKENS_PER_MINUTE):
+        """
+        Args:
+            requests_per_minute: Quota RPM du déploiement (0 pour l'ignorer)
+            tokens_per_minute: Quota TPM du déploiement (0 pour l'ignorer)
+        """
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+
+    def _try_acquire(self, tokens: int) -> float:
+        """
+        Réserve la requête si possible.
+
+        Returns:
+            0 si la réservation est faite, sinon le temps d'attente conseillé
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+
+            for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_time(amount))
+
+            if wait > 0:
+                return wait
+
+            if self._requests is not None:
+                self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= tokens
+            return 0.0
+
+    def acquire(self, tokens: int):
+        """
+        Attend (en bloquant le thread) que le quota permette d'envoyer la requête.
+
+        Args:
+            tokens: Estimation des tokens de la requête (voir estimate_request_tokens)
+        """
+        wait = self._try_acquire(tokens)
+        while wait > 0:
+            time.sleep(wait)
+            wait = self._try_acquire(tokens)
+
+    async def aacquire(self, tokens: int):
+        """
+        Équivalent asynchrone de acquire, sans bloquer la boucle d'événements.
+
+        Args:
+            tokens: Estimation des tokens de la requête (voir estimate_request_tokens)
+        """
+        wait = self._try_acquire(tokens)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self._try_acquire(tokens)
+
+    def update_from_headers(self, headers):
+        """
+        Recale les seaux sur le quota restant annoncé par Azure.
+        Le quota est partagé avec les autres processus : on ne fait que baisser
+        le niveau local, jamais l'augmenter.
+
+        Args:
+            headers: En-têtes HTTP de la réponse
+        """
+        with self._lock:
+            now = time.monotonic()
+            for bucket, header in ((self._requests, "x-ratelimit-remaining-requests"),
+                                   (self._tokens, "x-ratelimit-remaining-tokens")):
+                value = headers.get(header)
+                if bucket is None or value is None:
+                    continue
+                try:
+                    remaining = float(value)
+                except ValueError:
+                    continue
+                bucket.refill(now)
+                bucket.level = min(bucket.level, remaining)
+
+    def pause(self, seconds: float):
+        """
+        Suspend tous les envois pendant `seconds` secondes (après une erreur 429).
+
+        Args:
+            seconds: Durée de la pause
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Retourne le planificateur partagé du processus (créé au premier appel)"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
@@ -0,0 +1,97 @@
+"""
+File de tâches d'arrière-plan propre à une session Streamlit
+Le script Streamlit est réexécuté à chaque interaction : un travail long lancé
+dans le corps du script (transcription, réponse du chatbot) bloque l'interface
+et est perdu si la page est rechargée pendant l'appel. Les tâches sont confiées
+ici à un thread de la session, qui survit aux rechargements ; l'interface lit
+leur avancement (texte partiel) et récupère leur résultat quand elles sont finies.
+"""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Optional
+
+
+class Job:
+    """
+    Tâche soumise à la file d'une session.
+    La fonction exécutée reçoit la tâche en premier argument et publie son
+    avancement dans `partial`, relu par l'interface pendant l'exécution.
+    """
+
+    def __init__(self, kind: str, label: str = "", **context):
+        """
+        Args:
+            kind: Type de tâche (ex: "transcription", "reply")
+            label: Texte affiché tant qu'aucun résultat partiel n'est disponible
+            **context: Données de l'interface à retrouver avec le résultat
+        """
+        self.kind = kind
+        self.label = label
+        self.context = context
+        self.partial = ""
+        self.future: Optional[Future] = None
+
+    @property
+    def done(self) -> bool:
+        """True quand la tâche est terminée (résultat ou exception)"""
+        return self.future is not None and self.future.done()
+
+    def result(self) -> Any:
+        """Résultat de la tâche (ses exceptions sont propagées)"""
+        return self.future.result()
+
+
+class SessionJobs:
+    """
+    File de tâches d'une session : un seul thread, les tâches s'exécutent dans
+    l'ordre de soumission (les mises à jour de la fiche et les réponses restent
+    dans l'ordre de la conversation).
+
+    Exemple:
+        jobs = SessionJobs()
+        jobs.submit(Job("reply"), generate, messages)
+        ...
+        job = jobs.take_finished()   # au rechargement suivant
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-jobs")
+        self._jobs: Deque[Job] = deque()
+
+    def submit(self, job: Job, fn: Callable[..., Any], *args) -> Job:
+        """
+        Ajoute une tâche à la file.
+
+        Args:
+            job: Tâche à exécuter
+            fn: Fonction appelée avec (job, *args) dans le thread de la session
+            *args: Arguments de la fonction
+
+        Returns:
+            La tâche soumise
+        """
+        job.future = self._executor.submit(fn, job, *args)
+        self._jobs.append(job)
+        return job
+
+    @property
+    def current(self) -> Optional[Job]:
+        """Plus ancienne tâche non récupérée (en cours ou terminée), None si la file est vide"""
+        return self._jobs[0] if self._jobs else None
+
+    @property
+    def busy(self) -> bool:
+        """True tant qu'une tâche n'a pas été récupérée"""
+        return bool(self._jobs)
+
+    def take_finished(self) -> Optional[Job]:
+        """
+        Retire la plus ancienne tâche de la file si elle est terminée.
+
+        Returns:
+            La tâche terminée, ou None si la file est vide ou la tâche en cours
+        """
+        if self._jobs and self._jobs[0].done:
+            return self._jobs.popleft()
+        return None
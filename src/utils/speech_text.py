@@ -0,0 +1,113 @@
+"""
+Normalisation du texte Markdown des réponses pour la synthèse vocale
+Un seul parcours du texte avec une expression régulière compilée une fois :
+chaque élément reconnu (bloc de code, lien, marqueur de liste, emphase,
+emoji, blanc...) est supprimé ou remplacé par le texte à prononcer
+"""
+
+import re
+
+# Plages d'emojis et de pictogrammes retirées avant la synthèse
+EMOJI_RANGES = (
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
+    "\U0001FA00-\U0001FA6F"  # Chess Symbols
+    "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
+    "\U00002600-\U000026FF"  # Miscellaneous Symbols
+    "\U00002700-\U000027BF"  # Dingbats
+)
+EMOJI_PATTERN = re.compile(f"[{EMOJI_RANGES}]+")
+
+# Guillemets qui ne doivent pas être lus (ouvrants : l'espace qui suit est
+# retiré avec eux ; fermants : l'espace qui précède)
+QUOTES = '"“”„«»'
+OPENING_QUOTES = '“„«'
+CLOSING_QUOTES = '”»'
+
+# Marqueur de citation, de puce ou de numéro de liste (après un saut de ligne)
+_LINE_MARKER = r"(?:>|[-*+]|\d+\.)[ \t]+"
+
+# Un élément par alternative, essayées dans l'ordre ; le texte ordinaire entre
+# deux éléments est recopié tel quel par re.sub. Chaque alternative commence par
+# un caractère fixe (hors du groupe nommé) : le moteur saute directement aux
+# positions candidates au lieu d'essayer toutes les alternatives partout
+TOKEN_PATTERN = re.compile(
+    r"```(?P<code_block>[\s\S]*?)```"
+    r"|`(?P<inline_code>[^`]+)`"
+    r"|!(?P<image>\[[^\]]*\]\([^)]+\)[ \t]*)"
+    r"|\[(?P<link>[^\]]+)\]\([^)]+\)"
+    # Fin de ligne, lignes vides et marqueur de liste de la ligne suivante
+    rf"|\n(?P<newline>(?:[ \t\r]*\n)*[ \t]*(?:{_LINE_MARKER})?)"
+    rf"|[ \t\r](?P<trailing_space>[ \t\r]*)(?=[\n{CLOSING_QUOTES}])"
+    r"|#(?P<heading>#{0,5}[ \t]+)"
+    r"|[*_](?P<emphasis>[*_]*)"
+    rf"|[{OPENING_QUOTES}](?P<opening_quote>[ \t]*)"
+    rf"|[{QUOTES}](?P<quote>[{QUOTES}]*)"
+    # L'emoji emporte l'espace qui le suit ("✅ Nom" -> "Nom")
+    rf"|[{EMOJI_RANGES}](?P<emoji>[{EMOJI_RANGES}]*[ \t]*)"
+    r"|[ \t\f\v](?P<spaces>[ \t\f\v]+)"
+    r"|[\t\r\f\v](?P<control>)"
+)
+
+# Remplacement des éléments à texte fixe
+_REPLACEMENTS = {
+    "code_block": "",
+    "image": "",
+    "newline": "\n",
+    "trailing_space": "",
+    "heading": "",
+    "emphasis": "",
+    "opening_quote": "",
+    "quote": "",
+    "emoji": "",
+    "spaces": " ",
+    "control": " ",
+}
+
+# Lignes devenues vides (ligne d'emojis, bloc de code...)
+_BLANK_LINES = re.compile(r"\n{2,}")
+
+# Emphase retirée du texte conservé (code, liens)
+_STRIP_EMPHASIS = str.maketrans("", "", "*_")
+
+
+def _replace(match: "re.Match") -> str:
+    """Texte à prononcer pour un élément reconnu"""
+    kind = match.lastgroup
+    replacement = _REPLACEMENTS.get(kind)
+    if replacement is not None:
+        return replacement
+    # Code inline et liens : on garde le texte
+    return match.group(kind).translate(_STRIP_EMPHASIS)
+
+
+def remove_emojis(text: str) -> str:
+    """Supprime les emojis du texte"""
+    return EMOJI_PATTERN.sub("", text)
+
+
+def clean_text_for_speech(text: str) -> str:
+    """
+    Nettoie le texte pour la synthèse vocale, en un seul parcours (plus un
+    regroupement des lignes vides, seulement s'il en reste) :
+    - supprime les emojis, les blocs de code, les images et les guillemets
+    - garde le texte des codes inline et des liens Markdown
+    - supprime le formatage (gras, italique, titres, citations, puces, numéros de liste)
+    - réduit les espaces multiples à un espace et les lignes vides à un saut de ligne
+
+    Args:
+        text: Texte Markdown de la réponse
+
+    Returns:
+        Le texte à prononcer
+    """
+    # Le saut de ligne initial permet de traiter un marqueur de liste en tête de texte
+    text = TOKEN_PATTERN.sub(_replace, "\n" + text)
+    if "\n\n" in text:
+        text = _BLANK_LINES.sub("\n", text)
+    return text.strip()
@@ -0,0 +1,359 @@
+"""
+Service de transcription Whisper partagé
+Un processus dédié charge le modèle une seule fois et traite les demandes de
+toutes les sessions Streamlit (et de tous les processus serveur) via une
+socket locale, avec un nombre borné de transcriptions simultanées.
+
+Lancement manuel (sinon démarré automatiquement au premier appel) :
+    python src/utils/transcription_worker.py
+"""
+
+import ipaddress
+import os
+import queue
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Dict, Iterator
+
+# Ajouter le dossier parent au path pour les imports (lancement direct du service)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.audio_decode import decode_audio
+from utils.whisper_backends import WHISPER_BACKEND, WHISPER_MODEL, load_backend
+
+# Configuration (surchargeable par variables d'environnement)
+# Adresse de bouclage obligatoire (voir _check_local_host)
+WORKER_HOST = os.getenv("WHISPER_WORKER_HOST", "127.0.0.1")
+WORKER_PORT = int(os.getenv("WHISPER_WORKER_PORT", "8765"))
+# Clé d'authentification : multiprocessing.connection désérialise (pickle) chaque
+# message reçu, la clé est donc la seule barrière contre l'exécution de code dans
+# le service. Sans WHISPER_WORKER_AUTHKEY, une clé aléatoire est générée au premier
+# lancement et stockée dans un fichier lisible par le seul utilisateur courant
+WORKER_AUTHKEY_ENV = os.getenv("WHISPER_WORKER_AUTHKEY", "")
+WORKER_AUTHKEY_PATH = Path(os.getenv(
+    "WHISPER_WORKER_AUTHKEY_FILE",
+    str(Path(__file__).resolve().parents[2] / "data" / "whisper_worker.key")
+))
+# Nombre de transcriptions simultanées (un exemplaire du modèle par transcription)
+WORKER_CONCURRENCY = int(os.getenv("WHISPER_WORKER_CONCURRENCY", "1"))
+# Délai maximum d'attente du démarrage du service (chargement du modèle compris)
+WORKER_START_TIMEOUT = 120.0
+# Délai maximum d'attente d'un exemplaire libre du modèle
+JOB_QUEUE_TIMEOUT = 300.0
+# Fin du segment précédent transmise à Whisper en transcription par segments
+STREAM_PROMPT_CHARS = 200
+
+_start_lock = threading.Lock()
+_authkey: bytes = b""
+
+
+def get_authkey() -> bytes:
+    """
+    Clé partagée entre l'application et le service : WHISPER_WORKER_AUTHKEY si
+    elle est définie, sinon le contenu du fichier de clé (créé en 0600 avec une
+    clé aléatoire s'il n'existe pas encore).
+
+    Returns:
+        La clé d'authentification
+    """
+    global _authkey
+    if _authkey:
+        return _authkey
+    if WORKER_AUTHKEY_ENV:
+        _authkey = WORKER_AUTHKEY_ENV.encode("utf-8")
+        return _authkey
+
+    WORKER_AUTHKEY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # Création exclusive : si le service et l'application démarrent en même
+        # temps, un seul écrit la clé et l'autre la relit
+        fd = os.open(WORKER_AUTHKEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        key = b""
+        deadline = time.monotonic() + 5.0
+        while not key and time.monotonic() < deadline:
+            key = WORKER_AUTHKEY_PATH.read_bytes().strip()
+            if not key:
+                time.sleep(0.05)
+        if not key:
+            raise RuntimeError(f"Fichier de clé du service de transcription vide: {WORKER_AUTHKEY_PATH}")
+    else:
+        key = secrets.token_hex(32).encode("ascii")
+        with os.fdopen(fd, "wb") as key_file:
+            key_file.write(key)
+    _authkey = key
+    return _authkey
+
+
+def _check_local_host(host: str):
+    """
+    Refuse une adresse d'écoute ou de connexion non locale : le protocole
+    désérialise les messages, le service ne doit jamais être joignable du réseau.
+
+    Raises:
+        ValueError: Si l'adresse n'est pas une adresse de bouclage
+    """
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror as e:
+        raise ValueError(f"Adresse du service de transcription invalide: {host}") from e
+    if not all(ipaddress.ip_address(address.split("%")[0]).is_loopback for address in addresses):
+        raise ValueError(
+            f"Le service de transcription doit rester local (127.0.0.1, ::1), adresse refusée: {host}"
+        )
+
+
+# ---------------------------------------------------------------------------
+# Côté service
+# ---------------------------------------------------------------------------
+
+def _load_models(backend_name: str, model_name: str, count: int) -> "queue.Queue":
+    """
+    Charge les exemplaires du moteur de transcription.
+    Un modèle openai-whisper ne peut pas servir deux transcriptions à la fois
+    (cache de décodage installé sur le modèle) : chaque transcription simultanée
+    emprunte son propre exemplaire. Un moteur thread-safe est chargé une fois
+    et partagé.
+    """
+    backend = load_backend(backend_name, model_name)
+    instances = [backend]
+    if not backend.thread_safe:
+        instances += [load_backend(backend_name, model_name) for _ in range(count - 1)]
+
+    models = queue.Queue()
+    for index in range(count):
+        models.put(instances[index % len(instances)])
+    print(f"🎤 {len(instances)} exemplaire(s) du moteur {backend.describe()} chargé(s)")
+    return models
+
+
+def _transcribe(models: "queue.Queue", audio, initial_prompt: str = None) -> str:
+    """
+    Transcrit un clip audio avec le premier exemplaire du modèle disponible.
+
+    Args:
+        models: Exemplaires du modèle disponibles
+        audio: Contenu du fichier audio, ou échantillons déjà décodés (float32, 16 kHz)
+        initial_prompt: Texte qui précède le clip (continuité entre segments)
+    """
+    if isinstance(audio, bytes):
+        # Décodage en mémoire, avant d'emprunter le modèle
+        audio = decode_audio(audio)
+    model = models.get(timeout=JOB_QUEUE_TIMEOUT)
+    try:
+        return model.transcribe(audio, initial_prompt=initial_prompt)
+    finally:
+        models.put(model)
+
+
+def _transcribe_stream(conn, models: "queue.Queue", audio: bytes):
+    """
+    Découpe l'audio aux silences et envoie la transcription de chaque segment
+    dès qu'elle est prête, puis un message final avec le texte complet.
+    Le modèle est rendu entre deux segments : les autres sessions ne sont pas
+    bloquées pendant toute la durée d'un long mémo.
+    """
+    from utils.audio_vad import split_on_silence
+
+    chunks = split_on_silence(decode_audio(audio))
+    texts = []
+    for index, chunk in enumerate(chunks):
+        # La fin du segment précédent guide Whisper (ponctuation, vocabulaire)
+        prompt = texts[-1][-STREAM_PROMPT_CHARS:] if texts else None
+        text = _transcribe(models, chunk.samples, initial_prompt=prompt).strip()
+        texts.append(text)
+        conn.send({
+            "ok": True,
+            "done": False,
+            "index": index,
+            "count": len(chunks),
+            "start": chunk.start,
+            "end": chunk.end,
+            "text": text
+        })
+    conn.send({"ok": True, "done": True, "text": " ".join(t for t in texts if t)})
+
+
+def _handle_connection(conn, models: "queue.Queue"):
+    """Traite les demandes d'une connexion cliente jusqu'à sa fermeture"""
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            try:
+                if request.get("op") == "ping":
+                    response = {"ok": True}
+                elif request.get("op") == "transcribe_stream":
+                    _transcribe_stream(conn, models, request["audio"])
+                    continue
+                elif request.get("op") == "transcribe":
+                    text = _transcribe(models, request["audio"])
+                    response = {"ok": True, "text": text}
+                else:
+                    response = {"ok": False, "error": f"Opération inconnue: {request.get('op')}"}
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+
+            try:
+                conn.send(response)
+            except OSError:
+                return
+
+
+def serve(host: str = WORKER_HOST, port: int = WORKER_PORT, backend_name: str = WHISPER_BACKEND,
+          model_name: str = WHISPER_MODEL, concurrency: int = WORKER_CONCURRENCY):
+    """
+    Démarre le service de transcription (bloquant).
+
+    La socket est ouverte avant le chargement du modèle : les clients qui se
+    connectent pendant le chargement attendent simplement leur tour.
+
+    Args:
+        host: Adresse d'écoute (obligatoirement locale)
+        port: Port d'écoute
+        backend_name: Moteur de transcription (openai-whisper, faster-whisper)
+        model_name: Taille du modèle Whisper (tiny, base, small...)
+        concurrency: Nombre de transcriptions simultanées
+    """
+    _check_local_host(host)
+    with Listener((host, port), authkey=get_authkey()) as listener:
+        print(f"🚀 Service de transcription en écoute sur {host}:{port}")
+        models = _load_models(backend_name, model_name, concurrency)
+
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # Client non authentifié ou connexion interrompue : on continue
+                print(f"⚠️  Connexion refusée: {e}")
+                continue
+            threading.Thread(
+                target=_handle_connection,
+                args=(conn, models),
+                name="whisper-connection",
+                daemon=True
+            ).start()
+
+
+# ---------------------------------------------------------------------------
+# Côté client
+# ---------------------------------------------------------------------------
+
+def _start_worker():
+    """Lance le service dans un processus détaché (survit aux reruns Streamlit)"""
+    subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve())],
+        stdin=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+def _connect(timeout: float = WORKER_START_TIMEOUT):
+    """
+    Ouvre une connexion au service, en le démarrant s'il ne répond pas.
+
+    Returns:
+        Connexion multiprocessing authentifiée
+    """
+    _check_local_host(WORKER_HOST)
+    address = (WORKER_HOST, WORKER_PORT)
+    authkey = get_authkey()
+    try:
+        return Client(address, authkey=authkey)
+    except ConnectionRefusedError:
+        pass
+
+    with _start_lock:
+        try:
+            return Client(address, authkey=authkey)
+        except ConnectionRefusedError:
+            print("🚀 Démarrage du service de transcription Whisper...")
+            _start_worker()
+
+        # Si un autre processus a démarré le service en même temps, le second
+        # lancement échoue sur le port déjà utilisé et s'arrête de lui-même
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return Client(address, authkey=authkey)
+            except ConnectionRefusedError:
+                if time.monotonic() >= deadline:
+                    raise RuntimeError("Le service de transcription Whisper n'a pas démarré")
+                time.sleep(0.2)
+
+
+def _request(payload: Dict) -> Dict:
+    """Envoie une demande au service et retourne sa réponse"""
+    with _connect() as conn:
+        conn.send(payload)
+        response = conn.recv()
+    if not response.get("ok"):
+        raise RuntimeError(f"Erreur du service de transcription: {response.get('error')}")
+    return response
+
+
+def transcribe_bytes(audio: bytes) -> str:
+    """
+    Transcrit un clip audio via le service partagé.
+
+    Args:
+        audio: Contenu du fichier audio (wav, mp3, m4a... : le format est détecté)
+
+    Returns:
+        Le texte transcrit
+    """
+    return _request({"op": "transcribe", "audio": audio})["text"]
+
+
+def iter_transcription(audio: bytes) -> Iterator[Dict]:
+    """
+    Transcrit un clip audio segment par segment (découpage aux silences) :
+    chaque segment est retourné dès qu'il est transcrit, sans attendre la fin
+    du décodage des longs enregistrements.
+
+    Args:
+        audio: Contenu du fichier audio (wav, mp3, m4a... : le format est détecté)
+
+    Yields:
+        Un dictionnaire par segment : index, count, start, end (s) et text
+    """
+    with _connect() as conn:
+        conn.send({"op": "transcribe_stream", "audio": audio})
+        while True:
+            response = conn.recv()
+            if not response.get("ok"):
+                raise RuntimeError(f"Erreur du service de transcription: {response.get('error')}")
+            if response.get("done"):
+                return
+            yield response
+
+
+def ensure_worker_started():
+    """
+    Démarre le service en arrière-plan s'il ne tourne pas encore, pour que le
+    modèle soit chargé avant la première demande de transcription.
+    """
+    def warmup():
+        try:
+            _request({"op": "ping"})
+        except Exception as e:
+            print(f"⚠️  Service de transcription indisponible: {e}")
+
+    threading.Thread(target=warmup, name="whisper-warmup", daemon=True).start()
+
+
+if __name__ == "__main__":
+    try:
+        serve()
+    except OSError as e:
+        # Port déjà utilisé : un service tourne déjà
+        print(f"ℹ️  Service de transcription non démarré: {e}")
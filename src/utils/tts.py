@@ -0,0 +1,418 @@
+"""
+Synthèse vocale des réponses du chatbot (Edge TTS) avec cache
+Les réponses sont découpées en phrases, synthétisées en parallèle dès qu'elles
+sont complètes (pendant la génération de la réponse), puis mises bout à bout.
+L'audio de chaque phrase est indexé par (texte nettoyé, voix) : en mémoire
+(LRU borné) et dans une base SQLite (LRU bornée en taille), pour que les
+questions répétées du parcours de fiche soient lues instantanément
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import edge_tts
+
+from utils.async_runtime import submit_coroutine
+from utils.speech_text import clean_text_for_speech
+
+# Voix française naturelle ("fr-FR-HenriNeural" pour une voix masculine)
+TTS_VOICE = os.getenv("TTS_VOICE", "fr-FR-DeniseNeural")
+TTS_CACHE_PATH = Path(os.getenv(
+    "TTS_CACHE_PATH",
+    str(Path(__file__).resolve().parents[2] / "data" / "tts_cache.sqlite3")
+))
+TTS_CACHE_MAX_BYTES = int(float(os.getenv("TTS_CACHE_MAX_MB", "100")) * 1024 * 1024)
+TTS_MEMORY_CACHE_MAX_BYTES = int(float(os.getenv("TTS_MEMORY_CACHE_MB", "16")) * 1024 * 1024)
+# Nombre de phrases synthétisées simultanément
+TTS_SYNTHESIS_WORKERS = int(os.getenv("TTS_SYNTHESIS_WORKERS", "4"))
+
+# Fin de phrase : ponctuation finale (et guillemet/parenthèse fermante) suivie
+# d'un blanc, ou saut de ligne
+SENTENCE_END = re.compile(r'[.!?…]+[)"»\']*\s+|\n+')
+# Une phrase plus courte est regroupée avec la suivante ("1.", "Oui.", titres...)
+MIN_SENTENCE_CHARS = 20
+# Blocs de code Markdown : jamais lus, ni découpés en phrases
+CODE_FENCE = "```"
+FENCED_BLOCK = re.compile(r"```[\s\S]*?```")
+
+
+class TtsCache:
+    """
+    Cache de l'audio synthétisé, sur deux niveaux :
+      - mémoire : LRU borné en octets, partagé par les sessions du processus
+      - disque : base SQLite avec éviction LRU bornée en taille, partagée
+        entre processus et conservée d'un redémarrage à l'autre
+    Utilisable depuis plusieurs threads.
+    """
+
+    def __init__(self, path: Path = TTS_CACHE_PATH, max_bytes: int = TTS_CACHE_MAX_BYTES,
+                 memory_max_bytes: int = TTS_MEMORY_CACHE_MAX_BYTES):
+        """
+        Args:
+            path: Chemin du fichier SQLite
+            max_bytes: Taille maximale cumulée de l'audio stocké sur disque
+            memory_max_bytes: Taille maximale de l'audio gardé en mémoire
+        """
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " audio BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)"
+            )
+
+    @staticmethod
+    def make_key(clean_text: str, voice: str) -> str:
+        """Clé de contenu : hash de la voix et du texte nettoyé"""
+        digest = hashlib.sha256()
+        for part in (voice, clean_text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _remember(self, key: str, audio: bytes):
+        """Place l'audio en tête du cache mémoire puis évince les plus anciens"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.memory_max_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, clean_text: str, voice: str) -> Optional[bytes]:
+        """
+        Retourne l'audio en cache pour ce texte et cette voix, ou None.
+
+        Args:
+            clean_text: Texte nettoyé (voir clean_text_for_speech)
+            voice: Voix Edge TTS
+
+        Returns:
+            L'audio MP3, ou None
+        """
+        key = self.make_key(clean_text, voice)
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                return audio
+
+            with self._conn:
+                row = self._conn.execute(
+                    "SELECT audio FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._conn.execute(
+                    "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+            audio = bytes(row[0])
+            self._remember(key, audio)
+        return audio
+
+    def set(self, clean_text: str, voice: str, audio: bytes):
+        """
+        Enregistre l'audio puis évince les entrées les moins récemment utilisées
+        si les tailles maximales sont dépassées.
+
+        Args:
+            clean_text: Texte nettoyé
+            voice: Voix Edge TTS
+            audio: Audio MP3 synthétisé
+        """
+        key = self.make_key(clean_text, voice)
+        with self._lock:
+            self._remember(key, audio)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, audio, size, last_access)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, audio, len(audio), time.time())
+                )
+                self._evict()
+
+    def _evict(self):
+        """Supprime les entrées les plus anciennes jusqu'à repasser sous max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        to_delete = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+
+    def clear(self):
+        """Vide entièrement le cache"""
+        with self._lock, self._conn:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._conn.execute("DELETE FROM entries")
+
+
+_cache: Optional[TtsCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache() -> TtsCache:
+    """Retourne le cache partagé du processus (ouvert au premier appel)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TtsCache()
+    return _cache
+
+
+class SentenceSplitter:
+    """
+    Découpe un texte reçu par morceaux (réponse en streaming) en phrases.
+    Le découpage ne dépend pas de la façon dont le texte est fragmenté : une
+    réponse découpée au fil de l'eau donne les mêmes phrases que la réponse
+    complète, et donc les mêmes entrées de cache.
+    Les blocs de code sont retirés avant le découpage : tant qu'un bloc est
+    ouvert, le texte qui le suit est retenu (aucun fragment de code n'est émis).
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Ajoute un morceau de texte.
+
+        Args:
+            chunk: Suite du texte
+
+        Returns:
+            Les phrases terminées par ce morceau
+        """
+        self._buffer = FENCED_BLOCK.sub("\n", self._buffer + chunk)
+        # Bloc de code encore ouvert : on ne découpe que le texte qui le précède
+        fence = self._buffer.find(CODE_FENCE)
+        scan_end = len(self._buffer) if fence < 0 else fence
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer, 0, scan_end):
+            if match.end() == len(self._buffer):
+                # Le blanc final peut encore se prolonger dans le morceau suivant
+                break
+            sentence = self._buffer[start:match.end()].strip()
+            if len(sentence) < MIN_SENTENCE_CHARS:
+                continue
+            sentences.append(sentence)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """
+        Termine le texte.
+
+        Returns:
+            La dernière phrase (si elle n'est pas vide)
+        """
+        # Bloc de code jamais refermé : abandonné
+        sentence = self._buffer.split(CODE_FENCE, 1)[0].strip()
+        self._buffer = ""
+        return [sentence] if sentence else []
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Découpe un texte complet en phrases (même découpage que SentenceSplitter).
+
+    Args:
+        text: Texte de la réponse
+
+    Returns:
+        Liste des phrases, dans l'ordre
+    """
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+
+_synthesis_slots: Optional[asyncio.Semaphore] = None
+_pending: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+
+
+async def _synthesize_async(clean_text: str, voice: str) -> bytes:
+    """Synthétise le texte avec Edge TTS, en mémoire (sans fichier temporaire)"""
+    communicate = edge_tts.Communicate(clean_text, voice)
+    chunks = []
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            chunks.append(chunk["data"])
+    return b"".join(chunks)
+
+
+async def _synthesize_and_store(clean_text: str, voice: str) -> bytes:
+    """
+    Synthétise un texte sur la boucle d'arrière-plan (nombre de synthèses
+    simultanées borné) et l'enregistre dans le cache.
+    """
+    global _synthesis_slots
+    if _synthesis_slots is None:
+        # Créé sur la boucle d'arrière-plan, qui exécute toutes les synthèses
+        _synthesis_slots = asyncio.Semaphore(TTS_SYNTHESIS_WORKERS)
+
+    async with _synthesis_slots:
+        audio = await _synthesize_async(clean_text, voice)
+    # Écriture SQLite hors de la boucle (elle sert aussi les appels LLM)
+    await asyncio.get_running_loop().run_in_executor(
+        None, get_tts_cache().set, clean_text, voice, audio
+    )
+    return audio
+
+
+def submit_synthesis(clean_text: str, voice: str = TTS_VOICE) -> Future:
+    """
+    Lance la synthèse d'un texte nettoyé sur la boucle asyncio d'arrière-plan
+    du processus (pas de boucle créée puis détruite à chaque réponse).
+    Une synthèse déjà en cours pour le même texte et la même voix est réutilisée.
+
+    Args:
+        clean_text: Texte nettoyé (non vide)
+        voice: Voix Edge TTS
+
+    Returns:
+        Future (concurrent.futures) portant l'audio MP3
+    """
+    audio = get_tts_cache().get(clean_text, voice)
+    if audio is not None:
+        future = Future()
+        future.set_result(audio)
+        return future
+
+    key = TtsCache.make_key(clean_text, voice)
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is not None:
+            return future
+        future = submit_coroutine(_synthesize_and_store(clean_text, voice))
+        _pending[key] = future
+
+    def forget(_):
+        with _pending_lock:
+            _pending.pop(key, None)
+
+    future.add_done_callback(forget)
+    return future
+
+
+class SpeechPipeline:
+    """
+    Synthèse d'une réponse au fil de sa génération : chaque phrase terminée
+    part en synthèse immédiatement, en parallèle des suivantes.
+
+    Exemple:
+        pipeline = SpeechPipeline()
+        for chunk in stream:
+            pipeline.feed(chunk)
+        pipeline.finish()
+    """
+
+    def __init__(self, voice: str = TTS_VOICE):
+        """
+        Args:
+            voice: Voix Edge TTS
+        """
+        self.voice = voice
+        self.futures: List[Future] = []
+        self._splitter = SentenceSplitter()
+
+    def _submit(self, sentences: List[str]):
+        for sentence in sentences:
+            clean_text = clean_text_for_speech(sentence)
+            if clean_text:
+                self.futures.append(submit_synthesis(clean_text, self.voice))
+
+    def feed(self, chunk: str):
+        """Ajoute un morceau de la réponse"""
+        self._submit(self._splitter.feed(chunk))
+
+    def finish(self):
+        """Signale la fin de la réponse (synthèse de la dernière phrase)"""
+        self._submit(self._splitter.flush())
+
+
+def text_to_speech(text: str, voice: str = TTS_VOICE) -> Optional[bytes]:
+    """
+    Convertit une réponse du chatbot en audio, phrase par phrase.
+    Les phrases déjà synthétisées (cache, ou SpeechPipeline pendant la
+    génération de la réponse) ne sont pas refaites.
+
+    Args:
+        text: Texte de la réponse (Markdown, emojis...)
+        voice: Voix Edge TTS
+
+    Returns:
+        L'audio MP3 (phrases mises bout à bout), ou None s'il n'y a rien à lire
+    """
+    pipeline = SpeechPipeline(voice)
+    pipeline.feed(text)
+    pipeline.finish()
+    if not pipeline.futures:
+        return None
+    # Les trames MP3 se concatènent sans réencodage
+    return b"".join(future.result() for future in pipeline.futures)
+
+
+def prewarm(texts: Iterable[str], voice: str = TTS_VOICE):
+    """
+    Pré-génère l'audio des textes fixes absents du cache, dans un thread
+    d'arrière-plan (les textes déjà en cache ne coûtent qu'une lecture SQLite).
+
+    Args:
+        texts: Textes à pré-générer (questions des fiches, messages d'accueil...)
+        voice: Voix Edge TTS
+    """
+    texts = list(texts)
+
+    def warmup():
+        generated = 0
+        for text in texts:
+            for sentence in split_sentences(text):
+                clean_text = clean_text_for_speech(sentence)
+                if not clean_text or get_tts_cache().get(clean_text, voice) is not None:
+                    continue
+                try:
+                    submit_synthesis(clean_text, voice).result()
+                    generated += 1
+                except Exception as e:
+                    print(f"⚠️  Pré-génération de la synthèse vocale interrompue: {e}")
+                    return
+        if generated:
+            print(f"🔊 {generated} phrase(s) pré-générée(s) pour la synthèse vocale")
+
+    threading.Thread(target=warmup, name="tts-prewarm", daemon=True).start()
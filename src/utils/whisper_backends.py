@@ -0,0 +1,187 @@
+"""
+Moteurs de transcription Whisper interchangeables
+  - openai-whisper : modèle PyTorch d'origine (FP32 sur CPU)
+  - faster-whisper : CTranslate2, quantifié int8 sur CPU (dépendance optionnelle)
+
+Le moteur, la taille du modèle et le nombre de threads CPU se règlent par
+variables d'environnement ; voir examples/benchmark_whisper_backends.py pour
+comparer les moteurs sur les mêmes enregistrements
+"""
+
+import os
+import warnings
+from typing import Dict, Optional, Type
+
+# Configuration (surchargeable par variables d'environnement)
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "openai-whisper")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "tiny")
+# "auto" : CUDA si disponible, sinon CPU
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "auto")
+# Type de calcul CTranslate2 (int8, int8_float16, float16, float32)
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+# Threads de calcul par opération / opérations en parallèle (0 = valeur par défaut de la bibliothèque)
+WHISPER_INTRA_OP_THREADS = int(os.getenv("WHISPER_INTRA_OP_THREADS", "0"))
+WHISPER_INTER_OP_THREADS = int(os.getenv("WHISPER_INTER_OP_THREADS", "0"))
+# Langue des enregistrements (évite la détection de langue sur chaque clip)
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "fr")
+
+
+def _cuda_available() -> bool:
+    """Indique si un GPU CUDA est utilisable"""
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+
+def _resolve_device(device: str) -> str:
+    """Remplace "auto" par le périphérique disponible"""
+    if device == "auto":
+        return "cuda" if _cuda_available() else "cpu"
+    return device
+
+
+class WhisperBackend:
+    """
+    Interface commune des moteurs de transcription.
+
+    Attributs:
+        name: Nom du moteur (clé de BACKENDS)
+        thread_safe: True si une même instance peut servir plusieurs
+            transcriptions simultanées (sinon une instance par transcription)
+    """
+
+    name = ""
+    thread_safe = False
+
+    def __init__(self, model_name: str = WHISPER_MODEL, device: str = WHISPER_DEVICE,
+                 intra_op_threads: int = WHISPER_INTRA_OP_THREADS,
+                 inter_op_threads: int = WHISPER_INTER_OP_THREADS,
+                 language: Optional[str] = WHISPER_LANGUAGE):
+        """
+        Args:
+            model_name: Taille du modèle (tiny, base, small, medium, large-v3...)
+            device: "cpu", "cuda" ou "auto"
+            intra_op_threads: Threads de calcul par opération (0 = défaut)
+            inter_op_threads: Opérations exécutées en parallèle (0 = défaut)
+            language: Code de langue forcé (None = détection automatique)
+        """
+        self.model_name = model_name
+        self.device = _resolve_device(device)
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.language = language or None
+
+    def transcribe(self, audio, initial_prompt: Optional[str] = None) -> str:
+        """
+        Transcrit un clip audio.
+
+        Args:
+            audio: Chemin d'un fichier audio, ou échantillons mono float32 à 16 kHz
+            initial_prompt: Texte qui précède le clip (continuité entre segments)
+
+        Returns:
+            Le texte transcrit
+        """
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        """Description courte pour les journaux"""
+        return f"{self.name} '{self.model_name}' sur {self.device}"
+
+
+class OpenAIWhisperBackend(WhisperBackend):
+    """Modèle openai-whisper d'origine (PyTorch)"""
+
+    name = "openai-whisper"
+    # Le cache de décodage est installé sur le modèle : une transcription à la fois
+    thread_safe = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import torch
+        import whisper
+
+        if self.intra_op_threads > 0:
+            torch.set_num_threads(self.intra_op_threads)
+        if self.inter_op_threads > 0:
+            try:
+                torch.set_num_interop_threads(self.inter_op_threads)
+            except RuntimeError:
+                # Réglable une seule fois par processus, avant tout calcul parallèle
+                pass
+
+        warnings.filterwarnings("ignore", message="FP16 is not supported on CPU")
+        self.model = whisper.load_model(self.model_name, device=self.device)
+
+    def transcribe(self, audio, initial_prompt: Optional[str] = None) -> str:
+        result = self.model.transcribe(
+            audio,
+            language=self.language,
+            initial_prompt=initial_prompt,
+            fp16=self.device == "cuda"
+        )
+        return result["text"]
+
+
+class FasterWhisperBackend(WhisperBackend):
+    """Modèle CTranslate2 (faster-whisper), quantifié selon WHISPER_COMPUTE_TYPE"""
+
+    name = "faster-whisper"
+    # CTranslate2 répartit les transcriptions simultanées entre ses workers
+    thread_safe = True
+
+    def __init__(self, *args, compute_type: str = WHISPER_COMPUTE_TYPE, **kwargs):
+        super().__init__(*args, **kwargs)
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise ImportError(
+                "Le moteur faster-whisper nécessite le paquet faster-whisper "
+                "(pip install faster-whisper)"
+            )
+
+        self.compute_type = compute_type
+        self.model = WhisperModel(
+            self.model_name,
+            device=self.device,
+            compute_type=compute_type,
+            cpu_threads=self.intra_op_threads,
+            num_workers=max(1, self.inter_op_threads)
+        )
+
+    def transcribe(self, audio, initial_prompt: Optional[str] = None) -> str:
+        segments, _ = self.model.transcribe(
+            audio,
+            language=self.language,
+            initial_prompt=initial_prompt
+        )
+        # Les segments sont décodés à la demande : le parcours fait la transcription
+        return "".join(segment.text for segment in segments)
+
+    def describe(self) -> str:
+        return f"{super().describe()} ({self.compute_type})"
+
+
+BACKENDS: Dict[str, Type[WhisperBackend]] = {
+    OpenAIWhisperBackend.name: OpenAIWhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def load_backend(name: str = WHISPER_BACKEND, model_name: str = WHISPER_MODEL, **kwargs) -> WhisperBackend:
+    """
+    Charge un moteur de transcription.
+
+    Args:
+        name: Nom du moteur (voir BACKENDS)
+        model_name: Taille du modèle
+        **kwargs: Réglages propres au moteur (device, threads, compute_type...)
+
+    Returns:
+        Le moteur, modèle chargé
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Moteur Whisper inconnu: {name} (disponibles: {', '.join(BACKENDS)})")
+    return BACKENDS[name](model_name, **kwargs)